@@ -0,0 +1,81 @@
+import sys
+from typing import List, Optional, Union
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel
+import uvicorn
+
+from refurbished_car.exception.exception import RefurbishedCarException
+from refurbished_car.logging.logger import logging
+from refurbished_car.entity.config_entity import TrainingPipelineConfig, PredictionServiceConfig
+from refurbished_car.pipeline.prediction_service import PredictionService
+
+
+class CarListing(BaseModel):
+    car_name: Optional[str] = None
+    brand: Optional[str] = None
+    model: Optional[str] = None
+    vehicle_age: Optional[float] = None
+    km_driven: Optional[float] = None
+    seller_type: Optional[str] = None
+    fuel_type: Optional[str] = None
+    transmission_type: Optional[str] = None
+    mileage: Optional[float] = None
+    engine: Optional[float] = None
+    max_power: Optional[float] = None
+    seats: Optional[float] = None
+
+
+prediction_service = PredictionService(PredictionServiceConfig(TrainingPipelineConfig()))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await prediction_service.start()  # load the model once, before the first request
+    yield
+    await prediction_service.stop()
+
+
+app = FastAPI(title="Refurbished car pricing", lifespan=lifespan)
+
+
+@app.get("/health")
+async def health():
+    network_model = prediction_service.network_model
+    return {"status": "ok", "model_loaded": network_model is not None, "model_version": getattr(network_model, "version", None)}
+
+
+def _root_cause(error: Exception) -> Exception:
+    # RefurbishedCarException keeps the exception it wraps as error_message
+    while isinstance(error, RefurbishedCarException) and isinstance(error.error_message, Exception):
+        error = error.error_message
+    return error
+
+
+@app.post("/predict")
+async def predict(listings: Union[CarListing, List[CarListing]]):
+    if prediction_service.network_model is None or prediction_service.batcher is None:
+        raise HTTPException(status_code=503, detail="Model is not loaded")
+    if isinstance(listings, list) and not listings:
+        raise HTTPException(status_code=400, detail="Send at least one listing")
+    records = [listing.model_dump() for listing in (listings if isinstance(listings, list) else [listings])]
+    try:
+        predictions = await prediction_service.predict(records)
+    except Exception as e:
+        error = _root_cause(e)
+        if isinstance(error, (ValueError, TypeError, KeyError)):
+            # e.g. a category the preprocessor was not fitted on
+            raise HTTPException(status_code=422, detail=f"Listing could not be priced: {error}")
+        logging.error(f"Prediction failed: {RefurbishedCarException(e, sys)}")
+        raise HTTPException(status_code=500, detail="Prediction failed")
+    return {"predicted_selling_price": predictions if isinstance(listings, list) else predictions[0]}
+
+
+@app.get("/metrics")
+async def metrics():
+    return prediction_service.metrics()
+
+
+if __name__ == "__main__":
+    uvicorn.run(app, host="0.0.0.0", port=8000)
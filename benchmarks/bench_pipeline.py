@@ -0,0 +1,505 @@
+"""
+Benchmark suite for the training pipeline's hot paths on synthetic CarDekho-shaped data
+(see synthetic_data.py). Every benchmark is timed on its own, in a forked child process so its
+memory is measured in isolation:
+
+    ingestion               stream a mongomock collection into the feature store (offline stand-in for MongoDB)
+    split                   DataIngestion.split_data_as_train_test
+    drift                   DataValidation.detect_dataset_drift
+    preprocessor_fit        fit of the DataTransformation preprocessor
+    preprocessor_transform  transform of the train features
+    evaluate_models         utils.evaluate_models on a small regressor grid
+    train_candidates        utils.evaluate_models on ModelTrainer's candidate models and grids
+    predict_batch           NetworkModel.predict on the test set
+    predict_single          NetworkModel.predict on one-row DataFrames
+    predict_single_record   NetworkModel.predict_records on one record (compiled preprocessor path)
+    predict_pool            PredictionWorkerPool.predict on the test set, one forked worker per core
+    predict_cached_record   repeat quotes of one record through the warm PredictionCache
+    load_model_bundle       load_model_bundle of a saved bundle (memory-mapped)
+    import_estimator        fresh interpreter importing the prediction model module
+    import_model_trainer    fresh interpreter importing the model trainer component
+    import_training_pipeline fresh interpreter importing the training pipeline entry point
+    cold_start_prediction   fresh interpreter: imports, model bundle load and the first NetworkModel.predict_records
+
+The startup benchmarks run in a new python process per call, since the benchmark process has
+everything imported already; they fail the run when slower than --startup-budget seconds.
+
+Results (min/median seconds, rows/sec, traced peak allocations and rss growth) are saved to
+benchmarks/results/<time>_<commit>.json; --compare flags regressions against an earlier file.
+
+    python benchmarks/bench_pipeline.py --rows 15000 1000000 10000000
+    python benchmarks/bench_pipeline.py --rows 15000 --compare benchmarks/results/<baseline>.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import subprocess
+import statistics
+import multiprocessing
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, "benchmarks"))
+
+from synthetic_data import load_synthetic_dataset
+from refurbished_car.constant.training_pipeline import TARGET_COLUMN
+
+RESULTS_DIR = os.path.join(REPO_DIR, "benchmarks", "results")
+DEFAULT_ROWS = [15_000]
+PREDICT_SINGLE_CALLS = 200
+MODEL_FIT_MAX_ROWS = 200_000
+STARTUP_BENCHMARKS = ("import_estimator", "import_model_trainer", "import_training_pipeline", "cold_start_prediction")
+STARTUP_BUDGET_SECONDS = 1.0
+
+
+def _read_status_mb(field: str):
+    try:
+        with open("/proc/self/status") as file_obj:
+            for line in file_obj:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _reset_peak_rss() -> bool:
+    """
+    Reset VmHWM so the peak measured afterwards belongs to the benchmark alone (Linux only)
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as file_obj:
+            file_obj.write("5")
+        return True
+    except OSError:
+        return False
+
+
+class BenchmarkContext:
+    """
+    Data and fitted objects shared by the benchmarks of one dataset size. Everything is built
+    lazily in the parent before forking, so setup is paid once and never timed
+    """
+    def __init__(self, n_rows: int, workspace: str):
+        self.n_rows = n_rows
+        self.workspace = workspace
+        self._cache = {}
+
+    def _get(self, name, build):
+        if name not in self._cache:
+            self._cache[name] = build()
+        return self._cache[name]
+
+    def training_pipeline_config(self):
+        from refurbished_car.entity.config_entity import TrainingPipelineConfig
+        return TrainingPipelineConfig(timestamp=datetime.now())
+
+    @property
+    def dataframe(self) -> pd.DataFrame:
+        return self._get("dataframe", lambda: load_synthetic_dataset(self.n_rows))
+
+    def _split(self):
+        permutation = np.random.default_rng(0).permutation(len(self.dataframe))
+        n_test = len(permutation) // 5
+        return (self.dataframe.iloc[np.sort(permutation[n_test:])].reset_index(drop=True),
+                self.dataframe.iloc[np.sort(permutation[:n_test])].reset_index(drop=True))
+
+    @property
+    def train_df(self) -> pd.DataFrame:
+        return self._get("split", self._split)[0]
+
+    @property
+    def test_df(self) -> pd.DataFrame:
+        return self._get("split", self._split)[1]
+
+    def build_preprocessor(self):
+        from refurbished_car.components.data_transformation import DataTransformation
+        from refurbished_car.entity.config_entity import DataTransformationConfig
+        # only the config is needed to build the (unfitted) preprocessor, not a validation artifact
+        return DataTransformation(None, DataTransformationConfig(self.training_pipeline_config())).get_data_transformer_object()
+
+    @property
+    def preprocessor(self):
+        return self._get("preprocessor", lambda: self.build_preprocessor().fit(self.train_df.drop(columns=[TARGET_COLUMN])))
+
+    @property
+    def transformed_train(self):
+        return self._get("transformed_train", lambda: self.preprocessor.transform(self.train_df.drop(columns=[TARGET_COLUMN])))
+
+    @property
+    def model(self):
+        def fit_model():
+            from sklearn.tree import DecisionTreeRegressor
+            n_fit = min(MODEL_FIT_MAX_ROWS, self.transformed_train.shape[0])
+            return DecisionTreeRegressor(max_depth=12, random_state=0).fit(
+                self.transformed_train[:n_fit], self.train_df[TARGET_COLUMN].to_numpy()[:n_fit]
+            )
+        return self._get("model", fit_model)
+
+    @property
+    def network_model(self):
+        from refurbished_car.utils.ml_utils.model.estimator import NetworkModel
+        return self._get("network_model", lambda: NetworkModel(preprocessor=self.preprocessor, model=self.model))
+
+    @property
+    def model_bundle_file_path(self):
+        def save_bundle():
+            from refurbished_car.utils.ml_utils.model.estimator import save_model_bundle
+            file_path = os.path.join(self.workspace, f"model_bundle_{self.n_rows}.joblib")
+            save_model_bundle(file_path, self.network_model)
+            return file_path
+        return self._get("model_bundle_file_path", save_bundle)
+
+    @property
+    def mongo_client(self):
+        def load_collection():
+            import mongomock
+            from refurbished_car.constant.training_pipeline import DATA_INGESTION_DATABASE_NAME, DATA_INGESTION_COLLECTION_NAME
+            client = mongomock.MongoClient()
+            collection = client[DATA_INGESTION_DATABASE_NAME][DATA_INGESTION_COLLECTION_NAME]
+            collection.insert_many(self.dataframe.to_dict("records"))
+            return client
+        return self._get("mongo_client", load_collection)
+
+
+## each benchmark: (context attributes to build before forking, max rows unless --no-limits, setup returning (function, rows per call))
+
+def setup_ingestion(context):
+    import pymongo
+    from refurbished_car.components.data_ingestion import DataIngestion
+    from refurbished_car.entity.config_entity import DataIngestionConfig
+    client = context.mongo_client
+    pymongo.MongoClient = lambda *args, **kwargs: client  # only patched inside the forked child
+    data_ingestion = DataIngestion(DataIngestionConfig(context.training_pipeline_config()))
+    return data_ingestion.stream_collection_into_feature_store, context.n_rows
+
+
+def setup_split(context):
+    from refurbished_car.components.data_ingestion import DataIngestion
+    from refurbished_car.entity.config_entity import DataIngestionConfig
+    data_ingestion = DataIngestion(DataIngestionConfig(context.training_pipeline_config()))
+    dataframe = context.dataframe
+    return lambda: data_ingestion.split_data_as_train_test(dataframe), context.n_rows
+
+
+def setup_drift(context):
+    from refurbished_car.components.data_validation import DataValidation
+    from refurbished_car.entity.config_entity import DataValidationConfig
+    data_validation = DataValidation(None, DataValidationConfig(context.training_pipeline_config()))
+    train_df, test_df = context.train_df, context.test_df
+    return lambda: data_validation.detect_dataset_drift(base_df=train_df, current_df=test_df), context.n_rows
+
+
+def setup_preprocessor_fit(context):
+    features = context.train_df.drop(columns=[TARGET_COLUMN])
+    return lambda: context.build_preprocessor().fit(features), len(features)
+
+
+def setup_preprocessor_transform(context):
+    features = context.train_df.drop(columns=[TARGET_COLUMN])
+    preprocessor = context.preprocessor
+    return lambda: preprocessor.transform(features), len(features)
+
+
+def setup_evaluate_models(context):
+    from sklearn.tree import DecisionTreeRegressor, ExtraTreeRegressor
+    from refurbished_car.utils.main_utils.utils import evaluate_models
+    x_train = context.transformed_train
+    y_train = context.train_df[TARGET_COLUMN].to_numpy()
+    x_test = context.preprocessor.transform(context.test_df.drop(columns=[TARGET_COLUMN]))
+    y_test = context.test_df[TARGET_COLUMN].to_numpy()
+    params = {"Decision Tree": {"max_depth": [6, 10, 14]}, "Extra Tree": {"max_depth": [6, 10, 14]}}
+
+    def run():
+        # both take the nan the ordinal encoder leaves for missing categories
+        models = {"Decision Tree": DecisionTreeRegressor(random_state=0), "Extra Tree": ExtraTreeRegressor(random_state=0)}
+        return evaluate_models(x_train, y_train, x_test, y_test, models, params, n_jobs=1)
+    return run, x_train.shape[0]
+
+
+def setup_train_candidates(context):
+    from scipy.sparse import issparse
+    from refurbished_car.components.model_trainer import ModelTrainer
+    from refurbished_car.entity.config_entity import ModelTrainerConfig
+    from refurbished_car.utils.main_utils.utils import evaluate_models
+    x_train = context.transformed_train
+    y_train = context.train_df[TARGET_COLUMN].to_numpy()
+    x_test = context.preprocessor.transform(context.test_df.drop(columns=[TARGET_COLUMN]))
+    y_test = context.test_df[TARGET_COLUMN].to_numpy()
+    # only the config is needed to build the candidates, not a transformation artifact
+    model_trainer = ModelTrainer(ModelTrainerConfig(context.training_pipeline_config()), None)
+    categorical_features = model_trainer.get_categorical_features(context.preprocessor)
+
+    def run():
+        models, params = model_trainer.get_candidate_models(x_train.shape[1], categorical_features, issparse(x_train))
+        return evaluate_models(x_train, y_train, x_test, y_test, models, params, n_jobs=1)
+    return run, x_train.shape[0]
+
+
+def setup_predict_batch(context):
+    features = context.test_df.drop(columns=[TARGET_COLUMN])
+    network_model = context.network_model
+    return lambda: network_model.predict(features), len(features)
+
+
+def setup_predict_single(context):
+    rows = [context.test_df.drop(columns=[TARGET_COLUMN]).iloc[[index]] for index in range(PREDICT_SINGLE_CALLS)]
+    network_model = context.network_model
+
+    def run():
+        for row in rows:
+            network_model.predict(row)
+    return run, PREDICT_SINGLE_CALLS
+
+
+def setup_predict_single_record(context):
+    records = context.test_df.drop(columns=[TARGET_COLUMN]).head(PREDICT_SINGLE_CALLS).to_dict("records")
+    network_model = context.network_model
+
+    def run():
+        for record in records:
+            network_model.predict_records([record])
+    return run, PREDICT_SINGLE_CALLS
+
+
+def setup_predict_pool(context):
+    from refurbished_car.entity.config_entity import PredictionPoolConfig
+    from refurbished_car.pipeline.prediction_pool import PredictionWorkerPool
+    features = context.test_df.drop(columns=[TARGET_COLUMN])
+    pool = PredictionWorkerPool(PredictionPoolConfig(context.training_pipeline_config()), network_model=context.network_model).start()
+    return lambda: pool.predict(features), len(features)  # the workers exit with the benchmark process
+
+
+def setup_predict_cached_record(context):
+    from refurbished_car.utils.ml_utils.model.prediction_cache import PredictionCache
+    records = context.test_df.drop(columns=[TARGET_COLUMN]).head(PREDICT_SINGLE_CALLS).to_dict("records")
+    network_model = context.network_model
+    prediction_cache = PredictionCache(max_entries=len(records))
+    prediction_cache.predict_records(network_model, records)  # warm: every timed call is a hit
+
+    def run():
+        for record in records:
+            prediction_cache.predict_records(network_model, [record])
+    return run, PREDICT_SINGLE_CALLS
+
+
+def setup_load_model_bundle(context):
+    from refurbished_car.utils.ml_utils.model.estimator import load_model_bundle
+    file_path = context.model_bundle_file_path
+    return lambda: load_model_bundle(file_path), 1
+
+
+def _run_python(context, code: str) -> None:
+    environment = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [REPO_DIR, os.environ.get("PYTHONPATH")])))
+    subprocess.run([sys.executable, "-c", code], cwd=context.workspace, env=environment, check=True)
+
+
+def setup_import_estimator(context):
+    return lambda: _run_python(context, "import refurbished_car.utils.ml_utils.model.estimator"), 1
+
+
+def setup_import_model_trainer(context):
+    return lambda: _run_python(context, "import refurbished_car.components.model_trainer"), 1
+
+
+def setup_import_training_pipeline(context):
+    return lambda: _run_python(context, "import refurbished_car.pipeline.training_pipeline"), 1
+
+
+def setup_cold_start_prediction(context):
+    record = context.test_df.drop(columns=[TARGET_COLUMN]).head(1).to_dict("records")[0]
+    code = (
+        "import json\n"
+        "from refurbished_car.utils.ml_utils.model.estimator import load_model_bundle\n"
+        f"network_model = load_model_bundle({context.model_bundle_file_path!r})\n"
+        f"network_model.predict_records([json.loads({json.dumps(record, default=str)!r})])\n"
+    )
+    return lambda: _run_python(context, code), 1
+
+
+BENCHMARKS = {
+    "ingestion": (("mongo_client",), 200_000, setup_ingestion),  # mongomock is pure python
+    "split": (("dataframe",), None, setup_split),
+    "drift": (("train_df",), None, setup_drift),
+    "preprocessor_fit": (("train_df",), None, setup_preprocessor_fit),
+    "preprocessor_transform": (("preprocessor",), None, setup_preprocessor_transform),
+    "evaluate_models": (("transformed_train",), 1_000_000, setup_evaluate_models),
+    "train_candidates": (("transformed_train",), 1_000_000, setup_train_candidates),
+    "predict_batch": (("network_model",), None, setup_predict_batch),
+    "predict_single": (("network_model",), None, setup_predict_single),
+    "predict_single_record": (("network_model",), None, setup_predict_single_record),
+    "predict_pool": (("network_model",), None, setup_predict_pool),
+    "predict_cached_record": (("network_model",), None, setup_predict_cached_record),
+    "load_model_bundle": (("model_bundle_file_path",), None, setup_load_model_bundle),
+    "import_estimator": ((), None, setup_import_estimator),
+    "import_model_trainer": ((), None, setup_import_model_trainer),
+    "import_training_pipeline": ((), None, setup_import_training_pipeline),
+    "cold_start_prediction": (("model_bundle_file_path",), None, setup_cold_start_prediction),
+}
+
+
+def measure(context: BenchmarkContext, name: str, repeat: int) -> dict:
+    """
+    Time one benchmark repeat times, then run it once more under tracemalloc for its peak allocations
+    """
+    function, rows = BENCHMARKS[name][2](context)
+    function()  # warm up: imports, lazy initialisation, page cache
+    rss_before = _read_status_mb("VmRSS")
+    peak_reset = _reset_peak_rss()
+    timings = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start_time)
+    peak_rss = _read_status_mb("VmHWM")
+    tracemalloc.start()
+    function()
+    traced_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "benchmark": name,
+        "rows": context.n_rows,
+        "rows_per_call": rows,
+        "repeat": repeat,
+        "min_seconds": round(min(timings), 6),
+        "median_seconds": round(statistics.median(timings), 6),
+        "rows_per_second": round(rows / max(min(timings), 1e-9), 1),
+        "traced_peak_mb": round(traced_peak / 2 ** 20, 2),
+        "rss_growth_mb": round(peak_rss - rss_before, 2) if peak_reset and peak_rss is not None else None,
+    }
+
+
+def _measure_in_child(connection, context, name, repeat):
+    try:
+        connection.send(("ok", measure(context, name, repeat)))
+    except BaseException as e:
+        connection.send(("error", repr(e)))
+    finally:
+        connection.close()
+
+
+def run_benchmark(context: BenchmarkContext, name: str, repeat: int) -> dict:
+    for attribute in BENCHMARKS[name][0]:
+        getattr(context, attribute)
+    if "fork" not in multiprocessing.get_all_start_methods():
+        return measure(context, name, repeat)
+    multiprocessing_context = multiprocessing.get_context("fork")
+    parent_connection, child_connection = multiprocessing_context.Pipe(duplex=False)
+    process = multiprocessing_context.Process(target=_measure_in_child, args=(child_connection, context, name, repeat))
+    process.start()
+    child_connection.close()
+    status, result = parent_connection.recv()
+    process.join()
+    if status != "ok":
+        raise RuntimeError(f"benchmark {name} failed: {result}")
+    return result
+
+
+def get_metadata() -> dict:
+    import sklearn
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, text=True).strip()
+        dirty = bool(subprocess.check_output(["git", "status", "--porcelain", "--untracked-files=no"], cwd=REPO_DIR, text=True).strip())
+    except (OSError, subprocess.CalledProcessError):
+        commit, dirty = None, None
+    return {
+        "commit": commit,
+        "dirty": dirty,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "sklearn": sklearn.__version__,
+    }
+
+
+def compare(results: list, baseline_file_path: str, threshold: float) -> bool:
+    """
+    Print current against baseline min times, return True when any benchmark got slower than threshold
+    """
+    with open(baseline_file_path) as file_obj:
+        baseline = {(result["benchmark"], result["rows"]): result for result in json.load(file_obj)["results"]}
+    regressed = False
+    print(f"\n{'benchmark':24s} {'rows':>10s} {'baseline s':>12s} {'current s':>12s} {'ratio':>7s}")
+    for result in results:
+        base = baseline.get((result["benchmark"], result["rows"]))
+        if base is None:
+            continue
+        ratio = result["min_seconds"] / max(base["min_seconds"], 1e-9)
+        flag = ""
+        if ratio > 1 + threshold:
+            flag, regressed = "  REGRESSION", True
+        print(f"{result['benchmark']:24s} {result['rows']:>10d} {base['min_seconds']:>12.4f} {result['min_seconds']:>12.4f} {ratio:>7.2f}{flag}")
+    return regressed
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_ROWS, help="dataset sizes, e.g. 15000 1000000 10000000")
+    parser.add_argument("--benchmarks", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-limits", action="store_true", help="also run benchmarks above their row limit")
+    parser.add_argument("--output", help="results file, default benchmarks/results/<time>_<commit>.json")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="slowdown ratio reported as a regression")
+    parser.add_argument("--startup-budget", type=float, default=STARTUP_BUDGET_SECONDS,
+                        help="seconds the startup benchmarks may take before the run fails")
+    args = parser.parse_args(argv)
+
+    metadata = get_metadata()
+    results = []
+    # artifacts written by the components go to a scratch directory, the schema is linked in
+    workspace = tempfile.mkdtemp(prefix="refurbished_car_bench_")
+    os.symlink(os.path.join(REPO_DIR, "data_schema"), os.path.join(workspace, "data_schema"))
+    current_dir = os.getcwd()
+    os.chdir(workspace)
+    try:
+        for n_rows in args.rows:
+            context = BenchmarkContext(n_rows, workspace)
+            for name in args.benchmarks:
+                max_rows = BENCHMARKS[name][1]
+                if max_rows is not None and n_rows > max_rows and not args.no_limits:
+                    print(f"{name:24s} {n_rows:>10d}  skipped (above {max_rows} rows, use --no-limits)")
+                    continue
+                result = run_benchmark(context, name, args.repeat)
+                results.append(result)
+                print(
+                    f"{name:24s} {n_rows:>10d}  min {result['min_seconds']:10.4f}s  median {result['median_seconds']:10.4f}s  "
+                    f"{result['rows_per_second']:>14,.0f} rows/s  traced peak {result['traced_peak_mb']:8.1f} MB"
+                )
+    finally:
+        os.chdir(current_dir)
+        shutil.rmtree(workspace, ignore_errors=True)
+
+    output_file_path = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{metadata['commit'] or 'nocommit'}.json"
+    )
+    os.makedirs(os.path.dirname(output_file_path) or ".", exist_ok=True)
+    with open(output_file_path, "w") as file_obj:
+        json.dump({"metadata": metadata, "results": results}, file_obj, indent=2)
+    print(f"\nresults saved to {output_file_path}")
+
+    over_budget = [result for result in results
+                   if result["benchmark"] in STARTUP_BENCHMARKS and result["min_seconds"] > args.startup_budget]
+    for result in over_budget:
+        print(f"{result['benchmark']} took {result['min_seconds']:.3f}s, over the {args.startup_budget}s startup budget")
+
+    if args.compare and compare(results, args.compare, args.threshold):
+        return 1
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
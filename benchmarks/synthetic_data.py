@@ -0,0 +1,82 @@
+"""
+Synthetic CarDekho-shaped listings for the benchmarks.
+
+Columns and dtypes come from data_schema/schema.yaml. Rows are bootstrapped from the shipped
+dataset/cardekho_imputated.csv so the joint distribution (brand/model/price) stays realistic,
+with a little multiplicative noise on the continuous columns so large samples are not just
+repeated rows. Generated datasets are cached as parquet under benchmarks/.data/.
+
+    python benchmarks/synthetic_data.py 1000000
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from refurbished_car.utils.main_utils.utils import read_yaml_file, DataFrameChunkWriter, load_dataframe
+
+SCHEMA_FILE_PATH = os.path.join(REPO_DIR, "data_schema", "schema.yaml")
+DATASET_FILE_PATH = os.path.join(REPO_DIR, "dataset", "cardekho_imputated.csv")
+DATA_DIR = os.path.join(REPO_DIR, "benchmarks", ".data")
+
+ID_COLUMN = "Unnamed: 0"
+NOISY_COLUMNS = {"km_driven": 0.10, "selling_price": 0.05, "mileage": 0.02, "max_power": 0.02}
+CHUNK_SIZE = 1_000_000
+
+
+def _generate_chunk(seed_rows: pd.DataFrame, schema_columns: dict, n_rows: int, start_id: int,
+                    rng: np.random.Generator) -> pd.DataFrame:
+    chunk = seed_rows.iloc[rng.integers(0, len(seed_rows), size=n_rows)].reset_index(drop=True)
+    for column, sigma in NOISY_COLUMNS.items():
+        if column in chunk.columns:
+            chunk[column] = chunk[column] * rng.lognormal(0.0, sigma, size=n_rows)
+    for column, dtype in schema_columns.items():
+        if column == ID_COLUMN:
+            chunk[column] = np.arange(start_id, start_id + n_rows)
+        elif column not in chunk.columns:
+            # schema column missing from the seed dataset: fill by dtype
+            if dtype == "object":
+                chunk[column] = pd.Series(rng.integers(0, 20, size=n_rows)).map(lambda i: f"{column}_{i}")
+            else:
+                chunk[column] = rng.integers(0, 1000, size=n_rows)
+        if dtype.startswith("int"):
+            chunk[column] = np.round(chunk[column]).astype(dtype)
+    return chunk[list(schema_columns)]
+
+
+def synthetic_file_path(n_rows: int, seed: int = 42) -> str:
+    return os.path.join(DATA_DIR, f"synthetic_{n_rows}_{seed}.parquet")
+
+
+def generate_synthetic_dataset(n_rows: int, seed: int = 42) -> str:
+    """
+    Write n_rows synthetic listings to benchmarks/.data, in chunks so 10M rows fit in memory,
+    and return the file path. Reuses the file when it already exists
+    """
+    file_path = synthetic_file_path(n_rows, seed)
+    if os.path.exists(file_path):
+        return file_path
+    schema_columns = read_yaml_file(SCHEMA_FILE_PATH)["columns"]
+    seed_rows = pd.read_csv(DATASET_FILE_PATH)
+    rng = np.random.default_rng(seed)
+    os.makedirs(DATA_DIR, exist_ok=True)
+    partial_file_path = file_path.replace(".parquet", ".partial.parquet")  # an interrupted run never leaves a truncated dataset
+    with DataFrameChunkWriter(partial_file_path, schema_columns) as writer:
+        for start in range(0, n_rows, CHUNK_SIZE):
+            writer.write(_generate_chunk(seed_rows, schema_columns, min(CHUNK_SIZE, n_rows - start), start, rng))
+    os.replace(partial_file_path, file_path)
+    return file_path
+
+
+def load_synthetic_dataset(n_rows: int, seed: int = 42) -> pd.DataFrame:
+    schema_columns = read_yaml_file(SCHEMA_FILE_PATH)["columns"]
+    return load_dataframe(generate_synthetic_dataset(n_rows, seed), schema_columns=schema_columns)
+
+
+if __name__ == "__main__":
+    for rows in sys.argv[1:] or ["15000"]:
+        print(generate_synthetic_dataset(int(rows)))
@@ -5,15 +5,18 @@ import yaml
 csv_file = "cardekho_imputated.csv"  # Change this to your actual CSV file name
 df = pd.read_csv(csv_file)
 
-# Assuming all columns are numerical (int64) as per your tutor's format
+# Record the real dtype of every column so the pipeline can enforce it when writing artifacts
+numerical_columns = list(df.select_dtypes(include="number").columns)
+categorical_columns = [col for col in df.columns if col not in numerical_columns]
 schema = {
-    "columns": {col: "int64" for col in df.columns},
-    "numerical_columns": list(df.columns)
+    "columns": {col: ("object" if col in categorical_columns else str(df[col].dtype)) for col in df.columns},
+    "numerical_columns": numerical_columns,
+    "categorical_columns": categorical_columns,
 }
 
 # Save schema to YAML file
 yaml_file = "schema.yaml"
 with open(yaml_file, "w") as f:
-    yaml.dump(schema, f, default_flow_style=False)
+    yaml.dump(schema, f, default_flow_style=False, sort_keys=False)
 
 print(f"✅ schema.yaml generated successfully from {csv_file}!")
@@ -1,59 +1,194 @@
 import os
 import sys
 import json
-
-from dotenv import load_dotenv # Use to load the .env(environment variable) file 
-load_dotenv() # initialize the .env file
-
-MONGO_DB_URL=os.getenv("MONGO_DB_URL") # Get the environment variable from the .env file
-print(MONGO_DB_URL)
-
-import certifi # Use to get the path of the certificate file to connect with the mongodb with ssl or tls in a secure way
-ca=certifi.where() #retreve the path of the bundel of certificates and store it in ca 
+import time
+import hashlib
+import argparse
+from collections import deque
+from datetime import datetime,timezone
+from concurrent.futures import ThreadPoolExecutor
 
 import pandas as pd
 import numpy as np
 import pymongo
+from pymongo import ReplaceOne
+from pymongo.errors import BulkWriteError
 from refurbished_car.exception.exception import RefurbishedCarException # Import the custom exception class
 from refurbished_car.logging.logger import logging # Import the custom logger class
+from refurbished_car.constant.training_pipeline import SCHEMA_FILE_PATH,DATA_INGESTION_UPDATED_AT_FIELD,DATA_INGESTION_CONTENT_HASH_FIELD
+from refurbished_car.utils.main_utils.utils import read_yaml_file,iter_dataframe_chunks
+from refurbished_car.data_access.mongo_client import get_mongo_client # pooled client, the connection url and tls settings live there
+
+LOADER_BATCH_SIZE=10000 # documents per insert_many / bulk_write call
+LOADER_WRITERS=4 # concurrent writer threads, each borrowing one connection from the shared pool
+LOADER_LOGGED_WRITE_ERRORS=10 # write errors logged per failed batch, the rest are only counted
+
+
+def dataframe_to_documents(dataframe:pd.DataFrame)->list:
+    """
+    Turn a typed dataframe into mongodb documents directly, column by column: .tolist() gives
+    native python int/float/str values and missing values become None, without the json round trip
+    """
+    columns=[]
+    for column in dataframe.columns:
+        series=dataframe[column]
+        values=series.tolist()
+        missing=series.isna()
+        if missing.any():
+            values=[None if is_missing else value for value,is_missing in zip(values,missing.tolist())]
+        columns.append(values)
+    names=list(dataframe.columns)
+    return [dict(zip(names,row)) for row in zip(*columns)]
+
+
+def content_hash(document:dict)->str:
+    """
+    Digest of a document's listing values, without the bookkeeping fields, so a reload can tell an unchanged listing from an edited one
+    """
+    content={name:value for name,value in document.items() if name not in ("_id",DATA_INGESTION_UPDATED_AT_FIELD,DATA_INGESTION_CONTENT_HASH_FIELD)}
+    return hashlib.sha256(json.dumps(content,sort_keys=True,default=str).encode()).hexdigest()
+
 
 class CarDataExtract():
-    def __init__(self):
+    def __init__(self,batch_size:int=LOADER_BATCH_SIZE,n_writers:int=LOADER_WRITERS):
         try:
-            pass
+            self.batch_size=batch_size
+            self.n_writers=n_writers
+            self.schema_columns=read_yaml_file(SCHEMA_FILE_PATH)["columns"] # documents are written with the schema.yaml dtypes
         except Exception as e:
-            raise RefurbishedCarException(e,sys) 
-        
+            raise RefurbishedCarException(e,sys)
+
+    def iter_document_batches(self,file_path):
+        """
+        Read the csv in chunks of batch_size rows and yield each chunk as a list of typed documents
+        """
+        try:
+            for chunk in iter_dataframe_chunks(file_path,self.batch_size,schema_columns=self.schema_columns):
+                yield dataframe_to_documents(chunk)
+        except Exception as e:
+            raise RefurbishedCarException(e,sys)
+
     def csv_to_json_convertor(self,file_path):
         try:
-            data=pd.read_csv(file_path)
-            data.reset_index(drop=True,inplace=True) # Reset the index of the dataframe
-            records=list(json.loads(data.T.to_json()).values()) #data.T.to_json() convert the dataframe to json where .T is used for transpose of data and .values() convert the json to list
-            return records
+            return [document for batch in self.iter_document_batches(file_path) for document in batch]
         except Exception as e:
             raise RefurbishedCarException(e,sys)
-        
-    def insert_data_mongodb(self,records,database,collection): 
+
+    @staticmethod
+    def read_content_hashes(collection,documents:list,upsert_key:list)->dict:
+        """
+        Content hash stored for each natural key of the batch that is already in the collection
+        return: dict key tuple -> content hash (None for documents loaded before content hashes were stored)
+        """
+        if len(upsert_key)==1:
+            query={upsert_key[0]:{"$in":[document[upsert_key[0]] for document in documents]}}
+        else:
+            query={"$or":[{key:document[key] for key in upsert_key} for document in documents]}
+        projection={key:1 for key in upsert_key}
+        projection.update({DATA_INGESTION_CONTENT_HASH_FIELD:1,"_id":0})
+        return {
+            tuple(stored.get(key) for key in upsert_key):stored.get(DATA_INGESTION_CONTENT_HASH_FIELD)
+            for stored in collection.find(query,projection)
+        }
+
+    @staticmethod
+    def write_batch(collection,documents:list,upsert_key:list=None)->int:
+        """
+        Unordered write of one batch: a failed document does not stop the rest of the batch, it is
+        logged and the documents that were written are still counted.
+        With upsert_key every new or changed document replaces the one with the same natural key, so reloading a dump
+        is idempotent; a document whose content hash is unchanged is left alone and counted as written.
+        Written documents are stamped with the write time in DATA_INGESTION_UPDATED_AT_FIELD, the watermark of incremental
+        ingestion, so a reload of an unchanged dump does not make the next incremental run refetch every listing
+        return: number of documents written
+        """
+        number_of_unchanged=0
         try:
-            self.database=database 
-            self.collection=collection
-            self.records=records
-
-            self.mongo_client=pymongo.MongoClient(MONGO_DB_URL) # Connect with the mongodb using the url via pymongo
-            self.database = self.mongo_client[self.database] # assign to this which database you want to connect 
-            self.collection=self.database[self.collection] # assign to this which collection you want to connect
-            self.collection.insert_many(self.records) # insert the records into the collection
-            return(len(self.records))  # return the number of records inserted into the collection
+            updated_at=datetime.now(timezone.utc)
+            for document in documents:
+                document[DATA_INGESTION_CONTENT_HASH_FIELD]=content_hash(document)
+                document[DATA_INGESTION_UPDATED_AT_FIELD]=updated_at
+            if upsert_key is None:
+                return len(collection.insert_many(documents,ordered=False).inserted_ids)
+            stored_hashes=CarDataExtract.read_content_hashes(collection,documents,upsert_key)
+            changed=[
+                document for document in documents
+                if stored_hashes.get(tuple(document[key] for key in upsert_key))!=document[DATA_INGESTION_CONTENT_HASH_FIELD]
+            ]
+            number_of_unchanged=len(documents)-len(changed)
+            if not changed:
+                return number_of_unchanged
+            operations=[
+                ReplaceOne({key:document[key] for key in upsert_key},document,upsert=True)
+                for document in changed
+            ]
+            result=collection.bulk_write(operations,ordered=False)
+            return result.upserted_count+result.matched_count+number_of_unchanged
+        except BulkWriteError as e:
+            details=e.details
+            write_errors=details.get("writeErrors",[])
+            for write_error in write_errors[:LOADER_LOGGED_WRITE_ERRORS]:
+                logging.error(f"Document {write_error.get('index')} of the batch was not written: {write_error.get('errmsg')}")
+            for write_concern_error in details.get("writeConcernErrors",[]):
+                logging.error(f"Write concern error: {write_concern_error.get('errmsg')}")
+            logging.error(f"{len(write_errors)} of {len(documents)} documents of the batch were not written")
+            if upsert_key is None:
+                return details.get("nInserted",0)
+            return details.get("nUpserted",0)+details.get("nMatched",0)+number_of_unchanged
+
+    def load_csv_into_mongodb(self,file_path,database,collection,upsert_key:list=None)->int:
+        """
+        Stream the csv into the collection: chunks are converted while earlier batches are being
+        written by n_writers threads, with at most two batches per writer in flight so memory stays bounded
+        upsert_key: list of natural key columns, None for plain inserts
+        return: number of documents written
+        """
+        try:
+            start_time=time.perf_counter()
+            mongo_collection=get_mongo_client()[database][collection]
+            if upsert_key is not None:
+                # the upsert filter must hit an index, otherwise every document scans the collection
+                mongo_collection.create_index([(key,pymongo.ASCENDING) for key in upsert_key],unique=True)
+
+            number_of_documents=0
+            in_flight=deque()
+            with ThreadPoolExecutor(max_workers=self.n_writers) as executor:
+                for documents in self.iter_document_batches(file_path):
+                    in_flight.append(executor.submit(self.write_batch,mongo_collection,documents,upsert_key))
+                    if len(in_flight)>=2*self.n_writers:
+                        number_of_documents+=in_flight.popleft().result()
+                while in_flight:
+                    number_of_documents+=in_flight.popleft().result()
+
+            elapsed=time.perf_counter()-start_time
+            logging.info(
+                f"Loaded {number_of_documents} documents into {database}.{collection} in {elapsed:.2f}s "
+                f"({number_of_documents/max(elapsed,1e-9):.0f} docs/s) with {self.n_writers} writers"
+            )
+            return number_of_documents
+        except Exception as e:
+            raise RefurbishedCarException(e,sys)
+
+    def insert_data_mongodb(self,records,database,collection):
+        try:
+            mongo_collection=get_mongo_client()[database][collection]
+            number_of_records=0
+            for start in range(0,len(records),self.batch_size):
+                number_of_records+=self.write_batch(mongo_collection,records[start:start+self.batch_size])
+            return number_of_records  # return the number of records inserted into the collection
         except Exception as e:
             raise RefurbishedCarException (e,sys)
-        
+
 if __name__=='__main__': #it is used to run the code only when the file is run directly not when it is imported in another file
-    FILE_PATH="dataset/cardekho_imputated.csv"
-    DATABASE="CardekhoData"
-    Collection="RefurbishedCarData"
-    networkobj=CarDataExtract() 
-    records=networkobj.csv_to_json_convertor(file_path=FILE_PATH)
-    print(records) 
-    no_of_records=networkobj.insert_data_mongodb(records,DATABASE,Collection)
+    parser=argparse.ArgumentParser(description="Load a CarDekho csv dump into mongodb")
+    parser.add_argument("--file-path",default="dataset/cardekho_imputated.csv")
+    parser.add_argument("--database",default="CardekhoData")
+    parser.add_argument("--collection",default="RefurbishedCarData")
+    parser.add_argument("--batch-size",type=int,default=LOADER_BATCH_SIZE)
+    parser.add_argument("--writers",type=int,default=LOADER_WRITERS)
+    parser.add_argument("--upsert-key",nargs="+",default=None,help="natural key columns, reloads replace instead of duplicating")
+    args=parser.parse_args()
+
+    networkobj=CarDataExtract(batch_size=args.batch_size,n_writers=args.writers)
+    no_of_records=networkobj.load_csv_into_mongodb(args.file_path,args.database,args.collection,upsert_key=args.upsert_key)
     print(no_of_records)
-        
\ No newline at end of file
@@ -8,24 +8,126 @@ from refurbished_car.entity.config_entity import DataIngestionConfig
 from refurbished_car.entity.artifact_entity import DataIngestionArtifact
 import os
 import sys
+import time
+import math
+import itertools
+from datetime import datetime,timedelta,timezone
 import numpy as np
 import pandas as pd
 import pymongo
 from typing import List
-from sklearn.model_selection import train_test_split
-from dotenv import load_dotenv
-load_dotenv()
-
-MONGO_DB_URL=os.getenv("MONGO_DB_URL") # reading the mongo db url from the environment variable 
+from refurbished_car.constant.training_pipeline import SCHEMA_FILE_PATH,DATA_INGESTION_DIR_NAME,TARGET_COLUMN
+from refurbished_car.utils.main_utils.utils import get_peak_rss_mb,read_yaml_file,write_yaml_file
+from refurbished_car.utils.main_utils.utils import DataFrameChunkWriter,save_dataframe,load_dataframe,iter_dataframe_chunks,enforce_schema
+from refurbished_car.utils.main_utils.instrumentation import instrument_stage,add_stage_metrics
+from refurbished_car.utils.main_utils.schema_validation import build_column_rules,validate_dataframe,describe_failures
+from refurbished_car.data_access.mongo_client import get_mongo_client
 
 
 class DataIngestion:
     def __init__(self,data_ingestion_config:DataIngestionConfig):# inherit the DataIngestionConfig class from the config_entity.py file
         try:
             self.data_ingestion_config=data_ingestion_config# this will have all the configuration related to the data ingestion since we are inheriting the DataIngestionConfig class
+            self._schema_config=read_yaml_file(SCHEMA_FILE_PATH) # dtypes enforced when the artifacts are written
+            self._column_rules=build_column_rules(self._schema_config)
+            self.number_of_invalid_rows=0
+            self._window_start=None
+            if self.data_ingestion_config.incremental:
+                self.check_incremental_config()
         except Exception as e:
             raise RefurbishedCarException(e,sys)
+
+    def check_incremental_config(self)->None:
+        """
+        Fail before touching mongodb when incremental ingestion could silently lose or duplicate listings
+        """
+        config=self.data_ingestion_config
+        if not config.listing_key_columns:
+            raise ValueError("Incremental ingestion needs DATA_INGESTION_LISTING_KEY_COLUMNS, without a listing key a changed listing is stored twice")
+        missing_columns=[column for column in config.listing_key_columns if column not in self._schema_config["columns"]]
+        if missing_columns:
+            raise ValueError(f"DATA_INGESTION_LISTING_KEY_COLUMNS {missing_columns} are not schema.yaml columns")
+        if config.watermark_field=="_id":
+            raise ValueError("Incremental ingestion needs DATA_INGESTION_WATERMARK_FIELD set to an updated-at field, _id only grows on insert so edited listings would be missed")
         
+    def window_start(self):
+        """
+        Start of the recent-days window, resolved once per ingestion so the stage cache key and the export use the same window
+        """
+        if self._window_start is None:
+            since=datetime.now(timezone.utc)-timedelta(days=self.data_ingestion_config.recent_days)
+            if self.data_ingestion_config.date_field=="_id":
+                from bson import ObjectId
+                since=ObjectId.from_datetime(since) # an ObjectId starts with its creation time
+            self._window_start=since
+        return self._window_start
+
+    def build_aggregation_pipeline(self,query:dict=None)->list:
+        """
+        Aggregation pipeline pushing the configured filter, recent-days window, $sample, sort, projection
+        and type coercions down to mongodb. query (the incremental watermark) is and-ed with the filter
+        """
+        try:
+            config=self.data_ingestion_config
+            watermark_field=config.watermark_field
+            conditions=[condition for condition in (config.query_filter,query) if condition]
+            if config.recent_days is not None:
+                conditions.append({config.date_field:{"$gte":self.window_start()}})
+
+            pipeline=[]
+            if conditions:
+                pipeline.append({"$match":conditions[0] if len(conditions)==1 else {"$and":conditions}})
+            if config.sample_size is not None:
+                if config.incremental:
+                    raise ValueError("DATA_INGESTION_SAMPLE_SIZE cannot be combined with incremental ingestion, the watermark would skip unsampled documents")
+                pipeline.append({"$sample":{"size":config.sample_size}})
+            if config.sort_key_columns:
+                # insert order changes between loads (push_data.py writes concurrently), the listing key does not
+                pipeline.append({"$sort":{column:1 for column in config.sort_key_columns}})
+            if config.projection is not None:
+                fields={field:1 for field in config.projection}
+                if config.incremental:
+                    fields[watermark_field]=1 # the watermark is needed to resume
+                fields["_id"]=0
+                pipeline.append({"$project":fields})
+            else:
+                pipeline.append({"$project":{"_id":0}}) # never trained on, and incremental ingestion does not use it as its watermark
+            if config.type_coercions:
+                # an unparseable value is kept as it is, not nulled, so route_invalid_rows can send it to invalid/
+                na_values=config.na_values or []
+                pipeline.append({"$set":{
+                    field:{"$convert":{
+                        "input":{"$cond":[{"$in":[f"${field}",na_values]},None,f"${field}"]},
+                        "to":to_type,
+                        "onError":f"${field}",
+                        "onNull":None,
+                    }}
+                    for field,to_type in config.type_coercions.items()
+                }})
+            return pipeline
+        except Exception as e:
+            raise RefurbishedCarException(e,sys)
+
+    def route_invalid_rows(self,dataframe:pd.DataFrame,invalid_writer:DataFrameChunkWriter)->pd.DataFrame:
+        """
+        Send the rows whose raw values do not parse as their schema.yaml dtype to invalid_writer, as text with
+        the failed checks in a validation_errors column. This runs on the raw documents because the artifacts
+        are written through enforce_schema, which turns such values into missing ones that data validation
+        could no longer tell apart from real gaps; the other checks stay in data validation
+        return: the remaining rows
+        """
+        try:
+            invalid,failures,_=validate_dataframe(dataframe,self._column_rules,checks=("dtype",))
+            if not invalid.any():
+                return dataframe
+            invalid_dataframe=dataframe[invalid].astype("string")
+            invalid_dataframe["validation_errors"]=describe_failures(failures,invalid)
+            invalid_writer.write(invalid_dataframe)
+            self.number_of_invalid_rows+=int(invalid.sum())
+            return dataframe[~invalid]
+        except Exception as e:
+            raise RefurbishedCarException(e,sys)
+
     def export_collection_as_dataframe(self):
         """
         Read data from mongodb
@@ -33,73 +135,383 @@ class DataIngestion:
         try:
             database_name=self.data_ingestion_config.database_name # reading the database name from the data_ingestion_config WHICH IS INHERITED FROM THE DataIngestionConfig class of config_entity.py file
             collection_name=self.data_ingestion_config.collection_name # reading the collection name from the data_ingestion_config WHICH IS INHERITED FROM THE DataIngestionConfig class of config_entity.py file
-            self.mongo_client=pymongo.MongoClient(MONGO_DB_URL)
+            self.mongo_client=get_mongo_client() # shared pooled client, no new connection per call
             collection=self.mongo_client[database_name][collection_name]# reading the collection from the database which is present in the mongodb
 
-            df=pd.DataFrame(list(collection.find()))# reading the data from the collection and converting it into the dataframe
-            if "_id" in df.columns.to_list():# checking if the _id column is present in the dataframe
-                df=df.drop(columns=["_id"],axis=1)# if present then drop the column
+            df=pd.DataFrame(list(collection.aggregate(self.build_aggregation_pipeline(),allowDiskUse=True)))# only the filtered rows and projected fields are sent by the server
+            drop_columns={"_id",self.data_ingestion_config.updated_at_field,self.data_ingestion_config.content_hash_field}-set(self._schema_config["columns"]) # bookkeeping fields, not features
+            df=df.drop(columns=[column for column in drop_columns if column in df.columns])
             
             df.replace({"na":np.nan},inplace=True) # replace the na values with the np.nan values
+            with DataFrameChunkWriter(self.data_ingestion_config.invalid_file_path) as invalid_writer:
+                df=self.route_invalid_rows(df,invalid_writer).reset_index(drop=True)
             return df
         except Exception as e:
-            raise RefurbishedCarException
+            raise RefurbishedCarException(e,sys)
+
+    def stream_collection_into_feature_store(self,query:dict=None,feature_store_file_path:str=None)->int:
+        """
+        Page through the mongodb collection in batches and write each batch straight
+        to the feature store file, so the whole collection is never held in memory.
+        The highest watermark field value seen is kept in self.latest_watermark.
+        Returns the number of rows written
+        """
+        try:
+            start_time=time.perf_counter()
+            database_name=self.data_ingestion_config.database_name
+            collection_name=self.data_ingestion_config.collection_name
+            batch_size=self.data_ingestion_config.export_batch_size
+            watermark_field=self.data_ingestion_config.watermark_field
+            if feature_store_file_path is None:
+                feature_store_file_path=self.data_ingestion_config.feature_store_file_path
+
+            self.mongo_client=get_mongo_client() # shared pooled client, no new connection per call
+            collection=self.mongo_client[database_name][collection_name]
+            cursor=collection.aggregate(self.build_aggregation_pipeline(query),batchSize=batch_size,allowDiskUse=True)
+
+            self.latest_watermark=None
+            columns=None
+            drop_columns={"_id",self.data_ingestion_config.updated_at_field,self.data_ingestion_config.content_hash_field} # bookkeeping fields written by push_data.py, not features
+            if self.data_ingestion_config.incremental:
+                drop_columns.add(watermark_field) # fetched to resume from, not a feature
+            drop_columns-=set(self._schema_config["columns"])
+            number_of_rows=0
+            with DataFrameChunkWriter(feature_store_file_path,schema_columns=self._schema_config["columns"]) as writer, \
+                 DataFrameChunkWriter(self.data_ingestion_config.invalid_file_path) as invalid_writer:
+                while True:
+                    batch=list(itertools.islice(cursor,batch_size))
+                    if not batch:
+                        break
+                    batch_watermarks=[doc[watermark_field] for doc in batch if doc.get(watermark_field) is not None]
+                    if batch_watermarks:
+                        batch_watermark=max(batch_watermarks)
+                        if self.latest_watermark is None or batch_watermark>self.latest_watermark:
+                            self.latest_watermark=batch_watermark
+                    df=pd.DataFrame.from_records(batch,columns=columns) # keep the column order of the first batch
+                    df=df.drop(columns=[column for column in drop_columns if column in df.columns])
+                    columns=df.columns.to_list()
+                    df.replace({"na":np.nan},inplace=True)
+                    df=self.route_invalid_rows(df,invalid_writer)
+                    writer.write(df)
+                    number_of_rows+=len(df)
+                    logging.info(f"Exported batch of {len(df)} rows, {number_of_rows} rows so far")
+
+            elapsed=time.perf_counter()-start_time
+            logging.info(
+                f"Streamed {number_of_rows} rows into feature store in {elapsed:.2f}s "
+                f"({number_of_rows/max(elapsed,1e-9):.0f} rows/s), peak rss {get_peak_rss_mb()} MB"
+            )
+            return number_of_rows
+        except Exception as e:
+            raise RefurbishedCarException(e,sys)
         
+    def read_watermark(self):
+        """
+        Watermark persisted by the last incremental run, None when there is none yet
+        """
+        try:
+            watermark_file_path=self.data_ingestion_config.watermark_file_path
+            if not os.path.exists(watermark_file_path):
+                return None
+            watermark=read_yaml_file(watermark_file_path)
+            if watermark["field"]!=self.data_ingestion_config.watermark_field:
+                raise ValueError(
+                    f"Stored watermark is on [{watermark['field']}] but ingestion is configured for "
+                    f"[{self.data_ingestion_config.watermark_field}], remove {watermark_file_path} to re-export"
+                )
+            if watermark["is_object_id"]:
+                from bson import ObjectId
+                return ObjectId(watermark["value"])
+            return watermark["value"]
+        except Exception as e:
+            raise RefurbishedCarException(e,sys)
+
+    def write_watermark(self,value)->None:
+        try:
+            from bson import ObjectId
+            is_object_id=isinstance(value,ObjectId)
+            write_yaml_file(
+                file_path=self.data_ingestion_config.watermark_file_path,
+                content={
+                    "field":self.data_ingestion_config.watermark_field,
+                    "value":str(value) if is_object_id else value,
+                    "is_object_id":is_object_id,
+                },
+                replace=True,
+            )
+        except Exception as e:
+            raise RefurbishedCarException(e,sys)
+
+    def get_source_fingerprint(self)->dict:
+        """
+        Summary of the documents an export would read, used as the input key of the ingestion stage cache:
+        the resolved aggregation pipeline (filter, recent-days window, projection, coercions), the number of
+        matching documents and their highest updated-at value. An edit is only seen when its writer also moves
+        the updated-at field (push_data.py stamps it on every write), which is why DATA_INGESTION_USE_STAGE_CACHE
+        is off by default.
+        return: None when the export is not repeatable ($sample) or a matching document has no updated-at value
+        """
+        try:
+            config=self.data_ingestion_config
+            if config.sample_size is not None:
+                return None
+            self.mongo_client=get_mongo_client() # shared pooled client, no new connection per call
+            collection=self.mongo_client[config.database_name][config.collection_name]
+            pipeline=self.build_aggregation_pipeline()
+            match=pipeline[0]["$match"] if "$match" in pipeline[0] else {}
+            updated_at_field=config.updated_at_field
+            if collection.count_documents({"$and":[match,{updated_at_field:None}]}):
+                logging.info(f"Documents without [{updated_at_field}] found, the ingestion stage is not cached")
+                return None
+            latest=collection.find_one(match,{updated_at_field:1},sort=[(updated_at_field,pymongo.DESCENDING)])
+            return {
+                "database":config.database_name,
+                "collection":config.collection_name,
+                "pipeline":pipeline,
+                "number_of_documents":collection.count_documents(match),
+                "latest_updated_at":None if latest is None else str(latest[updated_at_field]),
+            }
+        except Exception as e:
+            raise RefurbishedCarException(e,sys)
+
+    def list_feature_store_parts(self)->List[str]:
+        """
+        Part files of the persistent incremental feature store, oldest first
+        """
+        parts_dir=self.data_ingestion_config.incremental_parts_dir
+        if not os.path.isdir(parts_dir):
+            return []
+        return [os.path.join(parts_dir,file_name) for file_name in sorted(os.listdir(parts_dir)) if file_name.startswith("part-")]
+
+    def export_incremental_into_feature_store(self)->int:
+        """
+        Fetch only the documents past the stored watermark and write them as a new part of the
+        persistent feature store, the stored parts are never read back or rewritten here.
+        The part is renamed into place once complete and the watermark only moves forward after that;
+        a run that dies in between fetches the same documents again and the listing key keeps one copy
+        return: number of rows in the new part
+        """
+        try:
+            watermark=self.read_watermark()
+            watermark_field=self.data_ingestion_config.watermark_field
+            query={} if watermark is None else {watermark_field:{"$gt":watermark}}
+            logging.info(f"Incremental ingestion from watermark {watermark_field}={watermark}")
+
+            parts_dir=self.data_ingestion_config.incremental_parts_dir
+            part_file_paths=self.list_feature_store_parts()
+            index=int(os.path.splitext(os.path.basename(part_file_paths[-1]))[0][len("part-"):])+1 if part_file_paths else 0
+            part_file_name=f"part-{index:06d}{self.data_ingestion_config.artifact_file_extension}"
+            temp_file_path=os.path.join(parts_dir,"."+part_file_name) # not listed as a part until it is complete
+            number_of_rows=self.stream_collection_into_feature_store(query=query,feature_store_file_path=temp_file_path)
+
+            if number_of_rows>0:
+                part_file_path=os.path.join(parts_dir,part_file_name)
+                os.replace(temp_file_path,part_file_path)
+                part_file_paths.append(part_file_path)
+                logging.info(f"Appended {number_of_rows} new or changed rows as {part_file_path}, feature store has {len(part_file_paths)} parts")
+            else:
+                if os.path.exists(temp_file_path):
+                    os.remove(temp_file_path)
+                if not part_file_paths:
+                    raise ValueError(f"No rows exported and no feature store parts found in {parts_dir}")
+                logging.info("No new rows past the watermark, reusing the stored feature store parts")
+            if self.latest_watermark is not None:
+                self.write_watermark(self.latest_watermark)
+            return number_of_rows
+        except Exception as e:
+            raise RefurbishedCarException(e,sys)
+
+    def listing_key_hashes(self,dataframe:pd.DataFrame)->np.ndarray:
+        keys=dataframe[self.data_ingestion_config.listing_key_columns]
+        # an int64 column comes back as float64 from a chunk with missing values, hash every number as a float
+        keys=keys.apply(lambda column:column.astype("float64") if pd.api.types.is_numeric_dtype(column) else column.astype(object))
+        return pd.util.hash_pandas_object(keys,index=False).to_numpy()
+
+    def iter_feature_store_parts(self,chunk_size:int):
+        """
+        Yield the incremental feature store, oldest part first, in chunks of at most chunk_size rows.
+        A listing stored in several parts is only yielded from the latest one: a first pass from the
+        newest part to the oldest keeps the hashes of the listing keys already seen
+        """
+        try:
+            schema_columns=self._schema_config["columns"]
+            part_file_paths=self.list_feature_store_parts()
+            keep_masks={}
+            seen=np.empty(0,dtype="uint64")
+            for part_file_path in reversed(part_file_paths):
+                hashes=[self.listing_key_hashes(chunk) for chunk in iter_dataframe_chunks(part_file_path,chunk_size,schema_columns=schema_columns)]
+                hashes=np.concatenate(hashes) if hashes else np.empty(0,dtype="uint64")
+                keep_masks[part_file_path]=~pd.Series(hashes).duplicated(keep="last").to_numpy() & ~np.isin(hashes,seen)
+                seen=np.union1d(seen,hashes)
+            number_of_superseded_rows=sum(int((~keep).sum()) for keep in keep_masks.values())
+            logging.info(f"Reading {len(part_file_paths)} feature store parts, skipping {number_of_superseded_rows} superseded listing versions")
+
+            for part_file_path in part_file_paths:
+                keep=keep_masks[part_file_path]
+                offset=0
+                for chunk in iter_dataframe_chunks(part_file_path,chunk_size,schema_columns=schema_columns):
+                    chunk_keep=keep[offset:offset+len(chunk)]
+                    offset+=len(chunk)
+                    yield chunk[chunk_keep]
+        except Exception as e:
+            raise RefurbishedCarException(e,sys)
+
     def export_data_into_feature_store(self,dataframe: pd.DataFrame):
         """
-        Export the data into the feature store file path as csv from mongodb
+        Export the data into the feature store file path (csv, parquet or feather) from mongodb
         """
         try:
             feature_store_file_path=self.data_ingestion_config.feature_store_file_path 
-            #creating folder
-            dir_path = os.path.dirname(feature_store_file_path)
-            os.makedirs(dir_path,exist_ok=True)
-            dataframe.to_csv(feature_store_file_path,index=False,header=True)
+            save_dataframe(feature_store_file_path,dataframe,schema_columns=self._schema_config["columns"])
             return dataframe
             
         except Exception as e:
             raise RefurbishedCarException(e,sys)
         
-    def split_data_as_train_test(self,dataframe: pd.DataFrame):
-        try:
-            train_set, test_set = train_test_split(
-                dataframe, test_size=self.data_ingestion_config.train_test_split_ratio
-            )
-            logging.info("Performed train test split on the dataframe")
+    def split_hash(self,dataframe:pd.DataFrame)->np.ndarray:
+        """
+        Seeded hash of each row's listing key mapped to [0, 1). It only depends on the key values,
+        so a listing lands on the same side in every run and after every incremental load.
+        Without split key columns the whole row is hashed, so editing any value (e.g. a price drop)
+        can move a listing between train and test
+        """
+        key_columns=self.data_ingestion_config.split_key_columns or list(dataframe.columns)
+        hash_key=f"{self.data_ingestion_config.split_seed:016d}"[-16:]
+        hashes=pd.util.hash_pandas_object(dataframe[key_columns],index=False,hash_key=hash_key).to_numpy()
+        return (hashes>>np.uint64(11)).astype("float64")/float(1<<53)
 
-            logging.info(
-                "Exited split_data_as_train_test method of Data_Ingestion class"
-            )
-            
+    def split_strata(self,dataframe:pd.DataFrame)->np.ndarray:
+        stratify=self.data_ingestion_config.split_stratify
+        if stratify=="price":
+            price=dataframe[TARGET_COLUMN].to_numpy(dtype="float64",na_value=np.nan)
+            strata=np.searchsorted(self._price_bin_edges,price,side="right")
+            strata[np.isnan(price)]=-1
+            return strata
+        return dataframe[stratify].astype(object).where(dataframe[stratify].notna(),"__missing__").to_numpy()
+
+    def fit_stratified_split(self,chunks)->None:
+        """
+        First pass of a stratified split. The price band edges are the quantiles of every price, and
+        each stratum sends to test its round(rows*ratio) rows with the lowest hash. Both only depend
+        on which rows are exported, not on their order or chunking, so every listing lands on the
+        same side whatever order the export comes in. Only the hash (and price) of each row is kept
+        """
+        stratify=self.data_ingestion_config.split_stratify
+        hashes,values=[],[]
+        for chunk in chunks:
+            hashes.append(self.split_hash(chunk))
+            if stratify=="price":
+                values.append(chunk[TARGET_COLUMN].to_numpy(dtype="float64",na_value=np.nan))
+            else:
+                values.append(self.split_strata(chunk))
+        hashes=np.concatenate(hashes) if hashes else np.empty(0,dtype="float64")
+        if stratify=="price":
+            price=np.concatenate(values) if values else np.empty(0,dtype="float64")
+            probabilities=np.linspace(0,1,self.data_ingestion_config.split_price_bins+1)[1:-1]
+            self._price_bin_edges=np.nanquantile(price,probabilities) if np.isfinite(price).any() else np.empty(0)
+            strata=np.searchsorted(self._price_bin_edges,price,side="right")
+            strata[np.isnan(price)]=-1
+        else:
+            strata=np.concatenate(values) if values else np.empty(0,dtype=object)
+
+        ratio=self.data_ingestion_config.train_test_split_ratio
+        codes,uniques=pd.factorize(strata)
+        self._test_thresholds={}
+        for code,stratum in enumerate(uniques):
+            stratum_hashes=hashes[codes==code]
+            n_test=math.floor(len(stratum_hashes)*ratio+0.5)
+            self._test_thresholds[stratum]=np.partition(stratum_hashes,n_test-1)[n_test-1] if n_test else -np.inf
+
+    def assign_test_rows(self,dataframe:pd.DataFrame)->np.ndarray:
+        """
+        A row goes to test when its hash is below the split ratio, or when stratifying, when it is
+        at or below its stratum's threshold from fit_stratified_split
+        """
+        hashes=self.split_hash(dataframe)
+        if not self.data_ingestion_config.split_stratify:
+            return hashes<self.data_ingestion_config.train_test_split_ratio
+        thresholds=pd.Series(self.split_strata(dataframe)).map(self._test_thresholds).to_numpy(dtype="float64")
+        return hashes<=thresholds
+
+    def iter_split_chunks(self,dataframe:pd.DataFrame=None):
+        """
+        Yield the rows to split in chunks with the schema dtypes, a fresh pass on every call
+        """
+        schema_columns=self._schema_config["columns"]
+        chunk_size=self.data_ingestion_config.export_batch_size
+        if dataframe is not None:
+            chunks=(dataframe.iloc[start:start+chunk_size] for start in range(0,len(dataframe),chunk_size))
+        elif self.data_ingestion_config.incremental:
+            chunks=self.iter_feature_store_parts(chunk_size)
+        else:
+            chunks=iter_dataframe_chunks(self.data_ingestion_config.feature_store_file_path,chunk_size,schema_columns=schema_columns)
+        for chunk in chunks:
+            yield enforce_schema(chunk,schema_columns) # hashes depend on dtypes, hash what is written
+
+    def split_data_as_train_test(self,dataframe: pd.DataFrame=None):
+        """
+        Split over chunks, writing each side straight to its file so memory stays flat.
+        A stratified split reads the input twice, see fit_stratified_split.
+        dataframe: split this dataframe (in slices), None streams the feature store file (its parts when incremental) instead
+        return: tuple (train rows, test rows)
+        """
+        try:
+            schema_columns=self._schema_config["columns"]
             dir_path = os.path.dirname(self.data_ingestion_config.training_file_path)
-            
             os.makedirs(dir_path, exist_ok=True)
-            
             logging.info(f"Exporting train and test file path.")
-            
-            train_set.to_csv(
-                self.data_ingestion_config.training_file_path, index=False, header=True
-            )
 
-            test_set.to_csv(
-                self.data_ingestion_config.testing_file_path, index=False, header=True
+            self._test_thresholds={}
+            if self.data_ingestion_config.split_stratify:
+                self.fit_stratified_split(self.iter_split_chunks(dataframe))
+            number_of_train_rows=number_of_test_rows=0
+            with DataFrameChunkWriter(self.data_ingestion_config.training_file_path,schema_columns=schema_columns) as train_writer, \
+                 DataFrameChunkWriter(self.data_ingestion_config.testing_file_path,schema_columns=schema_columns) as test_writer:
+                for chunk in self.iter_split_chunks(dataframe):
+                    is_test=self.assign_test_rows(chunk)
+                    train_writer.write(chunk[~is_test])
+                    test_writer.write(chunk[is_test])
+                    number_of_train_rows+=int((~is_test).sum())
+                    number_of_test_rows+=int(is_test.sum())
+
+            logging.info(
+                f"Performed hash split into {number_of_train_rows} train and {number_of_test_rows} test rows"
+                + (f" stratified by {self.data_ingestion_config.split_stratify} over {len(self._test_thresholds)} strata" if self._test_thresholds else "")
             )
             logging.info(f"Exported train and test file path.")
+            return number_of_train_rows,number_of_test_rows
 
-            
         except Exception as e:
             raise RefurbishedCarException(e,sys)
         
-        
+    @instrument_stage(DATA_INGESTION_DIR_NAME)
     def initiate_data_ingestion(self):
         try:
-            dataframe=self.export_collection_as_dataframe()
-            dataframe=self.export_data_into_feature_store(dataframe)
-            self.split_data_as_train_test(dataframe)
+            start_time=time.perf_counter()
+            if self.data_ingestion_config.incremental:
+                self.export_incremental_into_feature_store()
+                dataframe=None # split streams the feature store parts
+            elif self.data_ingestion_config.export_mode=="streaming":
+                self.stream_collection_into_feature_store()
+                dataframe=None # split streams the feature store file, the collection is never loaded whole
+            else:
+                dataframe=self.export_collection_as_dataframe()
+                dataframe=self.export_data_into_feature_store(dataframe)
+            export_seconds=round(time.perf_counter()-start_time,4)
+            number_of_train_rows,number_of_test_rows=self.split_data_as_train_test(dataframe)
+            add_stage_metrics(rows=number_of_train_rows+number_of_test_rows,export_seconds=export_seconds)
+            logging.info(
+                f"Data ingestion took {time.perf_counter()-start_time:.2f}s, "
+                f"peak rss {get_peak_rss_mb()} MB"
+            )
+            if self.number_of_invalid_rows:
+                logging.info(f"Routed {self.number_of_invalid_rows} rows with unparseable values to {self.data_ingestion_config.invalid_file_path}")
             dataingestionartifact=DataIngestionArtifact(trained_file_path=self.data_ingestion_config.training_file_path,
-                                                        test_file_path=self.data_ingestion_config.testing_file_path)
+                                                        test_file_path=self.data_ingestion_config.testing_file_path,
+                                                        invalid_file_path=self.data_ingestion_config.invalid_file_path if self.number_of_invalid_rows else None,
+                                                        invalid_rows=self.number_of_invalid_rows)
             return dataingestionartifact
 
         except Exception as e:
-            raise RefurbishedCarException
+            raise RefurbishedCarException(e,sys)
         
\ No newline at end of file
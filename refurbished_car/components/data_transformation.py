@@ -72,7 +72,7 @@
 #             target_feature_train_df = target_feature_train_df.replace(-1, 0)
 
 #             #testing dataframe
-#             input_feature_test_df = test_df.drop(columns=[TARGET_COLUMN], axis=1)
+#             input_feature_test_df = test_df.drop(columns=[TARGET_COLUMN])
 #             target_feature_test_df = test_df[TARGET_COLUMN]
 #             target_feature_test_df = target_feature_test_df.replace(-1, 0)
 
@@ -114,15 +114,18 @@
 
 import sys
 import os
+import time
 import numpy as np
 import pandas as pd
 from sklearn.impute import SimpleImputer
-from sklearn.preprocessing import StandardScaler, OneHotEncoder
+from sklearn.preprocessing import StandardScaler, OneHotEncoder, OrdinalEncoder
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
 
 from refurbished_car.constant.training_pipeline import TARGET_COLUMN
 from refurbished_car.constant.training_pipeline import DATA_TRANSFORMATION_IMPUTER_PARAMS
+from refurbished_car.constant.training_pipeline import SCHEMA_FILE_PATH
+from refurbished_car.constant.training_pipeline import DATA_TRANSFORMATION_DIR_NAME
 
 from refurbished_car.entity.artifact_entity import (
     DataTransformationArtifact,
@@ -132,7 +135,9 @@ from refurbished_car.entity.artifact_entity import (
 from refurbished_car.entity.config_entity import DataTransformationConfig
 from refurbished_car.exception.exception import RefurbishedCarException
 from refurbished_car.logging.logger import logging
-from refurbished_car.utils.main_utils.utils import save_numpy_array_data, save_object
+from refurbished_car.utils.main_utils.utils import save_numpy_array_data, save_object, save_sparse_matrix_data
+from refurbished_car.utils.main_utils.utils import load_dataframe, read_yaml_file
+from refurbished_car.utils.main_utils.instrumentation import instrument_stage, add_stage_metrics
 
 class DataTransformation:
     def __init__(self, data_validation_artifact: DataValidationArtifact,
@@ -140,13 +145,14 @@ class DataTransformation:
         try:
             self.data_validation_artifact = data_validation_artifact
             self.data_transformation_config = data_transformation_config
+            self._schema_config = read_yaml_file(SCHEMA_FILE_PATH)
         except Exception as e:
             raise RefurbishedCarException(e, sys)
         
     @staticmethod
-    def read_data(file_path) -> pd.DataFrame:
+    def read_data(file_path, schema_columns: dict = None) -> pd.DataFrame:
         try:
-            return pd.read_csv(file_path)
+            return load_dataframe(file_path, schema_columns=schema_columns)
         except Exception as e:
             raise RefurbishedCarException(e, sys)
         
@@ -175,13 +181,25 @@ class DataTransformation:
             )
             
             # Create preprocessing steps for categorical features
-            # Use SimpleImputer with 'most_frequent' strategy for categorical data before encoding
-            cat_pipeline = Pipeline(
-                steps=[
-                    ("imputer", SimpleImputer(strategy="most_frequent")),
-                    ("one_hot_encoder", OneHotEncoder(sparse_output=False, handle_unknown='ignore'))
-                ]
-            )
+            if self.data_transformation_config.categorical_encoding == "ordinal":
+                # One integer code per column for the boosting models' native categorical splits.
+                # Missing and unknown categories stay nan, the models route them natively, so no imputer
+                cat_pipeline = Pipeline(
+                    steps=[
+                        ("ordinal_encoder", OrdinalEncoder(
+                            handle_unknown="use_encoded_value", unknown_value=np.nan, encoded_missing_value=np.nan,
+                            max_categories=self.data_transformation_config.max_categories
+                        ))
+                    ]
+                )
+            else:
+                # Use SimpleImputer with 'most_frequent' strategy for categorical data before encoding
+                cat_pipeline = Pipeline(
+                    steps=[
+                        ("imputer", SimpleImputer(strategy="most_frequent")),
+                        ("one_hot_encoder", OneHotEncoder(sparse_output=self.data_transformation_config.sparse_output, handle_unknown='ignore'))
+                    ]
+                )
             
             # Combine both pipelines in a column transformer
             preprocessor = ColumnTransformer(
@@ -189,7 +207,8 @@ class DataTransformation:
                     ("num_pipeline", num_pipeline, numerical_columns),
                     ("cat_pipeline", cat_pipeline, categorical_columns)
                 ],
-                remainder='drop'  # Drop any columns not specified
+                remainder='drop',  # Drop any columns not specified
+                sparse_threshold=1.0 if self.data_transformation_config.sparse_output else 0.0  # keep the encoder's csr output whatever its density
             )
             
             logging.info(
@@ -200,12 +219,13 @@ class DataTransformation:
         except Exception as e:
             raise RefurbishedCarException(e, sys)
         
+    @instrument_stage(DATA_TRANSFORMATION_DIR_NAME)
     def initiate_data_transformation(self) -> DataTransformationArtifact:
         logging.info("Entered initiate_data_transformation method of DataTransformation class")
         try:
             logging.info("Starting data transformation")
-            train_df = DataTransformation.read_data(self.data_validation_artifact.valid_train_file_path)
-            test_df = DataTransformation.read_data(self.data_validation_artifact.valid_test_file_path)
+            train_df = DataTransformation.read_data(self.data_validation_artifact.valid_train_file_path, self._schema_config["columns"])
+            test_df = DataTransformation.read_data(self.data_validation_artifact.valid_test_file_path, self._schema_config["columns"])
 
             logging.info(f"Train dataframe shape: {train_df.shape}")
             logging.info(f"Test dataframe shape: {test_df.shape}")
@@ -214,11 +234,11 @@ class DataTransformation:
             logging.info(f"Train dataframe data types: {train_df.dtypes}")
 
             # Training dataframe
-            input_feature_train_df = train_df.drop(columns=[TARGET_COLUMN], axis=1)
+            input_feature_train_df = train_df.drop(columns=[TARGET_COLUMN])
             target_feature_train_df = train_df[TARGET_COLUMN]
             
             # Testing dataframe
-            input_feature_test_df = test_df.drop(columns=[TARGET_COLUMN], axis=1)
+            input_feature_test_df = test_df.drop(columns=[TARGET_COLUMN])
             target_feature_test_df = test_df[TARGET_COLUMN]
             
             # Get preprocessing object
@@ -226,7 +246,9 @@ class DataTransformation:
             
             # Fit on training data
             logging.info("Fitting preprocessor on training data")
+            fit_start_time = time.perf_counter()
             preprocessor_object = preprocessor.fit(input_feature_train_df)
+            add_stage_metrics(rows=len(train_df) + len(test_df), fit_seconds=round(time.perf_counter() - fit_start_time, 4))
             
             # Transform training and testing data
             logging.info("Transforming training and testing data")
@@ -237,25 +259,29 @@ class DataTransformation:
             logging.info(f"Transformed train data shape: {transformed_input_train_feature.shape}")
             logging.info(f"Transformed test data shape: {transformed_input_test_feature.shape}")
             
-            # Combine features and target
-            train_arr = np.c_[transformed_input_train_feature, np.array(target_feature_train_df)]
-            test_arr = np.c_[transformed_input_test_feature, np.array(target_feature_test_df)]
-            
             # Save transformed data and preprocessor object
             logging.info("Saving transformed data and preprocessor object")
-            save_numpy_array_data(self.data_transformation_config.transformed_train_file_path, array=train_arr)
-            save_numpy_array_data(self.data_transformation_config.transformed_test_file_path, array=test_arr)
+            # Features and target are saved as separate arrays, so the trainer can memory-map
+            # them and never has to slice (and copy) the target out of the features
+            if self.data_transformation_config.sparse_output:
+                # Features stay in CSR so nothing is densified
+                save_sparse_matrix_data(self.data_transformation_config.transformed_train_file_path, transformed_input_train_feature)
+                save_sparse_matrix_data(self.data_transformation_config.transformed_test_file_path, transformed_input_test_feature)
+            else:
+                save_numpy_array_data(self.data_transformation_config.transformed_train_file_path, array=np.ascontiguousarray(transformed_input_train_feature, dtype="float64"))
+                save_numpy_array_data(self.data_transformation_config.transformed_test_file_path, array=np.ascontiguousarray(transformed_input_test_feature, dtype="float64"))
+            save_numpy_array_data(self.data_transformation_config.transformed_train_target_file_path, array=np.array(target_feature_train_df))
+            save_numpy_array_data(self.data_transformation_config.transformed_test_target_file_path, array=np.array(target_feature_test_df))
+            # The trainer packs this preprocessor into the model bundle published to final_model/
             save_object(self.data_transformation_config.transformed_object_file_path, preprocessor_object)
             
-            # Also save preprocessor to final_model directory for convenience
-            os.makedirs("final_model", exist_ok=True)  # Ensure directory exists
-            save_object("final_model/preprocessor.pkl", preprocessor_object)
-            
             # Prepare artifacts
             data_transformation_artifact = DataTransformationArtifact(
                 transformed_object_file_path=self.data_transformation_config.transformed_object_file_path,
                 transformed_train_file_path=self.data_transformation_config.transformed_train_file_path,
-                transformed_test_file_path=self.data_transformation_config.transformed_test_file_path
+                transformed_test_file_path=self.data_transformation_config.transformed_test_file_path,
+                transformed_train_target_file_path=self.data_transformation_config.transformed_train_target_file_path,
+                transformed_test_target_file_path=self.data_transformation_config.transformed_test_target_file_path
             )
             
             logging.info("Data transformation completed successfully")
@@ -2,11 +2,16 @@ from refurbished_car.entity.artifact_entity import DataIngestionArtifact,DataVal
 from refurbished_car.entity.config_entity import DataValidationConfig
 from refurbished_car.exception.exception import RefurbishedCarException
 from refurbished_car.logging.logger import logging 
-from refurbished_car.constant.training_pipeline import SCHEMA_FILE_PATH
-from scipy.stats import ks_2samp # Kolmogorov-Smirnov test used to check the distribution of the data
+from refurbished_car.constant.training_pipeline import SCHEMA_FILE_PATH,DATA_VALIDATION_DIR_NAME
+from refurbished_car.utils.ml_utils.metric.drift_metric import detect_drift # KS test for numeric columns, chi-square for categorical ones
+from refurbished_car.utils.ml_utils.metric.drift_metric import build_reference_profile,detect_drift_against_profile
 import pandas as pd
-import os,sys
+import os,sys,time
 from refurbished_car.utils.main_utils.utils import read_yaml_file,write_yaml_file
+from refurbished_car.utils.main_utils.utils import load_dataframe,save_dataframe,enforce_schema,link_or_copy_file
+from refurbished_car.utils.main_utils.schema_validation import build_column_rules,validate_dataframe,describe_failures,summarize_failures
+from refurbished_car.utils.main_utils.utils import read_json_file,write_json_file
+from refurbished_car.utils.main_utils.instrumentation import instrument_stage,add_stage_metrics
 
 class DataValidation:
     def __init__(self,data_ingestion_artifact:DataIngestionArtifact,
@@ -16,19 +21,20 @@ class DataValidation:
             self.data_ingestion_artifact=data_ingestion_artifact
             self.data_validation_config=data_validation_config
             self._schema_config = read_yaml_file(SCHEMA_FILE_PATH)
+            self._column_rules = build_column_rules(self._schema_config)
         except Exception as e:
             raise RefurbishedCarException(e,sys)
         
     @staticmethod
-    def read_data(file_path)->pd.DataFrame:
+    def read_data(file_path,schema_columns:dict=None)->pd.DataFrame:
         try:
-            return pd.read_csv(file_path)
+            return load_dataframe(file_path,schema_columns=schema_columns)
         except Exception as e:
             raise RefurbishedCarException(e,sys)
         
     def validate_number_of_columns(self,dataframe:pd.DataFrame)->bool:
         try:
-            number_of_columns=len(self._schema_config)
+            number_of_columns=len(self._schema_config["columns"])
             logging.info(f"Required number of columns:{number_of_columns}")
             logging.info(f"Data frame has columns:{len(dataframe.columns)}")
             if len(dataframe.columns)==number_of_columns:
@@ -37,74 +43,173 @@ class DataValidation:
         except Exception as e:
             raise RefurbishedCarException(e,sys)
         
-    def detect_dataset_drift(self,base_df,current_df,threshold=0.05)->bool:
+    def detect_dataset_drift(self,base_df,current_df,threshold=None)->bool:
         try:
-            status=True
-            report={}
-            for column in base_df.columns:
-                d1=base_df[column]
-                d2=current_df[column]
-                is_same_dist=ks_2samp(d1,d2)
-                if threshold<=is_same_dist.pvalue:
-                    is_found=False
-                else:
-                    is_found=True
-                    status=False
-                report.update({column:{
-                    "p_value":float(is_same_dist.pvalue),
-                    "drift_status":is_found
-                    
-                    }})
+            if threshold is None:
+                threshold=self.data_validation_config.drift_threshold
+            report=detect_drift(
+                base_df=base_df,
+                current_df=current_df,
+                threshold=threshold,
+                sample_size=self.data_validation_config.drift_sample_size,
+                n_jobs=self.data_validation_config.drift_n_jobs,
+            )
+            status=not any(column_report["drift_status"] for column_report in report.values())
             drift_report_file_path = self.data_validation_config.drift_report_file_path
 
             #Create directory
             dir_path = os.path.dirname(drift_report_file_path)
             os.makedirs(dir_path,exist_ok=True)
             write_yaml_file(file_path=drift_report_file_path,content=report)
+            return status
 
         except Exception as e:
             raise RefurbishedCarException(e,sys)
         
     
+    def write_reference_profile(self,reference_df:pd.DataFrame)->str:
+        """
+        Save the small reference profile of the training data next to the drift report
+        """
+        try:
+            profile=build_reference_profile(
+                reference_df,
+                n_quantiles=self.data_validation_config.profile_quantiles,
+                max_categories=self.data_validation_config.profile_max_categories,
+            )
+            write_json_file(self.data_validation_config.reference_profile_file_path,profile)
+            return self.data_validation_config.reference_profile_file_path
+        except Exception as e:
+            raise RefurbishedCarException(e,sys)
+
+    def detect_drift_against_profile(self,current_df:pd.DataFrame,profile_file_path:str,report_file_path:str=None,threshold=None)->bool:
+        """
+        Check new data (e.g. production traffic) against a saved reference profile
+        instead of reloading the training rows
+        """
+        try:
+            if threshold is None:
+                threshold=self.data_validation_config.drift_threshold
+            report=detect_drift_against_profile(
+                profile=read_json_file(profile_file_path),
+                current_df=current_df,
+                threshold=threshold,
+                sample_size=self.data_validation_config.drift_sample_size,
+                n_jobs=self.data_validation_config.drift_n_jobs,
+            )
+            if report_file_path is not None:
+                write_yaml_file(file_path=report_file_path,content=report)
+            return not any(column_report["drift_status"] for column_report in report.values())
+        except Exception as e:
+            raise RefurbishedCarException(e,sys)
+
+    def publish_validated_file(self,source_file_path:str,valid_file_path:str)->str:
+        """
+        Expose an ingested file as validated data without reading or writing it again
+        """
+        try:
+            linked=link_or_copy_file(source_file_path,valid_file_path)
+            logging.info(f"{'Linked' if linked else 'Copied'} {source_file_path} to {valid_file_path}")
+            return valid_file_path
+        except Exception as e:
+            raise RefurbishedCarException(e,sys)
+
+    def validate_rows(self,dataframe:pd.DataFrame,source_file_path:str,valid_file_path:str,invalid_file_path:str):
+        """
+        Check every row against the schema and route the failing ones to invalid_file_path, with the
+        failed checks in a validation_errors column. When every row passes, the source file is linked
+        as the valid file instead of being rewritten
+        dataframe: raw content of source_file_path, bad values are only visible before the dtypes are enforced
+        return: tuple (valid rows with the schema dtypes, valid file path, invalid file path or None, summary dict)
+        """
+        try:
+            schema_columns=self._schema_config["columns"]
+            invalid,failures,missing_columns=validate_dataframe(dataframe,self._column_rules)
+            unexpected_columns=[column for column in dataframe.columns if column not in schema_columns]
+            summary=summarize_failures(failures,invalid,missing_columns,unexpected_columns)
+
+            if not invalid.any():
+                valid_file_path=self.publish_validated_file(source_file_path,valid_file_path)
+                return enforce_schema(dataframe,schema_columns),valid_file_path,None,summary
+
+            invalid_dataframe=dataframe[invalid].astype("string") # raw values as text, enforcing dtypes would blank the bad ones
+            invalid_dataframe["validation_errors"]=describe_failures(failures,invalid)
+            save_dataframe(invalid_file_path,invalid_dataframe)
+            valid_dataframe=enforce_schema(dataframe[~invalid],schema_columns)
+            save_dataframe(valid_file_path,valid_dataframe,schema_columns=schema_columns)
+            logging.info(f"Routed {summary['invalid_rows']} of {summary['rows']} rows to {invalid_file_path}: {summary['failures']}")
+            return valid_dataframe,valid_file_path,invalid_file_path,summary
+        except Exception as e:
+            raise RefurbishedCarException(e,sys)
+
+    @instrument_stage(DATA_VALIDATION_DIR_NAME)
     def initiate_data_validation(self)->DataValidationArtifact:
         try:
             train_file_path=self.data_ingestion_artifact.trained_file_path
             test_file_path=self.data_ingestion_artifact.test_file_path
 
-            ## read the data from train and test
+            ## read the data from train and test without casting; values that did not parse as their dtype
+            ## were already routed out at ingestion (DataIngestion.route_invalid_rows), before enforce_schema blanked them
             train_dataframe=DataValidation.read_data(train_file_path)
             test_dataframe=DataValidation.read_data(test_file_path)
             
             ## validate number of columns
-
+            error_message=""
             status=self.validate_number_of_columns(dataframe=train_dataframe)
             if not status:
-                error_message=f"Train dataframe does not contain all columns.\n"
+                error_message+=f"Train dataframe does not contain all columns.\n"
             status = self.validate_number_of_columns(dataframe=test_dataframe)
             if not status:
-                error_message=f"Test dataframe does not contain all columns.\n"   
-
-            ## lets check datadrift
-            status=self.detect_dataset_drift(base_df=train_dataframe,current_df=test_dataframe)
-            dir_path=os.path.dirname(self.data_validation_config.valid_train_file_path)
-            os.makedirs(dir_path,exist_ok=True)
-
-            train_dataframe.to_csv(
-                self.data_validation_config.valid_train_file_path, index=False, header=True
+                error_message+=f"Test dataframe does not contain all columns.\n"   
 
+            ## row level checks, invalid rows are routed out of the validated files
+            rows_start_time=time.perf_counter()
+            train_dataframe,valid_train_file_path,invalid_train_file_path,train_summary=self.validate_rows(
+                train_dataframe,train_file_path,self.data_validation_config.valid_train_file_path,self.data_validation_config.invalid_train_file_path
             )
+            test_dataframe,valid_test_file_path,invalid_test_file_path,test_summary=self.validate_rows(
+                test_dataframe,test_file_path,self.data_validation_config.valid_test_file_path,self.data_validation_config.invalid_test_file_path
+            )
+            rows_seconds=round(time.perf_counter()-rows_start_time,4)
+            for name,summary in (("Train",train_summary),("Test",test_summary)):
+                if summary["missing_columns"]:
+                    error_message+=f"{name} dataframe is missing columns {summary['missing_columns']}.\n"
+                if summary["invalid_rows"]>self.data_validation_config.max_invalid_ratio*max(summary["rows"],1):
+                    error_message+=f"{name} dataframe has {summary['invalid_rows']} invalid rows out of {summary['rows']}.\n"
+            ingestion_summary={
+                "invalid_rows":self.data_ingestion_artifact.invalid_rows,
+                "invalid_file_path":self.data_ingestion_artifact.invalid_file_path,
+            }
+            ingested_rows=train_summary["rows"]+test_summary["rows"]+ingestion_summary["invalid_rows"]
+            if ingestion_summary["invalid_rows"]>self.data_validation_config.max_invalid_ratio*max(ingested_rows,1):
+                error_message+=f"Ingestion routed out {ingestion_summary['invalid_rows']} rows with unparseable values out of {ingested_rows}.\n"
+            write_yaml_file(
+                self.data_validation_config.validation_summary_file_path,
+                {"ingestion":ingestion_summary,"train":train_summary,"test":test_summary},
+            )
+            if error_message:
+                logging.info(f"Schema validation failed: {error_message}")
 
-            test_dataframe.to_csv(
-                self.data_validation_config.valid_test_file_path, index=False, header=True
+            ## lets check datadrift
+            drift_start_time=time.perf_counter()
+            status=self.detect_dataset_drift(base_df=train_dataframe,current_df=test_dataframe) and not error_message
+            add_stage_metrics(
+                rows=train_summary["rows"]+test_summary["rows"],
+                invalid_rows=train_summary["invalid_rows"]+test_summary["invalid_rows"]+ingestion_summary["invalid_rows"],
+                row_checks_seconds=rows_seconds,
+                drift_seconds=round(time.perf_counter()-drift_start_time,4),
             )
+            reference_profile_file_path=self.write_reference_profile(train_dataframe)
             
             data_validation_artifact = DataValidationArtifact(
                 validation_status=status,
-                valid_train_file_path=self.data_ingestion_artifact.trained_file_path,
-                valid_test_file_path=self.data_ingestion_artifact.test_file_path,
-                invalid_train_file_path=None,
-                invalid_test_file_path=None,
+                valid_train_file_path=valid_train_file_path,
+                valid_test_file_path=valid_test_file_path,
+                invalid_train_file_path=invalid_train_file_path,
+                invalid_test_file_path=invalid_test_file_path,
                 drift_report_file_path=self.data_validation_config.drift_report_file_path,
+                reference_profile_file_path=reference_profile_file_path,
+                validation_summary_file_path=self.data_validation_config.validation_summary_file_path,
             )
             return data_validation_artifact
         except Exception as e:
@@ -1,5 +1,8 @@
 import os
 import sys
+import time
+import hashlib
+import dataclasses
 
 from refurbished_car.exception.exception import RefurbishedCarException
 from refurbished_car.logging.logger import logging
@@ -7,29 +10,15 @@ from refurbished_car.logging.logger import logging
 from refurbished_car.entity.artifact_entity import DataTransformationArtifact,ModelTrainerArtifact
 from refurbished_car.entity.config_entity import ModelTrainerConfig
 
-from refurbished_car.utils.ml_utils.model.estimator import NetworkModel
-from refurbished_car.utils.main_utils.utils import save_object,load_object
-from refurbished_car.utils.main_utils.utils import load_numpy_array_data,evaluate_models
-from refurbished_car.utils.ml_utils.metric.classification_metric import get_classification_score
-
-from sklearn.linear_model import LogisticRegression
-from sklearn.metrics import r2_score
-from sklearn.neighbors import KNeighborsClassifier
-from sklearn.tree import DecisionTreeClassifier
-from sklearn.ensemble import (
-    AdaBoostClassifier,
-    GradientBoostingClassifier,
-    RandomForestClassifier,
-)
-import mlflow
-from urllib.parse import urlparse
-
-import dagshub
-#dagshub.init(repo_owner='krishnaik06', repo_name='networksecurity', mlflow=True)
+from refurbished_car.utils.ml_utils.model.estimator import NetworkModel,save_model_bundle
+from refurbished_car.utils.main_utils.utils import load_object,write_yaml_file,link_or_copy_file
+from refurbished_car.utils.main_utils.utils import load_numpy_array_data,evaluate_models,load_sparse_matrix_data
+from refurbished_car.utils.main_utils.instrumentation import instrument_stage,add_stage_metrics
+from refurbished_car.constant.training_pipeline import MODEL_TRAINER_DIR_NAME,SCHEMA_FILE_PATH,TARGET_COLUMN,MLFLOW_TRACKING_URI_ENV_KEY
+from refurbished_car.utils.ml_utils.metric.regression_metric import get_regression_score
 
-os.environ["MLFLOW_TRACKING_URI"]="https://dagshub.com/krishnaik06/networksecurity.mlflow"
-os.environ["MLFLOW_TRACKING_USERNAME"]="krishnaik06"
-os.environ["MLFLOW_TRACKING_PASSWORD"]="7104284f1bb44ece21e0e2adb4e36a250ae3251f"
+from urllib.parse import urlparse
+from dotenv import load_dotenv
 
 
 
@@ -43,19 +32,27 @@ class ModelTrainer:
         except Exception as e:
             raise RefurbishedCarException(e,sys)
         
-    def track_mlflow(self,best_model,classificationmetric):
-        mlflow.set_registry_uri("https://dagshub.com/krishnaik06/networksecurity.mlflow")
+    def track_mlflow(self,best_model,regressionmetric):
+        # the tracking server and its credentials only come from the environment (or .env), without a server nothing is tracked
+        load_dotenv()
+        tracking_uri=os.getenv(MLFLOW_TRACKING_URI_ENV_KEY)
+        if not tracking_uri:
+            logging.info(f"{MLFLOW_TRACKING_URI_ENV_KEY} is not set, skipping mlflow tracking")
+            return
+        # mlflow is only imported when a run is actually tracked, not when the module is imported
+        import mlflow
+        mlflow.set_tracking_uri(tracking_uri)
         tracking_url_type_store = urlparse(mlflow.get_tracking_uri()).scheme
         with mlflow.start_run():
-            f1_score=classificationmetric.f1_score
-            precision_score=classificationmetric.precision_score
-            recall_score=classificationmetric.recall_score
+            r2_score=regressionmetric.r2_score
+            rmse=regressionmetric.rmse
+            mae=regressionmetric.mae
 
             
 
-            mlflow.log_metric("f1_score",f1_score)
-            mlflow.log_metric("precision",precision_score)
-            mlflow.log_metric("recall_score",recall_score)
+            mlflow.log_metric("r2_score",r2_score)
+            mlflow.log_metric("rmse",rmse)
+            mlflow.log_metric("mae",mae)
             mlflow.sklearn.log_model(best_model,"model")
             # Model registry does not work with file store
             if tracking_url_type_store != "file":
@@ -70,43 +67,87 @@ class ModelTrainer:
 
 
         
-    def train_model(self,X_train,y_train,x_test,y_test):
-        models = {
-                "Random Forest": RandomForestClassifier(verbose=1),
-                "Decision Tree": DecisionTreeClassifier(),
-                "Gradient Boosting": GradientBoostingClassifier(verbose=1),
-                "Logistic Regression": LogisticRegression(verbose=1),
-                "AdaBoost": AdaBoostClassifier(),
+    @staticmethod
+    def get_categorical_features(preprocessor)->list:
+        """
+        Output column indices of the ordinal encoded categoricals, for the models' native categorical splits
+        """
+        from sklearn.preprocessing import OrdinalEncoder
+        categorical_features=[]
+        for name,transformer,_ in preprocessor.transformers_:
+            steps=[step for _,step in transformer.steps] if hasattr(transformer,"steps") else [transformer]
+            if isinstance(steps[-1],OrdinalEncoder) and name in preprocessor.output_indices_:
+                output_slice=preprocessor.output_indices_[name]
+                categorical_features.extend(range(output_slice.start,output_slice.stop))
+        return categorical_features
+
+    def get_candidate_models(self,n_features:int,categorical_features:list,sparse_input:bool):
+        """
+        Regression candidates and their search grids: histogram gradient boosting with native
+        categorical support and early stopping, plus XGBoost when it is installed.
+        HistGradientBoostingRegressor cannot take a sparse matrix, one-hot CSR features get a linear model instead
+        return: tuple (models, params)
+        """
+        models={}
+        params={}
+        if not sparse_input:
+            from sklearn.ensemble import HistGradientBoostingRegressor
+            models["Hist Gradient Boosting"]=HistGradientBoostingRegressor(
+                categorical_features=categorical_features or None,
+                max_iter=self.model_trainer_config.max_iter,
+                early_stopping=True,
+                n_iter_no_change=self.model_trainer_config.n_iter_no_change,
+                validation_fraction=self.model_trainer_config.validation_fraction,
+                random_state=42,
+            )
+            params["Hist Gradient Boosting"]={
+                'learning_rate':[.05,.1,.2],
+                'max_leaf_nodes':[15,31,63],
+                'l2_regularization':[0.0,1.0],
             }
-        params={
-            "Decision Tree": {
-                'criterion':['gini', 'entropy', 'log_loss'],
-                # 'splitter':['best','random'],
-                # 'max_features':['sqrt','log2'],
-            },
-            "Random Forest":{
-                # 'criterion':['gini', 'entropy', 'log_loss'],
-                
-                # 'max_features':['sqrt','log2',None],
-                'n_estimators': [8,16,32,128,256]
-            },
-            "Gradient Boosting":{
-                # 'loss':['log_loss', 'exponential'],
-                'learning_rate':[.1,.01,.05,.001],
-                'subsample':[0.6,0.7,0.75,0.85,0.9],
-                # 'criterion':['squared_error', 'friedman_mse'],
-                # 'max_features':['auto','sqrt','log2'],
-                'n_estimators': [8,16,32,64,128,256]
-            },
-            "Logistic Regression":{},
-            "AdaBoost":{
-                'learning_rate':[.1,.01,.001],
-                'n_estimators': [8,16,32,64,128,256]
+        else:
+            from sklearn.linear_model import Ridge
+            models["Ridge"]=Ridge()
+            params["Ridge"]={'alpha':[.1,1.0,10.0]}
+        try:
+            from xgboost import XGBRegressor # optional, the notebook's model
+        except ImportError:
+            logging.info("xgboost is not installed, searching without the XGBoost candidate")
+        else:
+            categorical_positions=set(categorical_features)
+            # early stopping in xgboost needs an eval_set at fit time, which the shared search does not pass,
+            # so its number of rounds is fixed and the tree shape is searched instead
+            models["XGBoost"]=XGBRegressor(
+                tree_method="hist",
+                n_estimators=300,
+                enable_categorical=bool(categorical_positions),
+                feature_types=["c" if index in categorical_positions else "q" for index in range(n_features)] if categorical_positions else None,
+                random_state=42,
+            )
+            params["XGBoost"]={
+                'learning_rate':[.05,.1,.2],
+                'max_depth':[4,6,8],
             }
-            
-        }
+        return models,params
+
+    def train_model(self,X_train,y_train,x_test,y_test):
+        from scipy.sparse import issparse
+
+        preprocessor = load_object(file_path=self.data_transformation_artifact.transformed_object_file_path)
+        categorical_features=self.get_categorical_features(preprocessor)
+        models,params=self.get_candidate_models(X_train.shape[1],categorical_features,issparse(X_train))
+        search_report={}
+        search_start_time=time.perf_counter()
         model_report:dict=evaluate_models(X_train=X_train,y_train=y_train,X_test=x_test,y_test=y_test,
-                                          models=models,param=params)
+                                          models=models,param=params,
+                                          n_jobs=self.model_trainer_config.search_n_jobs,
+                                          cv=self.model_trainer_config.search_cv,
+                                          search_strategy=self.model_trainer_config.search_strategy,
+                                          halving_factor=self.model_trainer_config.halving_factor,
+                                          min_resources=self.model_trainer_config.halving_min_resources,
+                                          search_report=search_report)
+        add_stage_metrics(search_seconds=round(time.perf_counter()-search_start_time,4))
+        write_yaml_file(self.model_trainer_config.search_report_file_path,search_report) # best params and per-candidate fit times
         
         ## To get best model score from dict
         best_model_score = max(sorted(model_report.values()))
@@ -119,32 +160,39 @@ class ModelTrainer:
         best_model = models[best_model_name]
         y_train_pred=best_model.predict(X_train)
 
-        classification_train_metric=get_classification_score(y_true=y_train,y_pred=y_train_pred)
+        regression_train_metric=get_regression_score(y_true=y_train,y_pred=y_train_pred)
         
         ## Track the experiements with mlflow
-        self.track_mlflow(best_model,classification_train_metric)
+        self.track_mlflow(best_model,regression_train_metric)
 
 
         y_test_pred=best_model.predict(x_test)
-        classification_test_metric=get_classification_score(y_true=y_test,y_pred=y_test_pred)
-
-        self.track_mlflow(best_model,classification_test_metric)
-
-        preprocessor = load_object(file_path=self.data_transformation_artifact.transformed_object_file_path)
-            
-        model_dir_path = os.path.dirname(self.model_trainer_config.trained_model_file_path)
-        os.makedirs(model_dir_path,exist_ok=True)
-
-        Network_Model=NetworkModel(preprocessor=preprocessor,model=best_model)
-        save_object(self.model_trainer_config.trained_model_file_path,obj=NetworkModel)
-        #model pusher
-        save_object("final_model/model.pkl",best_model)
+        regression_test_metric=get_regression_score(y_true=y_test,y_pred=y_test_pred)
+
+        self.track_mlflow(best_model,regression_test_metric)
+
+        with open(SCHEMA_FILE_PATH,"rb") as schema_file:
+            schema_hash=hashlib.sha256(schema_file.read()).hexdigest()
+        metadata={
+            "model_name":best_model_name,
+            "best_params":search_report.get(best_model_name,{}).get("best_params"),
+            "target":TARGET_COLUMN,
+            "feature_names":[str(name) for name in getattr(preprocessor,"feature_names_in_",[])],
+            "schema_hash":schema_hash,
+            "categorical_features":categorical_features,
+            "train_metrics":dataclasses.asdict(regression_train_metric),
+            "test_metrics":dataclasses.asdict(regression_test_metric),
+        }
+        Network_Model=NetworkModel(preprocessor=preprocessor,model=best_model,metadata=metadata)
+        save_model_bundle(self.model_trainer_config.trained_model_file_path,Network_Model)
+        #model pusher: final_model/ gets the same bundle, linked rather than written twice
+        link_or_copy_file(self.model_trainer_config.trained_model_file_path,self.model_trainer_config.final_model_file_path)
         
 
         ## Model Trainer Artifact
         model_trainer_artifact=ModelTrainerArtifact(trained_model_file_path=self.model_trainer_config.trained_model_file_path,
-                             train_metric_artifact=classification_train_metric,
-                             test_metric_artifact=classification_test_metric
+                             train_metric_artifact=regression_train_metric,
+                             test_metric_artifact=regression_test_metric
                              )
         logging.info(f"Model trainer artifact: {model_trainer_artifact}")
         return model_trainer_artifact
@@ -157,22 +205,36 @@ class ModelTrainer:
     
     
         
+    @instrument_stage(MODEL_TRAINER_DIR_NAME)
     def initiate_model_trainer(self)->ModelTrainerArtifact:
         try:
             train_file_path = self.data_transformation_artifact.transformed_train_file_path
             test_file_path = self.data_transformation_artifact.transformed_test_file_path
 
-            #loading training array and testing array
-            train_arr = load_numpy_array_data(train_file_path)
-            test_arr = load_numpy_array_data(test_file_path)
-
-            x_train, y_train, x_test, y_test = (
-                train_arr[:, :-1],
-                train_arr[:, -1],
-                test_arr[:, :-1],
-                test_arr[:, -1],
-            )
-
+            if self.data_transformation_artifact.transformed_train_target_file_path is not None:
+                #features and target saved separately: sparse features are passed on without densifying,
+                #dense ones are memory-mapped read-only so search workers share the pages instead of copies
+                if train_file_path.endswith(".npz"):
+                    x_train = load_sparse_matrix_data(train_file_path)
+                    x_test = load_sparse_matrix_data(test_file_path)
+                else:
+                    x_train = load_numpy_array_data(train_file_path, mmap_mode=self.model_trainer_config.mmap_mode)
+                    x_test = load_numpy_array_data(test_file_path, mmap_mode=self.model_trainer_config.mmap_mode)
+                y_train = load_numpy_array_data(self.data_transformation_artifact.transformed_train_target_file_path)
+                y_test = load_numpy_array_data(self.data_transformation_artifact.transformed_test_target_file_path)
+            else:
+                #loading training array and testing array
+                train_arr = load_numpy_array_data(train_file_path)
+                test_arr = load_numpy_array_data(test_file_path)
+
+                x_train, y_train, x_test, y_test = (
+                    train_arr[:, :-1],
+                    train_arr[:, -1],
+                    test_arr[:, :-1],
+                    test_arr[:, -1],
+                )
+
+            add_stage_metrics(rows=x_train.shape[0]+x_test.shape[0])
             model_trainer_artifact=self.train_model(x_train,y_train,x_test,y_test)
             return model_trainer_artifact
 
@@ -1,7 +1,6 @@
 import os
 import sys
 import numpy as np
-import pandas as pd
 
 """
 defining common constant variable for training pipeline
@@ -14,11 +13,38 @@ FILE_NAME: str = "cardekho_imputated.csv"
 TRAIN_FILE_NAME: str = "train.csv"
 TEST_FILE_NAME: str = "test.csv"
 
+## format of the dataframe artifacts written by ingestion and validation: csv, parquet or feather
+ARTIFACT_FILE_FORMAT: str = "parquet"
+ARTIFACT_FILE_EXTENSIONS: dict = {"csv": ".csv", "parquet": ".parquet", "feather": ".feather"}
+
 SCHEMA_FILE_PATH = os.path.join("data_schema", "schema.yaml")
 
 SAVED_MODEL_DIR =os.path.join("saved_models")
 MODEL_FILE_NAME = "model.pkl"
 
+## completed stages are indexed under Artifacts/stage_cache and skipped when their inputs, config and code are unchanged
+STAGE_CACHE_DIR_NAME: str = "stage_cache"
+STAGE_CACHE_ENABLED: bool = True
+
+"""
+MongoDB client related constant start with MONGO VAR NAME, shared by ingestion, loading and serving
+"""
+MONGO_DB_URL_ENV_KEY: str = "MONGO_DB_URL"
+MONGO_MAX_POOL_SIZE: int = 50
+MONGO_MIN_POOL_SIZE: int = 0
+MONGO_MAX_IDLE_TIME_MS: int = 300000 # idle pooled connections are closed after 5 minutes
+MONGO_CONNECT_TIMEOUT_MS: int = 10000
+MONGO_SERVER_SELECTION_TIMEOUT_MS: int = 10000
+MONGO_SOCKET_TIMEOUT_MS: int = None # None waits for as long as a query takes
+MONGO_READ_PREFERENCE: str = "primaryPreferred" # exports may read from a secondary when the primary is busy
+MONGO_COMPRESSORS: str = "zlib" # zlib ships with python, add "zstd"/"snappy" first when their packages are installed
+MONGO_APP_NAME: str = "refurbished_car"
+
+## per stage timing/memory/io report written next to the artifacts of every run
+RUN_REPORT_FILE_NAME: str = "run_report.json"
+PROFILE_DIR_NAME: str = "profiles"
+PROFILE_STAGES: list = [] # stage names (e.g. ["model_trainer"]) or "all" to run under cProfile
+
 
 
 
@@ -30,7 +56,32 @@ DATA_INGESTION_DATABASE_NAME: str = "CardekhoData"
 DATA_INGESTION_DIR_NAME: str = "data_ingestion"
 DATA_INGESTION_FEATURE_STORE_DIR: str = "feature_store"
 DATA_INGESTION_INGESTED_DIR: str = "ingested"
+DATA_INGESTION_INVALID_DIR: str = "invalid" # documents whose raw values do not parse as their schema.yaml dtype
 DATA_INGESTION_TRAIN_TEST_SPLIT_RATION: float = 0.2
+DATA_INGESTION_EXPORT_MODE: str = "streaming" # "streaming" pages through the cursor in batches, "in_memory" loads the whole collection at once
+DATA_INGESTION_EXPORT_BATCH_SIZE: int = 50000 # number of documents fetched and written per batch in streaming mode
+DATA_INGESTION_INCREMENTAL: bool = False # only fetch documents past the stored watermark and append them as a new part of the persistent feature store
+DATA_INGESTION_UPDATED_AT_FIELD: str = "updated_at" # last-modified time of a listing document, stamped by push_data.py when its content changes
+DATA_INGESTION_CONTENT_HASH_FIELD: str = "content_hash" # digest of a listing document's values, push_data.py only rewrites (and restamps) a document when it changes
+DATA_INGESTION_WATERMARK_FIELD: str = DATA_INGESTION_UPDATED_AT_FIELD # must be an updated-at field, _id only grows on insert and misses edited listings
+DATA_INGESTION_USE_STAGE_CACHE: bool = False # reuse the last export while the matching documents' count and latest updated-at are unchanged; edits that do not move updated-at are missed
+DATA_INGESTION_WATERMARK_FILE_NAME: str = "watermark.yaml"
+DATA_INGESTION_LISTING_KEY_COLUMNS: list = None # columns identifying a listing, required by incremental ingestion: the latest part holding a listing wins
+DATA_INGESTION_FEATURE_STORE_PARTS_DIR: str = "parts" # one file per incremental run, in the artifact file format
+DATA_INGESTION_SORT_KEY_COLUMNS: list = ["Unnamed: 0"] # the export is sorted on these, so an unchanged collection gives the same files (and downstream stage cache keys) whatever order its documents were inserted in; None keeps the server order
+## pushed down to mongodb as an aggregation pipeline, so only the rows and fields trained on are sent to python
+DATA_INGESTION_FILTER: dict = None # $match on the server, e.g. {"seller_type": "Dealer"}
+DATA_INGESTION_RECENT_DAYS: int = None # only documents whose DATA_INGESTION_DATE_FIELD is in the last n days
+DATA_INGESTION_DATE_FIELD: str = "_id" # a datetime field, or _id to use the ObjectId creation time
+DATA_INGESTION_PROJECTION: list = None # fields to fetch, None fetches every field
+DATA_INGESTION_SAMPLE_SIZE: int = None # $sample this many random documents, not compatible with incremental ingestion
+DATA_INGESTION_TYPE_COERCIONS: dict = None # field -> mongodb $convert type ("double", "int", "long", "string", "bool", "date"), a value that fails to convert is kept raw and routed to invalid/
+DATA_INGESTION_NA_VALUES: list = ["na"] # strings turned into null on the server for the coerced fields
+## rows go to train or test by a seeded hash of their key, streamed chunk by chunk into the two files
+DATA_INGESTION_SPLIT_KEY_COLUMNS: list = ["Unnamed: 0"] # listing id of the CarDekho dump; None hashes the whole row, which is not stable: an edited listing can change sides
+DATA_INGESTION_SPLIT_STRATIFY: str = None # opt-in: None is the plain hash split, a column such as "brand" or "price" for selling price quantile bands keeps each stratum's share in test
+DATA_INGESTION_SPLIT_PRICE_BINS: int = 5
+DATA_INGESTION_SPLIT_SEED: int = 42
 
 """
 Data Validation related constant start with DATA_VALIDATION VAR NAME
@@ -40,6 +91,14 @@ DATA_VALIDATION_VALID_DIR: str = "validated"
 DATA_VALIDATION_INVALID_DIR: str = "invalid"
 DATA_VALIDATION_DRIFT_REPORT_DIR: str = "drift_report"
 DATA_VALIDATION_DRIFT_REPORT_FILE_NAME: str = "report.yaml"
+DATA_VALIDATION_REFERENCE_PROFILE_FILE_NAME: str = "reference_profile.json"
+DATA_VALIDATION_SUMMARY_FILE_NAME: str = "validation_summary.yaml"
+DATA_VALIDATION_MAX_INVALID_RATIO: float = 0.05 # validation fails when a larger share of rows breaks the column_checks of schema.yaml
+DATA_VALIDATION_PROFILE_QUANTILES: int = 101 # size of the quantile sketch kept per numeric column
+DATA_VALIDATION_PROFILE_MAX_CATEGORIES: int = 50 # categories kept per categorical column, the rest are counted together
+DATA_VALIDATION_DRIFT_THRESHOLD: float = 0.05 # p-value below which a column is reported as drifted
+DATA_VALIDATION_DRIFT_SAMPLE_SIZE: int = 1000000 # larger columns are down-sampled before the drift tests, None to always use every row
+DATA_VALIDATION_DRIFT_N_JOBS: int = None # threads used by the drift tests, None uses every core
 PREPROCESSING_OBJECT_FILE_NAME = "preprocessing.pkl"
 
 """
@@ -56,6 +115,12 @@ DATA_TRANSFORMATION_IMPUTER_PARAMS: dict = {
     "weights": "uniform",
 }
 DATA_TRANSFORMATION_TRAIN_FILE_PATH: str = "train.npy"
+## keep the one-hot encoded features as a CSR matrix saved to .npz, with the target in its own .npy
+DATA_TRANSFORMATION_SPARSE_OUTPUT: bool = True
+## "ordinal": one integer code per categorical column for the boosting models' native categorical support (dense output),
+## "onehot": one-hot columns, sparse when DATA_TRANSFORMATION_SPARSE_OUTPUT is set
+DATA_TRANSFORMATION_CATEGORICAL_ENCODING: str = "ordinal"
+DATA_TRANSFORMATION_MAX_CATEGORIES: int = 255 # ordinal codes per column, the rarest categories share one (histogram boosting bins at most 255)
 
 DATA_TRANSFORMATION_TEST_FILE_PATH: str = "test.npy"
 
@@ -69,5 +134,46 @@ MODEL_TRAINER_TRAINED_MODEL_DIR: str = "trained_model"
 MODEL_TRAINER_TRAINED_MODEL_NAME: str = "model.pkl"
 MODEL_TRAINER_EXPECTED_SCORE: float = 0.6
 MODEL_TRAINER_OVER_FIITING_UNDER_FITTING_THRESHOLD: float = 0.05
+MODEL_TRAINER_MMAP_MODE: str = "r" # memory-map the dense train/test arrays read-only, None reads them into RAM
+MODEL_TRAINER_SEARCH_STRATEGY: str = "halving" # "halving" (successive halving) or "grid" (every candidate on every row)
+MODEL_TRAINER_SEARCH_N_JOBS: int = -1 # processes shared by the hyperparameter search of all model families
+MODEL_TRAINER_SEARCH_CV: int = 3
+MODEL_TRAINER_HALVING_FACTOR: int = 3 # keep the best 1/factor candidates of each family per round
+MODEL_TRAINER_HALVING_MIN_RESOURCES: int = 500 # fewest train rows a halving round may use
+MODEL_TRAINER_SEARCH_REPORT_FILE_NAME: str = "search_report.yaml"
+MODEL_TRAINER_MAX_ITER: int = 1000 # upper bound on boosting rounds, early stopping usually ends far sooner
+MODEL_TRAINER_N_ITER_NO_CHANGE: int = 10 # stop boosting after this many rounds without improvement on the validation split
+MODEL_TRAINER_VALIDATION_FRACTION: float = 0.1 # train rows held out to decide early stopping
+MLFLOW_TRACKING_URI_ENV_KEY: str = "MLFLOW_TRACKING_URI" # runs are only tracked when set, mlflow reads MLFLOW_TRACKING_USERNAME / MLFLOW_TRACKING_PASSWORD itself
+## preprocessor, estimator and metadata saved together, in the trainer artifact dir and published to final_model/
+MODEL_BUNDLE_FILE_NAME: str = "model_bundle.joblib"
+MODEL_BUNDLE_FORMAT_VERSION: int = 1
+MODEL_BUNDLE_MMAP_MODE: str = "r" # memory-map the bundle's arrays when loading for prediction, None copies them into RAM
+
+"""
+Batch Prediction related constant start with BATCH_PREDICTION VAR NAME
+"""
+BATCH_PREDICTION_DIR_NAME: str = "batch_prediction"
+BATCH_PREDICTION_OUTPUT_FILE_NAME: str = "predictions.csv"
+BATCH_PREDICTION_CHUNK_SIZE: int = 100000 # rows transformed and predicted per chunk
+BATCH_PREDICTION_N_JOBS: int = None # worker processes, None uses every core
+BATCH_PREDICTION_PREDICTION_COLUMN: str = "predicted_selling_price"
+PREPROCESSOR_FILE_NAME: str = "preprocessor.pkl"
+
+"""
+Prediction Service related constant start with PREDICTION_SERVICE VAR NAME
+"""
+PREDICTION_SERVICE_MAX_BATCH_SIZE: int = 256 # records coalesced into one predict call
+PREDICTION_SERVICE_MAX_WAIT_MS: float = 1.0 # how long the first request of a batch waits for others to join
+PREDICTION_SERVICE_LATENCY_WINDOW_SIZE: int = 10000 # recent requests used for the latency percentiles
+PREDICTION_SERVICE_CACHE_ENABLED: bool = True # answer repeat quotes from the prediction cache
+PREDICTION_SERVICE_CACHE_MAX_ENTRIES: int = 100000 # least recently used quotes are evicted above this
+PREDICTION_SERVICE_CACHE_TTL_SECONDS: float = None # None keeps quotes until evicted or the model bundle changes
+
+"""
+Prediction Pool related constant start with PREDICTION_POOL VAR NAME
+"""
+PREDICTION_POOL_N_WORKERS: int = None # forked worker processes, None uses every core
+PREDICTION_POOL_MAX_BATCH_ROWS: int = 65536 # rows per worker per round, sizes each worker's shared input/output buffers
 
 TRAINING_BUCKET_NAME = "netwworksecurity"
\ No newline at end of file
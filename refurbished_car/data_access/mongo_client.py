@@ -0,0 +1,91 @@
+import os
+import sys
+import time
+import atexit
+import threading
+
+import certifi
+import pymongo
+
+from refurbished_car.exception.exception import RefurbishedCarException
+from refurbished_car.logging.logger import logging
+from refurbished_car.entity.config_entity import MongoClientConfig
+from dotenv import load_dotenv
+
+## process-wide client, created on first use by get_mongo_client
+_client=None
+_client_pid=None
+_client_lock=threading.Lock()
+
+
+def _client_options(mongo_client_config:MongoClientConfig)->dict:
+    options={
+        "maxPoolSize":mongo_client_config.max_pool_size,
+        "minPoolSize":mongo_client_config.min_pool_size,
+        "maxIdleTimeMS":mongo_client_config.max_idle_time_ms,
+        "connectTimeoutMS":mongo_client_config.connect_timeout_ms,
+        "serverSelectionTimeoutMS":mongo_client_config.server_selection_timeout_ms,
+        "socketTimeoutMS":mongo_client_config.socket_timeout_ms,
+        "readPreference":mongo_client_config.read_preference,
+        "appname":mongo_client_config.app_name,
+    }
+    if mongo_client_config.compressors:
+        options["compressors"]=mongo_client_config.compressors
+    if mongo_client_config.url and mongo_client_config.url.startswith("mongodb+srv://"):
+        options["tlsCAFile"]=certifi.where() # atlas (srv) urls always use tls, verify it against certifi's bundle
+    return options
+
+
+def get_mongo_client(mongo_client_config:MongoClientConfig=None)->pymongo.MongoClient:
+    """
+    Process-wide pooled MongoClient, created lazily on first use and reused by ingestion, loading and
+    serving, so the tls handshake and server discovery are paid once per process instead of once per call.
+    pymongo clients are not fork safe, a forked child gets its own client on first use
+    mongo_client_config: only used when the client is created, defaults to the MONGO_* constants
+    """
+    global _client,_client_pid
+    try:
+        if _client is not None and _client_pid==os.getpid():
+            return _client
+        with _client_lock:
+            if _client is None or _client_pid!=os.getpid():
+                load_dotenv() # MONGO_DB_URL may come from .env, read when the first client is created rather than on import
+                mongo_client_config=mongo_client_config or MongoClientConfig()
+                _client=pymongo.MongoClient(mongo_client_config.url,**_client_options(mongo_client_config))
+                _client_pid=os.getpid()
+                logging.info(
+                    f"Created the shared mongodb client (pool {mongo_client_config.max_pool_size}, "
+                    f"read preference {mongo_client_config.read_preference}, compressors {mongo_client_config.compressors})"
+                )
+            return _client
+    except Exception as e:
+        raise RefurbishedCarException(e,sys)
+
+
+def get_collection(database_name:str,collection_name:str):
+    return get_mongo_client()[database_name][collection_name]
+
+
+def check_mongo_health()->dict:
+    """
+    Ping the deployment through the shared client
+    return: dict with "ok", the round trip "latency_ms" and the "error" when the ping failed
+    """
+    start_time=time.perf_counter()
+    try:
+        get_mongo_client().admin.command("ping")
+        return {"ok":True,"latency_ms":round((time.perf_counter()-start_time)*1000,3)}
+    except Exception as e:
+        return {"ok":False,"latency_ms":round((time.perf_counter()-start_time)*1000,3),"error":str(e)}
+
+
+def close_mongo_client()->None:
+    global _client,_client_pid
+    with _client_lock:
+        if _client is not None and _client_pid==os.getpid():
+            _client.close()
+        _client=None
+        _client_pid=None
+
+
+atexit.register(close_mongo_client)
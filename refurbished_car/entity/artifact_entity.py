@@ -4,6 +4,8 @@ from dataclasses import dataclass
 class DataIngestionArtifact:
     trained_file_path:str
     test_file_path:str
+    invalid_file_path:str=None
+    invalid_rows:int=0
 
 @dataclass
 class DataValidationArtifact:
@@ -13,21 +15,32 @@ class DataValidationArtifact:
     invalid_train_file_path: str
     invalid_test_file_path: str
     drift_report_file_path: str
+    reference_profile_file_path: str
+    validation_summary_file_path: str
 
 @dataclass
 class DataTransformationArtifact:
     transformed_object_file_path: str
     transformed_train_file_path: str
     transformed_test_file_path: str
+    transformed_train_target_file_path: str # None for older artifacts that stored the target as the last column of the features array
+    transformed_test_target_file_path: str
 
 @dataclass
-class ClassificationMetricArtifact:
-    f1_score: float
-    precision_score: float
-    recall_score: float
+class BatchPredictionArtifact:
+    prediction_file_path: str
+    number_of_rows: int
+    elapsed_seconds: float
+    chunk_metrics: list
+
+@dataclass
+class RegressionMetricArtifact:
+    r2_score: float
+    rmse: float
+    mae: float
     
 @dataclass
 class ModelTrainerArtifact:
     trained_model_file_path: str
-    train_metric_artifact: ClassificationMetricArtifact
-    test_metric_artifact: ClassificationMetricArtifact
+    train_metric_artifact: RegressionMetricArtifact
+    test_metric_artifact: RegressionMetricArtifact
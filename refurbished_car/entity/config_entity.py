@@ -2,65 +2,179 @@ from datetime import datetime
 import os
 from refurbished_car.constant import training_pipeline
 
-print(training_pipeline.PIPELINE_NAME)
-print(training_pipeline.ARTIFACT_DIR)
-
 
 class TrainingPipelineConfig:
-    def __init__(self,timestamp=datetime.now()):
+    def __init__(self,timestamp=datetime.now(),artifact_format=training_pipeline.ARTIFACT_FILE_FORMAT):
         timestamp=timestamp.strftime("%m_%d_%Y_%H_%M_%S")
         self.pipeline_name=training_pipeline.PIPELINE_NAME
         self.artifact_name=training_pipeline.ARTIFACT_DIR #
         self.artifact_dir=os.path.join(self.artifact_name,timestamp) # this will create the directory with the timestamp in the artifact directory
         self.model_dir=os.path.join("final_model")
         self.timestamp: str=timestamp
+        self.artifact_format: str=artifact_format # csv, parquet or feather
+        self.artifact_file_extension: str=training_pipeline.ARTIFACT_FILE_EXTENSIONS[artifact_format]
+        self.stage_cache_dir: str=os.path.join(self.artifact_name,training_pipeline.STAGE_CACHE_DIR_NAME) # shared by every run
+        self.use_stage_cache: bool=training_pipeline.STAGE_CACHE_ENABLED
+        self.run_report_file_path: str=os.path.join(self.artifact_dir,training_pipeline.RUN_REPORT_FILE_NAME)
+        self.profile_dir: str=os.path.join(self.artifact_dir,training_pipeline.PROFILE_DIR_NAME)
+        self.profile_stages=training_pipeline.PROFILE_STAGES
 
 
 
 class DataIngestionConfig:
     def __init__(self,training_pipeline_config:TrainingPipelineConfig):
+        file_extension=training_pipeline_config.artifact_file_extension
         self.data_ingestion_dir:str=os.path.join(
             training_pipeline_config.artifact_dir,training_pipeline.DATA_INGESTION_DIR_NAME
         )
         self.feature_store_file_path: str = os.path.join(
-                self.data_ingestion_dir, training_pipeline.DATA_INGESTION_FEATURE_STORE_DIR, training_pipeline.FILE_NAME
+                self.data_ingestion_dir, training_pipeline.DATA_INGESTION_FEATURE_STORE_DIR, training_pipeline.FILE_NAME.replace(".csv", file_extension)
             )
         self.training_file_path: str = os.path.join(
-                self.data_ingestion_dir, training_pipeline.DATA_INGESTION_INGESTED_DIR, training_pipeline.TRAIN_FILE_NAME
+                self.data_ingestion_dir, training_pipeline.DATA_INGESTION_INGESTED_DIR, training_pipeline.TRAIN_FILE_NAME.replace(".csv", file_extension)
             )
         self.testing_file_path: str = os.path.join(
-                self.data_ingestion_dir, training_pipeline.DATA_INGESTION_INGESTED_DIR, training_pipeline.TEST_FILE_NAME
+                self.data_ingestion_dir, training_pipeline.DATA_INGESTION_INGESTED_DIR, training_pipeline.TEST_FILE_NAME.replace(".csv", file_extension)
+            )
+        self.invalid_file_path: str = os.path.join(
+                self.data_ingestion_dir, training_pipeline.DATA_INGESTION_INVALID_DIR, training_pipeline.FILE_NAME.replace(".csv", file_extension)
             )
         self.train_test_split_ratio: float = training_pipeline.DATA_INGESTION_TRAIN_TEST_SPLIT_RATION
         self.collection_name: str = training_pipeline.DATA_INGESTION_COLLECTION_NAME
         self.database_name: str = training_pipeline.DATA_INGESTION_DATABASE_NAME
+        self.export_mode: str = training_pipeline.DATA_INGESTION_EXPORT_MODE
+        self.export_batch_size: int = training_pipeline.DATA_INGESTION_EXPORT_BATCH_SIZE
+        self.incremental: bool = training_pipeline.DATA_INGESTION_INCREMENTAL
+        self.watermark_field: str = training_pipeline.DATA_INGESTION_WATERMARK_FIELD
+        self.listing_key_columns: list = training_pipeline.DATA_INGESTION_LISTING_KEY_COLUMNS
+        self.sort_key_columns: list = training_pipeline.DATA_INGESTION_SORT_KEY_COLUMNS
+        self.updated_at_field: str = training_pipeline.DATA_INGESTION_UPDATED_AT_FIELD
+        self.content_hash_field: str = training_pipeline.DATA_INGESTION_CONTENT_HASH_FIELD
+        self.use_stage_cache: bool = training_pipeline.DATA_INGESTION_USE_STAGE_CACHE
+        self.query_filter: dict = training_pipeline.DATA_INGESTION_FILTER
+        self.recent_days: int = training_pipeline.DATA_INGESTION_RECENT_DAYS
+        self.date_field: str = training_pipeline.DATA_INGESTION_DATE_FIELD
+        self.projection: list = training_pipeline.DATA_INGESTION_PROJECTION
+        self.sample_size: int = training_pipeline.DATA_INGESTION_SAMPLE_SIZE
+        self.type_coercions: dict = training_pipeline.DATA_INGESTION_TYPE_COERCIONS
+        self.na_values: list = training_pipeline.DATA_INGESTION_NA_VALUES
+        self.split_key_columns: list = training_pipeline.DATA_INGESTION_SPLIT_KEY_COLUMNS
+        self.split_stratify: str = training_pipeline.DATA_INGESTION_SPLIT_STRATIFY
+        self.split_price_bins: int = training_pipeline.DATA_INGESTION_SPLIT_PRICE_BINS
+        self.split_seed: int = training_pipeline.DATA_INGESTION_SPLIT_SEED
+        # the incremental feature store and its watermark live outside the timestamped run directory so they persist between runs
+        self.incremental_feature_store_dir: str = os.path.join(
+                training_pipeline_config.artifact_name, training_pipeline.DATA_INGESTION_FEATURE_STORE_DIR
+            )
+        self.incremental_parts_dir: str = os.path.join(
+                self.incremental_feature_store_dir, training_pipeline.DATA_INGESTION_FEATURE_STORE_PARTS_DIR
+            )
+        self.artifact_file_extension: str = file_extension
+        self.watermark_file_path: str = os.path.join(
+                self.incremental_feature_store_dir, training_pipeline.DATA_INGESTION_WATERMARK_FILE_NAME
+            )
 
 class DataValidationConfig:
     def __init__(self,training_pipeline_config:TrainingPipelineConfig):
+        file_extension=training_pipeline_config.artifact_file_extension
         self.data_validation_dir: str = os.path.join( training_pipeline_config.artifact_dir, training_pipeline.DATA_VALIDATION_DIR_NAME)
         self.valid_data_dir: str = os.path.join(self.data_validation_dir, training_pipeline.DATA_VALIDATION_VALID_DIR)
         self.invalid_data_dir: str = os.path.join(self.data_validation_dir, training_pipeline.DATA_VALIDATION_INVALID_DIR)
-        self.valid_train_file_path: str = os.path.join(self.valid_data_dir, training_pipeline.TRAIN_FILE_NAME)
-        self.valid_test_file_path: str = os.path.join(self.valid_data_dir, training_pipeline.TEST_FILE_NAME)
-        self.invalid_train_file_path: str = os.path.join(self.invalid_data_dir, training_pipeline.TRAIN_FILE_NAME)
-        self.invalid_test_file_path: str = os.path.join(self.invalid_data_dir, training_pipeline.TEST_FILE_NAME)
+        self.valid_train_file_path: str = os.path.join(self.valid_data_dir, training_pipeline.TRAIN_FILE_NAME.replace(".csv", file_extension))
+        self.valid_test_file_path: str = os.path.join(self.valid_data_dir, training_pipeline.TEST_FILE_NAME.replace(".csv", file_extension))
+        self.invalid_train_file_path: str = os.path.join(self.invalid_data_dir, training_pipeline.TRAIN_FILE_NAME.replace(".csv", file_extension))
+        self.invalid_test_file_path: str = os.path.join(self.invalid_data_dir, training_pipeline.TEST_FILE_NAME.replace(".csv", file_extension))
         self.drift_report_file_path: str = os.path.join(
             self.data_validation_dir,
             training_pipeline.DATA_VALIDATION_DRIFT_REPORT_DIR,
             training_pipeline.DATA_VALIDATION_DRIFT_REPORT_FILE_NAME,
         )
+        self.reference_profile_file_path: str = os.path.join(
+            self.data_validation_dir,
+            training_pipeline.DATA_VALIDATION_DRIFT_REPORT_DIR,
+            training_pipeline.DATA_VALIDATION_REFERENCE_PROFILE_FILE_NAME,
+        )
+        self.validation_summary_file_path: str = os.path.join(
+            self.data_validation_dir,
+            training_pipeline.DATA_VALIDATION_DRIFT_REPORT_DIR,
+            training_pipeline.DATA_VALIDATION_SUMMARY_FILE_NAME,
+        )
+        self.max_invalid_ratio: float = training_pipeline.DATA_VALIDATION_MAX_INVALID_RATIO
+        self.profile_quantiles: int = training_pipeline.DATA_VALIDATION_PROFILE_QUANTILES
+        self.profile_max_categories: int = training_pipeline.DATA_VALIDATION_PROFILE_MAX_CATEGORIES
+        self.drift_threshold: float = training_pipeline.DATA_VALIDATION_DRIFT_THRESHOLD
+        self.drift_sample_size: int = training_pipeline.DATA_VALIDATION_DRIFT_SAMPLE_SIZE
+        self.drift_n_jobs: int = training_pipeline.DATA_VALIDATION_DRIFT_N_JOBS
 
 
 class DataTransformationConfig:
      def __init__(self,training_pipeline_config:TrainingPipelineConfig):
+        self.categorical_encoding: str = training_pipeline.DATA_TRANSFORMATION_CATEGORICAL_ENCODING
+        self.max_categories: int = training_pipeline.DATA_TRANSFORMATION_MAX_CATEGORIES
+        # ordinal codes are one dense column per feature, only one-hot output is worth keeping sparse
+        self.sparse_output: bool = training_pipeline.DATA_TRANSFORMATION_SPARSE_OUTPUT and self.categorical_encoding == "onehot"
+        features_extension = "npz" if self.sparse_output else "npy"
         self.data_transformation_dir: str = os.path.join( training_pipeline_config.artifact_dir,training_pipeline.DATA_TRANSFORMATION_DIR_NAME )
         self.transformed_train_file_path: str = os.path.join( self.data_transformation_dir,training_pipeline.DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR,
-            training_pipeline.TRAIN_FILE_NAME.replace("csv", "npy"),)
+            training_pipeline.TRAIN_FILE_NAME.replace("csv", features_extension),)
         self.transformed_test_file_path: str = os.path.join(self.data_transformation_dir,  training_pipeline.DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR,
-            training_pipeline.TEST_FILE_NAME.replace("csv", "npy"), )
+            training_pipeline.TEST_FILE_NAME.replace("csv", features_extension), )
+        self.transformed_train_target_file_path: str = os.path.join( self.data_transformation_dir,training_pipeline.DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR,
+            training_pipeline.TRAIN_FILE_NAME.replace(".csv", "_target.npy"),)
+        self.transformed_test_target_file_path: str = os.path.join(self.data_transformation_dir,  training_pipeline.DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR,
+            training_pipeline.TEST_FILE_NAME.replace(".csv", "_target.npy"), )
         self.transformed_object_file_path: str = os.path.join( self.data_transformation_dir, training_pipeline.DATA_TRANSFORMATION_TRANSFORMED_OBJECT_DIR,
             training_pipeline.PREPROCESSING_OBJECT_FILE_NAME,)
         
+class MongoClientConfig:
+    def __init__(self):
+        self.url: str = os.getenv(training_pipeline.MONGO_DB_URL_ENV_KEY)
+        self.max_pool_size: int = training_pipeline.MONGO_MAX_POOL_SIZE
+        self.min_pool_size: int = training_pipeline.MONGO_MIN_POOL_SIZE
+        self.max_idle_time_ms: int = training_pipeline.MONGO_MAX_IDLE_TIME_MS
+        self.connect_timeout_ms: int = training_pipeline.MONGO_CONNECT_TIMEOUT_MS
+        self.server_selection_timeout_ms: int = training_pipeline.MONGO_SERVER_SELECTION_TIMEOUT_MS
+        self.socket_timeout_ms: int = training_pipeline.MONGO_SOCKET_TIMEOUT_MS
+        self.read_preference: str = training_pipeline.MONGO_READ_PREFERENCE
+        self.compressors: str = training_pipeline.MONGO_COMPRESSORS
+        self.app_name: str = training_pipeline.MONGO_APP_NAME
+
+class BatchPredictionConfig:
+    def __init__(self,training_pipeline_config:TrainingPipelineConfig,input_file_path:str=None):
+        self.batch_prediction_dir: str = os.path.join(
+            training_pipeline_config.artifact_dir, training_pipeline.BATCH_PREDICTION_DIR_NAME
+        )
+        self.input_file_path: str = input_file_path # csv/parquet/feather file to score, None reads the mongodb collection
+        self.database_name: str = training_pipeline.DATA_INGESTION_DATABASE_NAME
+        self.collection_name: str = training_pipeline.DATA_INGESTION_COLLECTION_NAME
+        self.prediction_file_path: str = os.path.join(
+            self.batch_prediction_dir,
+            training_pipeline.BATCH_PREDICTION_OUTPUT_FILE_NAME.replace(".csv", training_pipeline_config.artifact_file_extension),
+        )
+        self.model_bundle_file_path: str = os.path.join(training_pipeline_config.model_dir, training_pipeline.MODEL_BUNDLE_FILE_NAME)
+        self.mmap_mode: str = training_pipeline.MODEL_BUNDLE_MMAP_MODE
+        self.chunk_size: int = training_pipeline.BATCH_PREDICTION_CHUNK_SIZE
+        self.n_jobs: int = training_pipeline.BATCH_PREDICTION_N_JOBS
+        self.prediction_column: str = training_pipeline.BATCH_PREDICTION_PREDICTION_COLUMN
+
+class PredictionServiceConfig:
+    def __init__(self,training_pipeline_config:TrainingPipelineConfig):
+        self.model_bundle_file_path: str = os.path.join(training_pipeline_config.model_dir, training_pipeline.MODEL_BUNDLE_FILE_NAME)
+        self.mmap_mode: str = training_pipeline.MODEL_BUNDLE_MMAP_MODE
+        self.max_batch_size: int = training_pipeline.PREDICTION_SERVICE_MAX_BATCH_SIZE
+        self.max_wait_ms: float = training_pipeline.PREDICTION_SERVICE_MAX_WAIT_MS
+        self.latency_window_size: int = training_pipeline.PREDICTION_SERVICE_LATENCY_WINDOW_SIZE
+        self.cache_enabled: bool = training_pipeline.PREDICTION_SERVICE_CACHE_ENABLED
+        self.cache_max_entries: int = training_pipeline.PREDICTION_SERVICE_CACHE_MAX_ENTRIES
+        self.cache_ttl_seconds: float = training_pipeline.PREDICTION_SERVICE_CACHE_TTL_SECONDS
+
+class PredictionPoolConfig:
+    def __init__(self,training_pipeline_config:TrainingPipelineConfig):
+        self.model_bundle_file_path: str = os.path.join(training_pipeline_config.model_dir, training_pipeline.MODEL_BUNDLE_FILE_NAME)
+        self.mmap_mode: str = training_pipeline.MODEL_BUNDLE_MMAP_MODE
+        self.n_workers: int = training_pipeline.PREDICTION_POOL_N_WORKERS
+        self.max_batch_rows: int = training_pipeline.PREDICTION_POOL_MAX_BATCH_ROWS
+
 class ModelTrainerConfig:
     def __init__(self,training_pipeline_config:TrainingPipelineConfig):
         self.model_trainer_dir: str = os.path.join(
@@ -68,7 +182,20 @@ class ModelTrainerConfig:
         )
         self.trained_model_file_path: str = os.path.join(
             self.model_trainer_dir, training_pipeline.MODEL_TRAINER_TRAINED_MODEL_DIR, 
-            training_pipeline.MODEL_FILE_NAME
+            training_pipeline.MODEL_BUNDLE_FILE_NAME
         )
+        self.final_model_file_path: str = os.path.join(training_pipeline_config.model_dir, training_pipeline.MODEL_BUNDLE_FILE_NAME)
         self.expected_accuracy: float = training_pipeline.MODEL_TRAINER_EXPECTED_SCORE
-        self.overfitting_underfitting_threshold = training_pipeline.MODEL_TRAINER_OVER_FIITING_UNDER_FITTING_THRESHOLD
\ No newline at end of file
+        self.overfitting_underfitting_threshold = training_pipeline.MODEL_TRAINER_OVER_FIITING_UNDER_FITTING_THRESHOLD
+        self.mmap_mode: str = training_pipeline.MODEL_TRAINER_MMAP_MODE
+        self.search_strategy: str = training_pipeline.MODEL_TRAINER_SEARCH_STRATEGY
+        self.search_n_jobs: int = training_pipeline.MODEL_TRAINER_SEARCH_N_JOBS
+        self.search_cv: int = training_pipeline.MODEL_TRAINER_SEARCH_CV
+        self.halving_factor: int = training_pipeline.MODEL_TRAINER_HALVING_FACTOR
+        self.halving_min_resources: int = training_pipeline.MODEL_TRAINER_HALVING_MIN_RESOURCES
+        self.max_iter: int = training_pipeline.MODEL_TRAINER_MAX_ITER
+        self.n_iter_no_change: int = training_pipeline.MODEL_TRAINER_N_ITER_NO_CHANGE
+        self.validation_fraction: float = training_pipeline.MODEL_TRAINER_VALIDATION_FRACTION
+        self.search_report_file_path: str = os.path.join(
+            self.model_trainer_dir, training_pipeline.MODEL_TRAINER_SEARCH_REPORT_FILE_NAME
+        )
\ No newline at end of file
@@ -5,12 +5,26 @@ from datetime import datetime
 LOG_FILE=f"{datetime.now().strftime('%m_%d_%Y_%H_%M_%S')}.log"
 
 logs_path=os.path.join(os.getcwd(),"logs",LOG_FILE)
-os.makedirs(logs_path,exist_ok=True)
 
 LOG_FILE_PATH=os.path.join(logs_path,LOG_FILE)
 
+
+class _DeferredFileHandler(logging.FileHandler):
+    """
+    File handler that creates the log directory and file on the first record instead of on import,
+    so importing the package (a CLI call, a prediction worker) leaves nothing behind on disk
+    """
+    def __init__(self,filename):
+        super().__init__(filename,delay=True)
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename),exist_ok=True)
+        return super()._open()
+
+
+_handler=_DeferredFileHandler(LOG_FILE_PATH)
+_handler.setFormatter(logging.Formatter("[ %(asctime)s ] %(lineno)d %(name)s - %(levelname)s - %(message)s"))
 logging.basicConfig(
-    filename=LOG_FILE_PATH,
-    format="[ %(asctime)s ] %(lineno)d %(name)s - %(levelname)s - %(message)s",
+    handlers=[_handler],
     level=logging.INFO,
 )
\ No newline at end of file
@@ -0,0 +1,154 @@
+import os
+import sys
+import time
+import itertools
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from refurbished_car.exception.exception import RefurbishedCarException
+from refurbished_car.logging.logger import logging
+
+from refurbished_car.entity.config_entity import BatchPredictionConfig
+from refurbished_car.entity.artifact_entity import BatchPredictionArtifact
+from refurbished_car.utils.ml_utils.model.estimator import NetworkModel,load_model_bundle
+from refurbished_car.utils.main_utils.utils import iter_dataframe_chunks,DataFrameChunkWriter,get_peak_rss_mb,read_yaml_file,enforce_schema
+from refurbished_car.constant.training_pipeline import SCHEMA_FILE_PATH,DATA_INGESTION_UPDATED_AT_FIELD,DATA_INGESTION_CONTENT_HASH_FIELD
+from refurbished_car.data_access.mongo_client import get_collection
+
+
+## model shared by the worker processes, set once per worker by _init_worker
+_worker_model=None
+
+
+def _init_worker(model:NetworkModel):
+    global _worker_model
+    _worker_model=model
+
+
+def _predict_chunk(dataframe:pd.DataFrame):
+    """
+    Transform and predict one chunk inside a worker, returning the predictions and the time spent
+    """
+    start_time=time.perf_counter()
+    predictions=_worker_model.predict(dataframe)
+    return predictions,time.perf_counter()-start_time
+
+
+class BatchPrediction:
+    def __init__(self,batch_prediction_config:BatchPredictionConfig):
+        try:
+            self.batch_prediction_config=batch_prediction_config
+            self.schema_columns=read_yaml_file(SCHEMA_FILE_PATH)["columns"] # every chunk gets the schema.yaml dtypes, whatever its values
+        except Exception as e:
+            raise RefurbishedCarException(e,sys)
+
+    def load_model(self)->NetworkModel:
+        """
+        Load the model bundle once for the whole run, its memory-mapped arrays are shared with the workers
+        """
+        try:
+            return load_model_bundle(self.batch_prediction_config.model_bundle_file_path,mmap_mode=self.batch_prediction_config.mmap_mode)
+        except Exception as e:
+            raise RefurbishedCarException(e,sys)
+
+    def iter_input_chunks(self):
+        """
+        Yield the input listings in chunks, from the input file or from the mongodb collection
+        """
+        try:
+            chunk_size=self.batch_prediction_config.chunk_size
+            if self.batch_prediction_config.input_file_path is not None:
+                yield from iter_dataframe_chunks(self.batch_prediction_config.input_file_path,chunk_size,schema_columns=self.schema_columns)
+                return
+
+            collection=get_collection(self.batch_prediction_config.database_name,self.batch_prediction_config.collection_name)
+            cursor=collection.find({},{"_id":0,DATA_INGESTION_UPDATED_AT_FIELD:0,DATA_INGESTION_CONTENT_HASH_FIELD:0},batch_size=chunk_size)
+            while True:
+                batch=list(itertools.islice(cursor,chunk_size))
+                if not batch:
+                    break
+                dataframe=pd.DataFrame.from_records(batch)
+                dataframe.replace({"na":np.nan},inplace=True)
+                yield enforce_schema(dataframe,self.schema_columns)
+        except Exception as e:
+            raise RefurbishedCarException(e,sys)
+
+    def initiate_batch_prediction(self)->BatchPredictionArtifact:
+        """
+        Score the input chunk by chunk on a pool of worker processes. At most two chunks
+        per worker are in flight, and predictions are appended to the output file in input
+        order as soon as they are ready, so memory stays bounded whatever the input size
+        """
+        try:
+            start_time=time.perf_counter()
+            network_model=self.load_model()
+            n_jobs=self.batch_prediction_config.n_jobs or os.cpu_count() or 1
+            prediction_column=self.batch_prediction_config.prediction_column
+            chunk_metrics=[]
+            number_of_rows=0
+
+            executor=None
+            if n_jobs>1:
+                # fork lets every worker share the already loaded model pages instead of unpickling its own copy
+                start_method="fork" if "fork" in multiprocessing.get_all_start_methods() else None
+                executor=ProcessPoolExecutor(
+                    max_workers=n_jobs,
+                    mp_context=multiprocessing.get_context(start_method),
+                    initializer=_init_worker,
+                    initargs=(network_model,),
+                )
+            else:
+                _init_worker(network_model)
+
+            def write_result(writer,chunk_index,dataframe,predictions,predict_seconds,submitted_at):
+                dataframe[prediction_column]=predictions
+                writer.write(dataframe)
+                metrics={
+                    "chunk":chunk_index,
+                    "rows":len(dataframe),
+                    "predict_seconds":round(predict_seconds,4),
+                    "rows_per_second":round(len(dataframe)/max(predict_seconds,1e-9),1),
+                    "latency_seconds":round(time.perf_counter()-submitted_at,4),
+                }
+                chunk_metrics.append(metrics)
+                logging.info(f"Batch prediction chunk metrics: {metrics}")
+
+            try:
+                with DataFrameChunkWriter(self.batch_prediction_config.prediction_file_path,schema_columns=self.schema_columns) as writer:
+                    in_flight=deque()
+                    for chunk_index,dataframe in enumerate(self.iter_input_chunks()):
+                        number_of_rows+=len(dataframe)
+                        submitted_at=time.perf_counter()
+                        if executor is None:
+                            predictions,predict_seconds=_predict_chunk(dataframe)
+                            write_result(writer,chunk_index,dataframe,predictions,predict_seconds,submitted_at)
+                            continue
+                        in_flight.append((chunk_index,dataframe,executor.submit(_predict_chunk,dataframe),submitted_at))
+                        if len(in_flight)>=2*n_jobs:
+                            chunk_index,dataframe,future,submitted_at=in_flight.popleft()
+                            write_result(writer,chunk_index,dataframe,*future.result(),submitted_at)
+                    while in_flight:
+                        chunk_index,dataframe,future,submitted_at=in_flight.popleft()
+                        write_result(writer,chunk_index,dataframe,*future.result(),submitted_at)
+            finally:
+                if executor is not None:
+                    executor.shutdown()
+
+            elapsed=time.perf_counter()-start_time
+            logging.info(
+                f"Batch prediction scored {number_of_rows} rows in {elapsed:.2f}s "
+                f"({number_of_rows/max(elapsed,1e-9):.0f} rows/s) with {n_jobs} workers, peak rss {get_peak_rss_mb()} MB"
+            )
+            batch_prediction_artifact=BatchPredictionArtifact(
+                prediction_file_path=self.batch_prediction_config.prediction_file_path,
+                number_of_rows=number_of_rows,
+                elapsed_seconds=elapsed,
+                chunk_metrics=chunk_metrics,
+            )
+            return batch_prediction_artifact
+        except Exception as e:
+            raise RefurbishedCarException(e,sys)
@@ -0,0 +1,214 @@
+import os
+import sys
+import mmap
+import time
+import threading
+import multiprocessing
+
+import numpy as np
+
+from refurbished_car.exception.exception import RefurbishedCarException
+from refurbished_car.logging.logger import logging
+
+from refurbished_car.entity.config_entity import PredictionPoolConfig
+from refurbished_car.utils.ml_utils.model.estimator import NetworkModel,load_model_bundle
+
+
+def _shared_array(shape:tuple)->np.ndarray:
+    """
+    float64 array over an anonymous shared mapping: created before the fork, the parent and
+    the worker see the same pages, with no file, name or cleanup involved
+    """
+    size=max(int(np.prod(shape))*8,mmap.PAGESIZE)
+    return np.frombuffer(mmap.mmap(-1,size),dtype="float64",count=int(np.prod(shape))).reshape(shape)
+
+
+def _worker_loop(connection,network_model:NetworkModel,input_buffer:np.ndarray,output_buffer:np.ndarray)->None:
+    """
+    Wait for "n rows are in the input buffer", predict them into the output buffer and reply with
+    the time spent. Only those small messages go through the pipe, the rows never get pickled
+    """
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(1) # one process per core already, nested blas/openmp threads would only oversubscribe
+    except ImportError:
+        pass
+    while True:
+        try:
+            number_of_rows=connection.recv()
+        except EOFError:
+            break
+        if number_of_rows is None:
+            break
+        start_time=time.perf_counter()
+        try:
+            output_buffer[:number_of_rows]=network_model.predict_encoded(input_buffer[:number_of_rows])
+            connection.send(("ok",time.perf_counter()-start_time))
+        except Exception as e:
+            connection.send(("error",repr(e)))
+    connection.close()
+
+
+class PredictionWorkerPool:
+    """
+    Scores listings on n_workers forked processes. The model bundle is loaded once in the parent
+    and the workers are forked afterwards, so they share its pages copy-on-write instead of each
+    loading a copy. Every worker owns a pair of shared-memory buffers: the parent writes encoded
+    rows (CompiledPreprocessor encoded layout) into the input buffer, sends the row count over a
+    pipe and reads the predictions back from the output buffer. A batch is split evenly across
+    the workers, so one call uses every core; concurrent callers take turns
+    """
+    def __init__(self,prediction_pool_config:PredictionPoolConfig,network_model:NetworkModel=None):
+        try:
+            self.prediction_pool_config=prediction_pool_config
+            self.network_model=network_model
+            self.n_workers=prediction_pool_config.n_workers or os.cpu_count() or 1
+            self.max_batch_rows=prediction_pool_config.max_batch_rows
+            self.workers=[]
+            self._lock=threading.Lock()
+            self.number_of_batches=0
+            self.number_of_rows=0
+            self.worker_seconds=0.0
+        except Exception as e:
+            raise RefurbishedCarException(e,sys)
+
+    def start(self)->"PredictionWorkerPool":
+        try:
+            if self.network_model is None:
+                self.network_model=load_model_bundle(
+                    self.prediction_pool_config.model_bundle_file_path,mmap_mode=self.prediction_pool_config.mmap_mode
+                )
+            if self.network_model.compiled_preprocessor is None:
+                raise ValueError("The prediction pool needs a compiled preprocessor to exchange rows through shared memory")
+            if "fork" not in multiprocessing.get_all_start_methods():
+                raise ValueError("The prediction pool shares the loaded model with its workers by forking, which this platform does not support")
+
+            n_columns=len(self.network_model.compiled_preprocessor.feature_names)
+            context=multiprocessing.get_context("fork")
+            for _ in range(self.n_workers):
+                input_buffer=_shared_array((self.max_batch_rows,n_columns))
+                output_buffer=_shared_array((self.max_batch_rows,))
+                parent_connection,child_connection=context.Pipe(duplex=True)
+                process=context.Process(
+                    target=_worker_loop,args=(child_connection,self.network_model,input_buffer,output_buffer),daemon=True
+                )
+                process.start()
+                child_connection.close()
+                self.workers.append((process,parent_connection,input_buffer,output_buffer))
+            logging.info(
+                f"Prediction pool started {self.n_workers} workers for model bundle {self.network_model.version} "
+                f"with {self.max_batch_rows} rows per worker batch"
+            )
+            return self
+        except Exception as e:
+            raise RefurbishedCarException(e,sys)
+
+    def restart(self)->None:
+        """
+        Replace every worker, after one died or the pipes may be out of step
+        """
+        try:
+            logging.warning(f"Restarting the {len(self.workers)} prediction pool workers")
+            self.stop()
+            self.start()
+        except Exception as e:
+            raise RefurbishedCarException(e,sys)
+
+    def stop(self)->None:
+        for process,connection,_,_ in self.workers:
+            try:
+                connection.send(None)
+                connection.close()
+            except OSError:
+                pass
+        for process,_,_,_ in self.workers:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self.workers=[]
+
+    def _check_started(self)->None:
+        if not self.workers:
+            raise RuntimeError("The prediction pool has no workers, call start() or use it as a context manager before predicting")
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self,exc_type,exc_value,traceback):
+        self.stop()
+
+    def predict_encoded(self,encoded:np.ndarray)->np.ndarray:
+        """
+        Predict encoded rows, split evenly across the workers in rounds of at most max_batch_rows per worker.
+        Every dispatched worker's reply is read before a failure is raised, so the pipes stay in step with the
+        next call; a dead worker (closed pipe) makes the pool restart its workers before raising
+        """
+        try:
+            self._check_started()
+            number_of_rows=len(encoded)
+            predictions=np.empty(number_of_rows,dtype="float64")
+            if number_of_rows==0:
+                return predictions
+            rows_per_worker=min(self.max_batch_rows,-(-number_of_rows//len(self.workers)))
+            with self._lock:
+                for round_start in range(0,number_of_rows,rows_per_worker*len(self.workers)):
+                    dispatched=[]
+                    errors=[]
+                    broken=False
+                    for worker_index,(_,connection,input_buffer,_) in enumerate(self.workers):
+                        start=round_start+worker_index*rows_per_worker
+                        stop=min(start+rows_per_worker,number_of_rows)
+                        if start>=stop:
+                            break
+                        input_buffer[:stop-start]=encoded[start:stop]
+                        try:
+                            connection.send(stop-start)
+                        except (BrokenPipeError,EOFError,OSError) as e:
+                            errors.append(f"worker {worker_index} is gone: {e!r}")
+                            broken=True
+                            continue
+                        dispatched.append((worker_index,start,stop))
+                    for worker_index,start,stop in dispatched:
+                        _,connection,_,output_buffer=self.workers[worker_index]
+                        try:
+                            status,result=connection.recv()
+                        except (EOFError,OSError) as e:
+                            errors.append(f"worker {worker_index} is gone: {e!r}")
+                            broken=True
+                            continue
+                        if status!="ok":
+                            errors.append(f"worker {worker_index} failed: {result}")
+                            continue
+                        predictions[start:stop]=output_buffer[:stop-start]
+                        self.worker_seconds+=result
+                    if broken:
+                        self.restart()
+                    if errors:
+                        raise RuntimeError(f"Prediction pool batch failed, {'; '.join(errors)}")
+                self.number_of_batches+=1
+                self.number_of_rows+=number_of_rows
+            return predictions
+        except Exception as e:
+            raise RefurbishedCarException(e,sys)
+
+    def predict(self,dataframe)->np.ndarray:
+        try:
+            self._check_started()
+            return self.predict_encoded(self.network_model.compiled_preprocessor.encode_dataframe(dataframe))
+        except Exception as e:
+            raise RefurbishedCarException(e,sys)
+
+    def predict_records(self,records)->np.ndarray:
+        try:
+            self._check_started()
+            return self.predict_encoded(self.network_model.compiled_preprocessor.encode_records(records))
+        except Exception as e:
+            raise RefurbishedCarException(e,sys)
+
+    def metrics(self)->dict:
+        return {
+            "workers":len(self.workers),
+            "batches":self.number_of_batches,
+            "rows":self.number_of_rows,
+            "worker_seconds":round(self.worker_seconds,4),
+        }
@@ -0,0 +1,201 @@
+import sys
+import time
+import asyncio
+from collections import deque
+
+import numpy as np
+
+from refurbished_car.exception.exception import RefurbishedCarException
+from refurbished_car.logging.logger import logging
+
+from refurbished_car.entity.config_entity import PredictionServiceConfig
+from refurbished_car.utils.ml_utils.model.estimator import NetworkModel,load_model_bundle
+from refurbished_car.utils.ml_utils.model.prediction_cache import PredictionCache
+
+
+class LatencyTracker:
+    """
+    Keeps the most recent request latencies and reports their percentiles
+    """
+    def __init__(self,window_size:int):
+        self.latencies=deque(maxlen=window_size)
+        self.total_requests=0
+
+    def record(self,seconds:float)->None:
+        self.latencies.append(seconds)
+        self.total_requests+=1
+
+    def snapshot(self)->dict:
+        if not self.latencies:
+            return {"total_requests":self.total_requests,"window":0}
+        latencies_ms=np.fromiter(self.latencies,dtype="float64")*1000
+        p50,p90,p99=np.percentile(latencies_ms,[50,90,99])
+        return {
+            "total_requests":self.total_requests,
+            "window":len(latencies_ms),
+            "p50_ms":round(float(p50),3),
+            "p90_ms":round(float(p90),3),
+            "p99_ms":round(float(p99),3),
+            "max_ms":round(float(latencies_ms.max()),3),
+        }
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent prediction requests into one vectorized predict call.
+    The first queued request opens a batch which is closed when it reaches max_batch_size
+    records or max_wait_ms has passed; requests arriving while a batch is being scored
+    queue up for the next one
+    """
+    def __init__(self,network_model:NetworkModel,max_batch_size:int,max_wait_ms:float):
+        self.network_model=network_model
+        self.max_batch_size=max_batch_size
+        self.max_wait_seconds=max_wait_ms/1000
+        self.queue=None
+        self.worker=None
+        self.batch_sizes=deque(maxlen=1000) # rolling window of coalesced batch sizes
+        self.number_of_batches=0
+
+    async def start(self)->None:
+        self.queue=asyncio.Queue()
+        self.worker=asyncio.create_task(self._run())
+
+    async def stop(self)->None:
+        if self.worker is not None:
+            self.worker.cancel()
+            try:
+                await self.worker
+            except asyncio.CancelledError:
+                pass
+            self.worker=None
+
+    async def predict(self,records:list)->list:
+        if not records:
+            return [] # nothing to score, an empty request must not open a batch
+        future=asyncio.get_running_loop().create_future()
+        await self.queue.put((records,future))
+        return await future
+
+    async def _run(self)->None:
+        loop=asyncio.get_running_loop()
+        while True:
+            pending=[await self.queue.get()]
+            number_of_records=len(pending[0][0])
+            deadline=loop.time()+self.max_wait_seconds
+            while number_of_records<self.max_batch_size:
+                timeout=deadline-loop.time()
+                if timeout<=0:
+                    break
+                try:
+                    item=await asyncio.wait_for(self.queue.get(),timeout)
+                except asyncio.TimeoutError:
+                    break
+                pending.append(item)
+                number_of_records+=len(item[0])
+
+            records=[record for item,_ in pending for record in item]
+            try:
+                # predict off the event loop so new requests keep queueing for the next batch meanwhile
+                predictions=await loop.run_in_executor(None,self.network_model.predict_records,records)
+                self.batch_sizes.append(len(records))
+                self.number_of_batches+=1
+                offset=0
+                for item,future in pending:
+                    if not future.done():
+                        future.set_result([float(value) for value in predictions[offset:offset+len(item)]])
+                    offset+=len(item)
+            except Exception as e:
+                logging.error(f"Prediction batch of {len(records)} records failed: {e}")
+                if len(pending)==1:
+                    if not pending[0][1].done():
+                        pending[0][1].set_exception(e)
+                    continue
+                # score every request on its own, so one bad request only fails itself
+                for item,future in pending:
+                    try:
+                        predictions=await loop.run_in_executor(None,self.network_model.predict_records,item)
+                        if not future.done():
+                            future.set_result([float(value) for value in predictions])
+                    except Exception as request_error:
+                        if not future.done():
+                            future.set_exception(request_error)
+
+
+class PredictionService:
+    """
+    Holds the warm model, the prediction cache and the request coalescer for the online pricing api.
+    Cached quotes are answered straight away, only the missed records are queued for the batcher
+    """
+    def __init__(self,prediction_service_config:PredictionServiceConfig):
+        try:
+            self.prediction_service_config=prediction_service_config
+            self.network_model=None
+            self.batcher=None
+            self.prediction_cache=None
+            if prediction_service_config.cache_enabled:
+                self.prediction_cache=PredictionCache(
+                    max_entries=prediction_service_config.cache_max_entries,
+                    ttl_seconds=prediction_service_config.cache_ttl_seconds,
+                )
+            self.latency=LatencyTracker(window_size=prediction_service_config.latency_window_size)
+        except Exception as e:
+            raise RefurbishedCarException(e,sys)
+
+    async def start(self)->None:
+        """
+        Load the model bundle once and warm it up before taking traffic
+        """
+        try:
+            start_time=time.perf_counter()
+            self.network_model=load_model_bundle(
+                self.prediction_service_config.model_bundle_file_path,mmap_mode=self.prediction_service_config.mmap_mode
+            )
+            self.warm_up()
+            self.batcher=MicroBatcher(
+                network_model=self.network_model,
+                max_batch_size=self.prediction_service_config.max_batch_size,
+                max_wait_ms=self.prediction_service_config.max_wait_ms,
+            )
+            await self.batcher.start()
+            logging.info(f"Prediction service loaded model bundle {self.network_model.version} in {time.perf_counter()-start_time:.3f}s")
+        except Exception as e:
+            raise RefurbishedCarException(e,sys)
+
+    def warm_up(self)->None:
+        """
+        Run one all-missing record through the model so the first real quote does not pay for lazy initialisation
+        """
+        try:
+            feature_names=getattr(self.network_model.preprocessor,"feature_names_in_",None)
+            if feature_names is not None:
+                self.network_model.predict_records([{column:None for column in feature_names}])
+        except Exception as e:
+            logging.warning(f"Prediction service warm up failed: {e}")
+
+    async def stop(self)->None:
+        if self.batcher is not None:
+            await self.batcher.stop()
+
+    async def predict(self,records:list)->list:
+        start_time=time.perf_counter()
+        if self.prediction_cache is None:
+            predictions=await self.batcher.predict(records)
+        else:
+            keys,predictions,missed=self.prediction_cache.lookup(self.network_model,records)
+            if missed:
+                missed_predictions=await self.batcher.predict([records[index] for index in missed])
+                self.prediction_cache.store(self.network_model,[keys[index] for index in missed],missed_predictions)
+                for index,prediction in zip(missed,missed_predictions):
+                    predictions[index]=prediction
+        self.latency.record(time.perf_counter()-start_time)
+        return predictions
+
+    def metrics(self)->dict:
+        metrics={"latency":self.latency.snapshot()}
+        if self.batcher is not None and self.batcher.batch_sizes:
+            metrics["batches"]=self.batcher.number_of_batches
+            metrics["mean_batch_size"]=round(float(np.mean(self.batcher.batch_sizes)),2)
+            metrics["max_batch_size"]=int(max(self.batcher.batch_sizes))
+        if self.prediction_cache is not None:
+            metrics["cache"]=self.prediction_cache.stats()
+        return metrics
@@ -0,0 +1,188 @@
+import os
+import sys
+import json
+import shutil
+import hashlib
+import dataclasses
+import typing
+from datetime import datetime
+
+from refurbished_car.exception.exception import RefurbishedCarException
+from refurbished_car.logging.logger import logging
+
+
+def _artifact_from_dict(artifact_class,content:dict):
+    """
+    Rebuild an artifact dataclass, including nested metric artifacts, from dataclasses.asdict output
+    """
+    field_types=typing.get_type_hints(artifact_class)
+    values={}
+    for field in dataclasses.fields(artifact_class):
+        value=content.get(field.name)
+        if dataclasses.is_dataclass(field_types[field.name]) and isinstance(value,dict):
+            value=_artifact_from_dict(field_types[field.name],value)
+        values[field.name]=value
+    return artifact_class(**values)
+
+
+def _artifact_file_paths(artifact)->list:
+    """
+    Every file an artifact points to, found by walking its string fields
+    """
+    paths=[]
+    for field in dataclasses.fields(artifact):
+        value=getattr(artifact,field.name)
+        if dataclasses.is_dataclass(value):
+            paths.extend(_artifact_file_paths(value))
+        elif isinstance(value,str) and os.path.isfile(value):
+            paths.append(value)
+    return paths
+
+
+class StageCache:
+    """
+    Index of completed training pipeline stages, one small json entry per (stage, key) under
+    Artifacts/stage_cache. The key hashes the stage config, the content of its input files, the
+    schema and the source of the code that runs it (the stage's component plus the shared
+    modules), so a stage whose inputs did not change is skipped and its previous artifact
+    reused. Stages are recorded as soon as they complete, so
+    rerunning after a failure resumes right after the last completed stage
+    """
+    def __init__(self,cache_dir:str,code_paths:list,artifact_root:str):
+        try:
+            self.cache_dir=cache_dir
+            self.artifact_root=artifact_root # Artifacts/, holding one timestamped directory per run
+            self._file_digests={} # (path, size, mtime_ns) -> sha256, so every file is read at most once per run
+            self.code_digest=self._hash_code(code_paths)
+        except Exception as e:
+            raise RefurbishedCarException(e,sys)
+
+    def file_digest(self,file_path:str)->str:
+        stat=os.stat(file_path)
+        memo_key=(os.path.abspath(file_path),stat.st_size,stat.st_mtime_ns)
+        if memo_key not in self._file_digests:
+            digest=hashlib.sha256()
+            with open(file_path,"rb") as file_obj:
+                for block in iter(lambda:file_obj.read(1<<20),b""):
+                    digest.update(block)
+            self._file_digests[memo_key]=digest.hexdigest()
+        return self._file_digests[memo_key]
+
+    def _hash_code(self,code_paths:list)->str:
+        digest=hashlib.sha256()
+        for code_path in code_paths:
+            if os.path.isdir(code_path):
+                file_paths=sorted(
+                    os.path.join(root,file_name)
+                    for root,_,file_names in os.walk(code_path)
+                    for file_name in file_names if file_name.endswith(".py")
+                )
+            else:
+                file_paths=[code_path]
+            for file_path in file_paths:
+                digest.update(file_path.encode())
+                digest.update(self.file_digest(file_path).encode())
+        return digest.hexdigest()
+
+    def relative_artifact_path(self,file_path:str)->str:
+        """
+        Path of an artifact file inside its run directory (data_validation/validated/train.parquet), so the
+        same file of two runs keys alike while files sharing a name in different directories do not
+        """
+        relative_path=os.path.relpath(os.path.abspath(file_path),os.path.abspath(self.artifact_root))
+        parts=relative_path.split(os.sep)
+        if parts[0]==os.pardir or len(parts)<2:
+            return relative_path # outside of Artifacts/<timestamp>
+        return "/".join(parts[1:])
+
+    @staticmethod
+    def config_fingerprint(config)->dict:
+        """
+        Settings of a stage config without its run-specific (timestamped) paths
+        """
+        return {
+            name:value for name,value in vars(config).items()
+            if not (name.endswith("_dir") or name.endswith("_path"))
+        }
+
+    def stage_key(self,stage_name:str,config,inputs,code_path:str=None)->str:
+        """
+        inputs: upstream artifact whose files are hashed by content, or a dict describing an external source
+        code_path: source file of the stage's component, so editing one component only invalidates its own stage onwards
+        """
+        try:
+            if dataclasses.is_dataclass(inputs):
+                inputs={
+                    self.relative_artifact_path(file_path):self.file_digest(file_path)
+                    for file_path in _artifact_file_paths(inputs)
+                }
+            content={
+                "stage":stage_name,
+                "config":self.config_fingerprint(config),
+                "inputs":inputs,
+                "code":self.code_digest,
+                "component":self.file_digest(code_path) if code_path is not None else None,
+            }
+            return hashlib.sha256(json.dumps(content,sort_keys=True,default=str).encode()).hexdigest()
+        except Exception as e:
+            raise RefurbishedCarException(e,sys)
+
+    def _entry_dir(self,stage_name:str,key:str)->str:
+        return os.path.join(self.cache_dir,stage_name,key)
+
+    def load(self,stage_name:str,key:str,artifact_class):
+        """
+        Previous artifact of this stage and key, None on a miss or when any of its files has changed or been removed
+        """
+        try:
+            entry_file_path=os.path.join(self._entry_dir(stage_name,key),"entry.json")
+            if not os.path.exists(entry_file_path):
+                return None
+            with open(entry_file_path,"r") as file_obj:
+                entry=json.load(file_obj)
+            for file_path,(size,mtime_ns,sha256) in entry["files"].items():
+                if not os.path.isfile(file_path) or os.path.getsize(file_path)!=size:
+                    logging.info(f"Stage cache entry {stage_name}/{key[:12]} is stale, {file_path} changed")
+                    return None
+                if os.stat(file_path).st_mtime_ns==mtime_ns:
+                    self._file_digests[(os.path.abspath(file_path),size,mtime_ns)]=sha256
+                elif self.file_digest(file_path)!=sha256:
+                    logging.info(f"Stage cache entry {stage_name}/{key[:12]} is stale, {file_path} changed")
+                    return None
+            # files the stage also publishes outside its artifact dir (final_model/*) are put back
+            for target_path,cached_path in entry["side_outputs"].items():
+                os.makedirs(os.path.dirname(target_path) or ".",exist_ok=True)
+                shutil.copy2(cached_path,target_path)
+            logging.info(f"Stage cache hit for {stage_name} ({key[:12]}), reusing the artifact of {entry['created_at']}")
+            return _artifact_from_dict(artifact_class,entry["artifact"])
+        except Exception as e:
+            raise RefurbishedCarException(e,sys)
+
+    def save(self,stage_name:str,key:str,artifact,side_outputs:list=())->None:
+        try:
+            entry_dir=self._entry_dir(stage_name,key)
+            os.makedirs(entry_dir,exist_ok=True)
+            files={}
+            for file_path in _artifact_file_paths(artifact):
+                stat=os.stat(file_path)
+                files[file_path]=[stat.st_size,stat.st_mtime_ns,self.file_digest(file_path)]
+            cached_side_outputs={}
+            for target_path in side_outputs:
+                cached_path=os.path.join(entry_dir,os.path.basename(target_path))
+                shutil.copy2(target_path,cached_path)
+                cached_side_outputs[target_path]=cached_path
+            entry={
+                "stage":stage_name,
+                "key":key,
+                "created_at":datetime.now().isoformat(timespec="seconds"),
+                "artifact":dataclasses.asdict(artifact),
+                "files":files,
+                "side_outputs":cached_side_outputs,
+            }
+            # written to a temporary file first, a crash mid-write must not leave a half entry behind
+            temp_file_path=os.path.join(entry_dir,"entry.json.tmp")
+            with open(temp_file_path,"w") as file_obj:
+                json.dump(entry,file_obj,indent=2,default=str)
+            os.replace(temp_file_path,os.path.join(entry_dir,"entry.json"))
+        except Exception as e:
+            raise RefurbishedCarException(e,sys)
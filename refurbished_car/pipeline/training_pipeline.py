@@ -1,13 +1,11 @@
 import os
 import sys
+import inspect
 
 from refurbished_car.exception.exception import RefurbishedCarException
 from refurbished_car.logging.logger import logging
 
-from refurbished_car.components.data_ingestion import DataIngestion
-from refurbished_car.components.data_validation import DataValidation
-from refurbished_car.components.data_transformation import DataTransformation
-from refurbished_car.components.model_trainer import ModelTrainer
+## the components (pandas, pymongo, sklearn, scipy) are imported by the stage that runs them, so importing the pipeline stays fast
 
 from refurbished_car.entity.config_entity import(
     TrainingPipelineConfig,
@@ -26,7 +24,15 @@ from refurbished_car.entity.artifact_entity import (
 
 from refurbished_car.constant.training_pipeline import TRAINING_BUCKET_NAME
 from refurbished_car.cloud.s3_syncer import S3Sync
-from refurbished_car.constant.training_pipeline import SAVED_MODEL_DIR
+from refurbished_car.constant.training_pipeline import SAVED_MODEL_DIR,SCHEMA_FILE_PATH,MODEL_BUNDLE_FILE_NAME
+from refurbished_car.constant.training_pipeline import (
+    DATA_INGESTION_DIR_NAME,
+    DATA_VALIDATION_DIR_NAME,
+    DATA_TRANSFORMATION_DIR_NAME,
+    MODEL_TRAINER_DIR_NAME,
+)
+from refurbished_car.pipeline.stage_cache import StageCache
+from refurbished_car.utils.main_utils.instrumentation import RunInstrumentation
 import sys
 
 
@@ -34,14 +40,56 @@ class TrainingPipeline:
     def __init__(self):
         self.training_pipeline_config=TrainingPipelineConfig()
         self.s3_sync = S3Sync()
+        self.stage_cache=None
+        self.instrumentation=None
+        if self.training_pipeline_config.use_stage_cache:
+            package_dir=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            self.stage_cache=StageCache(
+                cache_dir=self.training_pipeline_config.stage_cache_dir,
+                # code shared by every stage, editing it or the schema invalidates all of them
+                code_paths=[os.path.join(package_dir,name) for name in ("constant","entity","utils")]+[SCHEMA_FILE_PATH],
+                artifact_root=self.training_pipeline_config.artifact_name,
+            )
+
+    def run_stage(self,stage_name:str,config,inputs,artifact_class,run,side_outputs:list=()):
+        """
+        Reuse the cached artifact of a stage whose config, inputs and code are unchanged,
+        otherwise run it and record its artifact so the next run (or a retry after a failure) can skip it.
+        inputs None runs the stage without the cache
+        """
+        try:
+            if self.stage_cache is None or inputs is None:
+                return run()
+            # unwrap the instrument_stage decorator to hash the component's own source
+            key=self.stage_cache.stage_key(stage_name,config,inputs,code_path=inspect.getsourcefile(inspect.unwrap(run)))
+            artifact=self.stage_cache.load(stage_name,key,artifact_class)
+            if artifact is not None:
+                if self.instrumentation is not None:
+                    self.instrumentation.record_cached_stage(stage_name)
+                return artifact
+            artifact=run()
+            self.stage_cache.save(stage_name,key,artifact,side_outputs=side_outputs)
+            return artifact
+        except Exception as e:
+            raise RefurbishedCarException(e,sys)
         
 
     def start_data_ingestion(self):
         try:
+            from refurbished_car.components.data_ingestion import DataIngestion
+
             self.data_ingestion_config=DataIngestionConfig(training_pipeline_config=self.training_pipeline_config)
             logging.info("Start data Ingestion")
             data_ingestion=DataIngestion(data_ingestion_config=self.data_ingestion_config)
-            data_ingestion_artifact=data_ingestion.initiate_data_ingestion()
+            data_ingestion_artifact=self.run_stage(
+                stage_name=DATA_INGESTION_DIR_NAME,
+                config=self.data_ingestion_config,
+                # downstream stages are keyed by the content of the exported files, which is sorted on the listing key,
+                # so they are still cached when this one is not
+                inputs=data_ingestion.get_source_fingerprint() if self.stage_cache is not None and self.data_ingestion_config.use_stage_cache else None,
+                artifact_class=DataIngestionArtifact,
+                run=data_ingestion.initiate_data_ingestion,
+            )
             logging.info(f"Data Ingestion completed and artifact: {data_ingestion_artifact}")
             return data_ingestion_artifact
         
@@ -50,27 +98,45 @@ class TrainingPipeline:
         
     def start_data_validation(self,data_ingestion_artifact:DataIngestionArtifact):
         try:
+            from refurbished_car.components.data_validation import DataValidation
+
             data_validation_config=DataValidationConfig(training_pipeline_config=self.training_pipeline_config)
             data_validation=DataValidation(data_ingestion_artifact=data_ingestion_artifact,data_validation_config=data_validation_config)
             logging.info("Initiate the data Validation")
-            data_validation_artifact=data_validation.initiate_data_validation()
+            data_validation_artifact=self.run_stage(
+                stage_name=DATA_VALIDATION_DIR_NAME,
+                config=data_validation_config,
+                inputs=data_ingestion_artifact,
+                artifact_class=DataValidationArtifact,
+                run=data_validation.initiate_data_validation,
+            )
             return data_validation_artifact
         except Exception as e:
             raise RefurbishedCarException(e,sys)
         
     def start_data_transformation(self,data_validation_artifact:DataValidationArtifact):
         try:
+            from refurbished_car.components.data_transformation import DataTransformation
+
             data_transformation_config = DataTransformationConfig(training_pipeline_config=self.training_pipeline_config)
             data_transformation = DataTransformation(data_validation_artifact=data_validation_artifact,
             data_transformation_config=data_transformation_config)
             
-            data_transformation_artifact = data_transformation.initiate_data_transformation()
+            data_transformation_artifact = self.run_stage(
+                stage_name=DATA_TRANSFORMATION_DIR_NAME,
+                config=data_transformation_config,
+                inputs=data_validation_artifact,
+                artifact_class=DataTransformationArtifact,
+                run=data_transformation.initiate_data_transformation,
+            )
             return data_transformation_artifact
         except Exception as e:
             raise RefurbishedCarException(e,sys)
         
     def start_model_trainer(self,data_transformation_artifact:DataTransformationArtifact)->ModelTrainerArtifact:
         try:
+            from refurbished_car.components.model_trainer import ModelTrainer
+
             self.model_trainer_config: ModelTrainerConfig = ModelTrainerConfig(
                 training_pipeline_config=self.training_pipeline_config
             )
@@ -80,7 +146,14 @@ class TrainingPipeline:
                 model_trainer_config=self.model_trainer_config,
             )
 
-            model_trainer_artifact = model_trainer.initiate_model_trainer()
+            model_trainer_artifact = self.run_stage(
+                stage_name=MODEL_TRAINER_DIR_NAME,
+                config=self.model_trainer_config,
+                inputs=data_transformation_artifact,
+                artifact_class=ModelTrainerArtifact,
+                run=model_trainer.initiate_model_trainer,
+                side_outputs=[os.path.join(self.training_pipeline_config.model_dir,MODEL_BUNDLE_FILE_NAME)],
+            )
 
             return model_trainer_artifact
 
@@ -108,10 +181,18 @@ class TrainingPipeline:
     
     def run_pipeline(self):
         try:
-            data_ingestion_artifact=self.start_data_ingestion()
-            data_validation_artifact=self.start_data_validation(data_ingestion_artifact=data_ingestion_artifact)
-            data_transformation_artifact=self.start_data_transformation(data_validation_artifact=data_validation_artifact)
-            model_trainer_artifact=self.start_model_trainer(data_transformation_artifact=data_transformation_artifact)
+            ## every initiate_* stage reports into this run, saved as Artifacts/<timestamp>/run_report.json
+            self.instrumentation=RunInstrumentation(
+                run_report_file_path=self.training_pipeline_config.run_report_file_path,
+                profile_stages=self.training_pipeline_config.profile_stages,
+                profile_dir=self.training_pipeline_config.profile_dir,
+                run_name=self.training_pipeline_config.timestamp,
+            )
+            with self.instrumentation:
+                data_ingestion_artifact=self.start_data_ingestion()
+                data_validation_artifact=self.start_data_validation(data_ingestion_artifact=data_ingestion_artifact)
+                data_transformation_artifact=self.start_data_transformation(data_validation_artifact=data_validation_artifact)
+                model_trainer_artifact=self.start_model_trainer(data_transformation_artifact=data_transformation_artifact)
             
             self.sync_artifact_dir_to_s3()
             self.sync_saved_model_dir_to_s3()
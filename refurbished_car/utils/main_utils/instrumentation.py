@@ -0,0 +1,285 @@
+import os
+import json
+import time
+import pstats
+import cProfile
+import functools
+from datetime import datetime
+
+from refurbished_car.logging.logger import logging
+from refurbished_car.utils.main_utils.utils import get_peak_rss_mb
+
+try:
+    import resource
+except ImportError: # not available on windows
+    resource=None
+
+try:
+    import psutil
+except ImportError: # optional, without it the cpu time of live worker processes is not seen
+    psutil=None
+
+## what cpu_seconds covers: joblib/loky and process pool workers stay alive across calls, and the
+## resource module only counts a child once it has exited and been reaped
+if psutil is not None:
+    CPU_SCOPE="process_tree"
+elif resource is not None:
+    CPU_SCOPE="main_process_and_exited_children"
+else:
+    CPU_SCOPE="main_process"
+
+## instrumentation of the pipeline run in progress, set by RunInstrumentation.__enter__
+_active_run=None
+
+
+def _read_io_counters():
+    """
+    Bytes read and written by this process so far, including sockets (mongodb traffic) and the page cache.
+    None where /proc/self/io is not available
+    """
+    try:
+        counters={}
+        with open("/proc/self/io","r") as file_obj:
+            for line in file_obj:
+                name,value=line.split(":")
+                counters[name]=int(value)
+        return counters["rchar"],counters["wchar"]
+    except (OSError,KeyError,ValueError):
+        return None
+
+
+def _read_status_mb(field:str):
+    """
+    A memory field of /proc/self/status (VmRSS, VmHWM) in MB, None where it is not available
+    """
+    try:
+        with open("/proc/self/status","r") as file_obj:
+            for line in file_obj:
+                if line.startswith(field+":"):
+                    return int(line.split()[1])/1024
+    except (OSError,ValueError):
+        pass
+    return None
+
+
+def _reset_peak_rss()->bool:
+    """
+    Reset VmHWM, so the peak read afterwards belongs to the stage and not to the whole process (Linux only)
+    """
+    try:
+        with open("/proc/self/clear_refs","w") as file_obj:
+            file_obj.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _live_children_cpu_seconds()->float:
+    """
+    CPU time of the child processes still running (pool workers), with the children they reaped
+    """
+    total=0.0
+    for child in psutil.Process().children(recursive=True):
+        try:
+            times=child.cpu_times()
+        except psutil.Error: # exited in the meantime
+            continue
+        total+=times.user+times.system+getattr(times,"children_user",0.0)+getattr(times,"children_system",0.0)
+    return total
+
+
+def _cpu_seconds()->float:
+    """
+    CPU time of this process and its child processes, as far as CPU_SCOPE allows
+    """
+    if resource is None:
+        seconds=time.process_time()
+    else:
+        own=resource.getrusage(resource.RUSAGE_SELF)
+        children=resource.getrusage(resource.RUSAGE_CHILDREN)
+        seconds=own.ru_utime+own.ru_stime+children.ru_utime+children.ru_stime
+    if psutil is not None:
+        seconds+=_live_children_cpu_seconds()
+    return seconds
+
+
+class RunInstrumentation:
+    """
+    Collects wall time, cpu time, peak rss, rows/sec and bytes read/written for every stage of a
+    pipeline run and saves them as a json run report. Stages listed in profile_stages (or "all")
+    also run under cProfile, with the stats dumped to profile_dir/<stage>.prof and a text summary.
+    cpu_seconds covers CPU_SCOPE. peak_rss_mb is the main process peak during the stage where the
+    peak can be reset (Linux), otherwise only process_peak_rss_mb, the peak since the process started
+    """
+    def __init__(self,run_report_file_path:str=None,profile_stages=None,profile_dir:str=None,run_name:str=None):
+        self.run_report_file_path=run_report_file_path
+        self.profile_stages=profile_stages or []
+        self.profile_dir=profile_dir
+        self.run_name=run_name
+        self.stages=[]
+        self._open_stages=[]
+        self._previous_run=None
+
+    def __enter__(self):
+        global _active_run
+        self._previous_run=_active_run
+        _active_run=self
+        self.started_at=datetime.now().isoformat(timespec="seconds")
+        self._start_wall=time.perf_counter()
+        self._start_cpu=_cpu_seconds()
+        return self
+
+    def __exit__(self,exc_type,exc_value,traceback):
+        global _active_run
+        _active_run=self._previous_run
+        self.status="failed" if exc_type is not None else "completed"
+        self.wall_seconds=time.perf_counter()-self._start_wall
+        self.cpu_seconds=_cpu_seconds()-self._start_cpu
+        if self.run_report_file_path is not None:
+            try:
+                self.write_report()
+            except Exception as e:
+                logging.warning(f"Could not write the run report: {e}")
+        return False
+
+    def _should_profile(self,stage_name:str)->bool:
+        if self.profile_dir is None:
+            return False
+        return self.profile_stages=="all" or stage_name in self.profile_stages
+
+    def start_stage(self,stage_name:str)->dict:
+        stage={
+            "stage":stage_name,
+            "status":"running",
+            "started_at":datetime.now().isoformat(timespec="seconds"),
+            "rows":None,
+            "_wall":time.perf_counter(),
+            "_cpu":_cpu_seconds(),
+            "_io":_read_io_counters(),
+            "_rss":_read_status_mb("VmRSS"),
+            "_peak":None,
+            "_profiler":None,
+        }
+        self._carry_peak_rss() # the reset below would lose the peak of the stages around this one
+        stage["_peak_reset"]=_reset_peak_rss()
+        if self._should_profile(stage_name):
+            stage["_profiler"]=cProfile.Profile()
+            stage["_profiler"].enable()
+        self._open_stages.append(stage)
+        return stage
+
+    def end_stage(self,stage:dict,status:str)->dict:
+        if stage["_profiler"] is not None:
+            stage["_profiler"].disable()
+            stage["profile_file_path"]=self._dump_profile(stage["stage"],stage["_profiler"])
+        wall_seconds=time.perf_counter()-stage["_wall"]
+        stage["status"]=status
+        stage["wall_seconds"]=round(wall_seconds,4)
+        stage["cpu_seconds"]=round(_cpu_seconds()-stage["_cpu"],4)
+        stage["cpu_scope"]=CPU_SCOPE
+        peak_rss=_read_status_mb("VmHWM") if stage["_peak_reset"] else None
+        if peak_rss is not None:
+            peak_rss=max(peak_rss,stage["_peak"] or 0.0)
+            stage["peak_rss_mb"]=round(peak_rss,2)
+            if stage["_rss"] is not None:
+                stage["rss_growth_mb"]=round(peak_rss-stage["_rss"],2)
+        else:
+            stage["process_peak_rss_mb"]=get_peak_rss_mb()
+        io_counters=_read_io_counters()
+        if stage["_io"] is not None and io_counters is not None:
+            stage["bytes_read"]=io_counters[0]-stage["_io"][0]
+            stage["bytes_written"]=io_counters[1]-stage["_io"][1]
+        if stage["rows"]:
+            stage["rows_per_second"]=round(stage["rows"]/max(wall_seconds,1e-9),1)
+        for name in ("_wall","_cpu","_io","_rss","_peak","_peak_reset","_profiler"):
+            stage.pop(name)
+        self._open_stages.remove(stage)
+        self._carry_peak_rss()
+        self.stages.append(stage)
+        logging.info(f"Stage metrics: {json.dumps(stage,default=str)}")
+        return stage
+
+    def _carry_peak_rss(self)->None:
+        """
+        Fold the current VmHWM into the running stages before it is reset or left behind by a nested stage
+        """
+        peak_rss=_read_status_mb("VmHWM")
+        if peak_rss is None:
+            return
+        for stage in self._open_stages:
+            stage["_peak"]=max(stage["_peak"] or 0.0,peak_rss)
+
+    def record_cached_stage(self,stage_name:str)->None:
+        """
+        Stage skipped because the stage cache already had its artifact
+        """
+        self.stages.append({"stage":stage_name,"status":"cached","started_at":datetime.now().isoformat(timespec="seconds")})
+
+    def add_metrics(self,**metrics)->None:
+        """
+        Attach metrics (rows, or anything stage specific) to the innermost running stage
+        """
+        if self._open_stages:
+            self._open_stages[-1].update(metrics)
+
+    def _dump_profile(self,stage_name:str,profiler:cProfile.Profile)->str:
+        os.makedirs(self.profile_dir,exist_ok=True)
+        profile_file_path=os.path.join(self.profile_dir,f"{stage_name}.prof")
+        profiler.dump_stats(profile_file_path)
+        with open(os.path.join(self.profile_dir,f"{stage_name}.txt"),"w") as file_obj:
+            pstats.Stats(profiler,stream=file_obj).sort_stats("cumulative").print_stats(40)
+        return profile_file_path
+
+    def report(self)->dict:
+        return {
+            "run":self.run_name,
+            "status":getattr(self,"status","running"),
+            "started_at":getattr(self,"started_at",None),
+            "wall_seconds":round(getattr(self,"wall_seconds",0.0),4),
+            "cpu_seconds":round(getattr(self,"cpu_seconds",0.0),4),
+            "cpu_scope":CPU_SCOPE,
+            "process_peak_rss_mb":get_peak_rss_mb(),
+            "stages":self.stages,
+        }
+
+    def write_report(self)->None:
+        os.makedirs(os.path.dirname(self.run_report_file_path) or ".",exist_ok=True)
+        with open(self.run_report_file_path,"w") as file_obj:
+            json.dump(self.report(),file_obj,indent=2,default=str)
+        logging.info(f"Run report written to {self.run_report_file_path}")
+
+
+def add_stage_metrics(**metrics)->None:
+    """
+    Report metrics of the stage being run, a no-op outside an instrumented stage
+    """
+    if _active_run is not None:
+        _active_run.add_metrics(**metrics)
+
+
+def instrument_stage(stage_name:str):
+    """
+    Decorator timing an initiate_* method as a pipeline stage. Inside a RunInstrumentation the
+    metrics go into its run report, otherwise they are only logged
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args,**kwargs):
+            run=_active_run
+            if run is None:
+                with RunInstrumentation() as run:
+                    return _run_stage(run,stage_name,func,args,kwargs)
+            return _run_stage(run,stage_name,func,args,kwargs)
+        return wrapper
+    return decorator
+
+
+def _run_stage(run:RunInstrumentation,stage_name:str,func,args,kwargs):
+    stage=run.start_stage(stage_name)
+    try:
+        result=func(*args,**kwargs)
+    except BaseException:
+        run.end_stage(stage,"failed")
+        raise
+    run.end_stage(stage,"completed")
+    return result
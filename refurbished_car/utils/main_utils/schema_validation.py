@@ -0,0 +1,114 @@
+from refurbished_car.exception.exception import RefurbishedCarException
+import numpy as np
+import pandas as pd
+import sys
+
+INTEGER_DTYPES = ("int8", "int16", "int32", "int64")
+
+
+def build_column_rules(schema_config: dict) -> dict:
+    """
+    Merge the dtypes under "columns" of schema.yaml with the optional "column_checks" section
+    schema_config: dict content of schema.yaml
+    return: dict column name -> {"dtype", "nullable", "min", "max", "allowed"}
+    """
+    try:
+        column_checks = schema_config.get("column_checks") or {}
+        rules = {}
+        for column, dtype in schema_config["columns"].items():
+            checks = column_checks.get(column) or {}
+            rules[column] = {
+                "dtype": dtype,
+                "nullable": checks.get("nullable", True),
+                "min": checks.get("min"),
+                "max": checks.get("max"),
+                "allowed": list(checks["allowed"]) if checks.get("allowed") is not None else None,
+            }
+        return rules
+    except Exception as e:
+        raise RefurbishedCarException(e, sys) from e
+
+
+def _column_failures(series: pd.Series, rule: dict) -> dict:
+    """
+    Failure masks of one column, every check is a whole-column numpy/pandas operation
+    return: dict check name -> boolean np.ndarray, only for checks that failed on some row
+    """
+    present = series.notna().to_numpy()
+    failures = {"null": ~present if not rule["nullable"] else None}
+    if rule["dtype"] == "object":
+        if rule["allowed"] is not None:
+            values = series if series.dtype == object or pd.api.types.is_string_dtype(series) else series.astype(str)
+            failures["category"] = present & ~values.isin(rule["allowed"]).to_numpy()
+    else:
+        numbers = pd.to_numeric(series, errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+        is_number = ~np.isnan(numbers)
+        dtype_failures = present & ~is_number
+        if rule["dtype"] in INTEGER_DTYPES:
+            dtype_failures |= is_number & (np.mod(numbers, 1, where=is_number, out=np.zeros_like(numbers)) != 0)
+        failures["dtype"] = dtype_failures
+        with np.errstate(invalid="ignore"):
+            out_of_range = np.zeros(len(numbers), dtype=bool)
+            if rule["min"] is not None:
+                out_of_range |= numbers < rule["min"]
+            if rule["max"] is not None:
+                out_of_range |= numbers > rule["max"]
+        failures["range"] = out_of_range
+    return {check: mask for check, mask in failures.items() if mask is not None and mask.any()}
+
+
+def validate_dataframe(dataframe: pd.DataFrame, rules: dict, checks: tuple = None):
+    """
+    Check every row of a dataframe against the schema rules
+    dataframe: pd.DataFrame raw data, before the schema dtypes are enforced so bad values are still visible
+    rules: dict from build_column_rules
+    checks: tuple of check names ("dtype", "null", "range", "category") to run, None runs all of them
+    return: tuple (boolean np.ndarray of invalid rows,
+        dict "column:check" -> boolean np.ndarray of the rows failing it,
+        list of schema columns missing from the dataframe)
+    """
+    try:
+        invalid = np.zeros(len(dataframe), dtype=bool)
+        failures = {}
+        missing_columns = [column for column in rules if column not in dataframe.columns]
+        for column, rule in rules.items():
+            if column in missing_columns:
+                continue
+            for check, mask in _column_failures(dataframe[column], rule).items():
+                if checks is not None and check not in checks:
+                    continue
+                failures[f"{column}:{check}"] = mask
+                invalid |= mask
+        return invalid, failures, missing_columns
+    except Exception as e:
+        raise RefurbishedCarException(e, sys) from e
+
+
+def describe_failures(failures: dict, invalid: np.ndarray) -> np.ndarray:
+    """
+    Reason string ("column:check;column:check") of every invalid row, built one failed check at a time
+    return: np.ndarray of str, one entry per invalid row
+    """
+    try:
+        invalid_rows = np.flatnonzero(invalid)
+        reasons = np.full(len(invalid_rows), "", dtype=object)
+        for name, mask in failures.items():
+            failed = mask[invalid_rows]
+            reasons[failed] = np.where(reasons[failed] == "", name, reasons[failed] + ";" + name)
+        return reasons
+    except Exception as e:
+        raise RefurbishedCarException(e, sys) from e
+
+
+def summarize_failures(failures: dict, invalid: np.ndarray, missing_columns: list, unexpected_columns: list = ()) -> dict:
+    """
+    Counts for the validation summary report
+    """
+    return {
+        "rows": int(len(invalid)),
+        "valid_rows": int(len(invalid) - invalid.sum()),
+        "invalid_rows": int(invalid.sum()),
+        "missing_columns": list(missing_columns),
+        "unexpected_columns": list(unexpected_columns),
+        "failures": {name: int(mask.sum()) for name, mask in failures.items()},
+    }
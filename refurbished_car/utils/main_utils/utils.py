@@ -1,13 +1,19 @@
+from __future__ import annotations # pd.DataFrame hints are not evaluated, pandas is imported where it is used
 import yaml
 from refurbished_car.exception.exception import RefurbishedCarException
 from refurbished_car.logging.logger import logging
 import os,sys
+import json
+import shutil
+import time
+import math
 import numpy as np
 #import dill
 import pickle
+from typing import TYPE_CHECKING
 
-from sklearn.metrics import r2_score
-from sklearn.model_selection import GridSearchCV
+if TYPE_CHECKING:
+    import pandas as pd
 
 def read_yaml_file(file_path: str) -> dict:
     try:
@@ -27,6 +33,22 @@ def write_yaml_file(file_path: str, content: object, replace: bool = False) -> N
     except Exception as e:
         raise RefurbishedCarException(e, sys)
     
+def read_json_file(file_path: str) -> dict:
+    try:
+        with open(file_path, "r") as json_file:
+            return json.load(json_file)
+    except Exception as e:
+        raise RefurbishedCarException(e, sys) from e
+
+
+def write_json_file(file_path: str, content: object) -> None:
+    try:
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "w") as file:
+            json.dump(content, file)
+    except Exception as e:
+        raise RefurbishedCarException(e, sys)
+
 def save_numpy_array_data(file_path: str, array: np.array):
     """
     Save numpy array data to file
@@ -41,6 +63,35 @@ def save_numpy_array_data(file_path: str, array: np.array):
     except Exception as e:
         raise RefurbishedCarException(e, sys) from e
     
+def save_sparse_matrix_data(file_path: str, matrix) -> None:
+    """
+    Save scipy sparse matrix to .npz file
+    file_path: str location of file to save
+    matrix: scipy.sparse matrix data to save
+    """
+    try:
+        from scipy import sparse
+
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        sparse.save_npz(file_path, sparse.csr_matrix(matrix), compressed=False) # uncompressed loads much faster
+    except Exception as e:
+        raise RefurbishedCarException(e, sys) from e
+
+
+def load_sparse_matrix_data(file_path: str):
+    """
+    load scipy sparse matrix from .npz file
+    file_path: str location of file to load
+    return: scipy.sparse.csr_matrix data loaded
+    """
+    try:
+        from scipy import sparse
+
+        return sparse.load_npz(file_path).tocsr()
+    except Exception as e:
+        raise RefurbishedCarException(e, sys) from e
+
+
 def save_object(file_path: str, obj: object) -> None:
     try:
         logging.info("Entered the save_object method of MainUtils class")
@@ -56,18 +107,21 @@ def load_object(file_path: str, ) -> object:
         if not os.path.exists(file_path):
             raise Exception(f"The file: {file_path} is not exists")
         with open(file_path, "rb") as file_obj:
-            print(file_obj)
             return pickle.load(file_obj)
     except Exception as e:
         raise RefurbishedCarException(e, sys) from e
     
-def load_numpy_array_data(file_path: str) -> np.array:
+def load_numpy_array_data(file_path: str, mmap_mode: str = None) -> np.array:
     """
     load numpy array data from file
     file_path: str location of file to load
+    mmap_mode: str "r" memory-maps the file read-only instead of reading it into RAM,
+        so several processes share the same page cache pages
     return: np.array data loaded
     """
     try:
+        if mmap_mode is not None:
+            return np.load(file_path, mmap_mode=mmap_mode)
         with open(file_path, "rb") as file_obj:
             return np.load(file_obj)
     except Exception as e:
@@ -75,31 +129,369 @@ def load_numpy_array_data(file_path: str) -> np.array:
     
 
 
-def evaluate_models(X_train, y_train,X_test,y_test,models,param):
+# arrow types used for the schema.yaml dtypes when writing columnar artifacts
+ARROW_TYPE_NAMES = {"int64": "int64", "float64": "float64", "object": "string", "bool": "bool_"}
+
+
+def get_file_format(file_path: str) -> str:
+    """
+    Artifact format (csv, parquet or feather) derived from the file extension
+    """
+    file_format = os.path.splitext(file_path)[1].lstrip(".").lower()
+    if file_format not in ("csv", "parquet", "feather"):
+        raise ValueError(f"Unsupported artifact file format: {file_path}")
+    return file_format
+
+
+def enforce_schema(dataframe: pd.DataFrame, schema_columns: dict) -> pd.DataFrame:
+    """
+    Cast the columns declared in schema.yaml to their declared dtype
+    dataframe: pd.DataFrame data to cast
+    schema_columns: dict column name -> dtype from schema.yaml
+    return: pd.DataFrame with the declared dtypes
+    """
     try:
-        report = {}
+        import pandas as pd
+
+        dataframe = dataframe.copy()
+        for column, dtype in schema_columns.items():
+            if column not in dataframe.columns:
+                continue
+            series = dataframe[column]
+            if dtype == "object":
+                not_null = series.notna()
+                series = series.astype(object)
+                series[not_null] = series[not_null].astype(str)
+                dataframe[column] = series
+            else:
+                # coerce first: a non-numeric string becomes nan here, not at the cast below
+                numbers = pd.to_numeric(series, errors="coerce")
+                if dtype == "int64" and (numbers.isna().any() or (numbers % 1 != 0).any()):
+                    # missing (or fractional) values can only be held as float in numpy
+                    dataframe[column] = numbers.astype("float64")
+                else:
+                    dataframe[column] = numbers.astype(dtype)
+        return dataframe
+    except Exception as e:
+        raise RefurbishedCarException(e, sys) from e
+
+
+class DataFrameChunkWriter:
+    """
+    Append dataframe chunks to a csv, parquet or feather artifact (format taken from
+    the file extension), enforcing the schema.yaml dtypes on every chunk so the
+    columnar formats keep a single typed schema across chunks
+    """
+    def __init__(self, file_path: str, schema_columns: dict = None):
+        try:
+            self.file_path = file_path
+            self.file_format = get_file_format(file_path)
+            self.schema_columns = schema_columns or {}
+            self.number_of_rows = 0
+            self._writer = None
+            self._arrow_schema = None
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            if os.path.lexists(file_path):
+                # write a new file rather than truncating in place, hardlinks made by link_or_copy_file keep their content
+                os.remove(file_path)
+        except Exception as e:
+            raise RefurbishedCarException(e, sys) from e
+
+    def _get_arrow_schema(self, dataframe: pd.DataFrame):
+        import pyarrow as pa
+
+        inferred_schema = pa.Schema.from_pandas(dataframe, preserve_index=False)
+        fields = []
+        for field in inferred_schema:
+            dtype = self.schema_columns.get(field.name)
+            if dtype in ARROW_TYPE_NAMES:
+                field = pa.field(field.name, getattr(pa, ARROW_TYPE_NAMES[dtype])())
+            fields.append(field)
+        return pa.schema(fields)
+
+    def write(self, dataframe: pd.DataFrame) -> None:
+        try:
+            dataframe = enforce_schema(dataframe, self.schema_columns)
+            if self.file_format == "csv":
+                header = self._writer is None # the first chunk writes the header, even when it has no rows
+                if self._writer is None:
+                    self._writer = open(self.file_path, "w", newline="")
+                dataframe.to_csv(self._writer, index=False, header=header)
+            else:
+                import pyarrow as pa
+
+                if self._arrow_schema is None:
+                    self._arrow_schema = self._get_arrow_schema(dataframe)
+                table = pa.Table.from_pandas(dataframe, schema=self._arrow_schema, preserve_index=False)
+                if self._writer is None:
+                    if self.file_format == "parquet":
+                        import pyarrow.parquet as pq
+                        self._writer = pq.ParquetWriter(self.file_path, self._arrow_schema)
+                    else:
+                        self._writer = pa.ipc.new_file(self.file_path, self._arrow_schema) # feather v2 is the arrow ipc file format
+                self._writer.write_table(table)
+            self.number_of_rows += len(dataframe)
+        except Exception as e:
+            raise RefurbishedCarException(e, sys) from e
+
+    def close(self) -> None:
+        try:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        except Exception as e:
+            raise RefurbishedCarException(e, sys) from e
 
-        for i in range(len(list(models))):
-            model = list(models.values())[i]
-            para=param[list(models.keys())[i]]
+    def __enter__(self):
+        return self
 
-            gs = GridSearchCV(model,para,cv=3)
-            gs.fit(X_train,y_train)
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
-            model.set_params(**gs.best_params_)
-            model.fit(X_train,y_train)
 
-            #model.fit(X_train, y_train)  # Train model
+def save_dataframe(file_path: str, dataframe: pd.DataFrame, schema_columns: dict = None) -> None:
+    """
+    Save dataframe as csv, parquet or feather depending on the file extension
+    file_path: str location of file to save
+    dataframe: pd.DataFrame data to save
+    schema_columns: dict column name -> dtype from schema.yaml, enforced before writing
+    """
+    try:
+        with DataFrameChunkWriter(file_path, schema_columns=schema_columns) as writer:
+            writer.write(dataframe)
+    except Exception as e:
+        raise RefurbishedCarException(e, sys) from e
+
+
+def load_dataframe(file_path: str, schema_columns: dict = None) -> pd.DataFrame:
+    """
+    Load a csv, parquet or feather artifact depending on the file extension
+    file_path: str location of file to load
+    schema_columns: dict column name -> dtype from schema.yaml, only needed for csv
+        since the columnar formats already store their dtypes
+    return: pd.DataFrame data loaded
+    """
+    try:
+        import pandas as pd
+
+        file_format = get_file_format(file_path)
+        if file_format == "parquet":
+            return pd.read_parquet(file_path)
+        if file_format == "feather":
+            return pd.read_feather(file_path)
+        dataframe = pd.read_csv(file_path)
+        if schema_columns:
+            dataframe = enforce_schema(dataframe, schema_columns)
+        return dataframe
+    except Exception as e:
+        raise RefurbishedCarException(e, sys) from e
+
+
+def iter_dataframe_chunks(file_path: str, chunk_size: int, schema_columns: dict = None):
+    """
+    Yield a csv, parquet or feather artifact as dataframes of at most chunk_size rows,
+    so a file of any size can be processed with bounded memory
+    file_path: str location of file to read
+    chunk_size: int rows per chunk
+    schema_columns: dict column name -> dtype from schema.yaml, only needed for csv
+    """
+    try:
+        file_format = get_file_format(file_path)
+        if file_format == "csv":
+            import pandas as pd
+
+            for chunk in pd.read_csv(file_path, chunksize=chunk_size):
+                yield enforce_schema(chunk, schema_columns) if schema_columns else chunk
+        elif file_format == "parquet":
+            import pyarrow.parquet as pq
+
+            for batch in pq.ParquetFile(file_path).iter_batches(batch_size=chunk_size):
+                yield batch.to_pandas()
+        else:
+            import pyarrow as pa
+
+            with pa.memory_map(file_path, "r") as source:
+                reader = pa.ipc.open_file(source)
+                for batch_index in range(reader.num_record_batches):
+                    batch = reader.get_batch(batch_index)
+                    for offset in range(0, batch.num_rows, chunk_size):
+                        yield batch.slice(offset, chunk_size).to_pandas()
+    except Exception as e:
+        raise RefurbishedCarException(e, sys) from e
+
 
-            y_train_pred = model.predict(X_train)
+def link_or_copy_file(source_file_path: str, destination_file_path: str) -> bool:
+    """
+    Publish an existing artifact under another path without rewriting it: a hardlink when the
+    filesystem allows it, a copy otherwise (e.g. the two paths are on different devices)
+    return: bool True when the file was linked, False when it had to be copied
+    """
+    try:
+        os.makedirs(os.path.dirname(destination_file_path), exist_ok=True)
+        if os.path.lexists(destination_file_path):
+            os.remove(destination_file_path)
+        try:
+            os.link(source_file_path, destination_file_path)
+            return True
+        except OSError:
+            shutil.copy2(source_file_path, destination_file_path)
+            return False
+    except Exception as e:
+        raise RefurbishedCarException(e, sys) from e
+
+
+def get_peak_rss_mb() -> float:
+    """
+    Peak resident set size of the current process in MB
+    return: float peak memory, or None where the platform does not expose it
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes on Linux
+    if sys.platform == "darwin":
+        return peak_rss / (1024 * 1024)
+    return peak_rss / 1024
+
+
+def _fit_and_score_candidate(estimator, X, y, train_index, test_index):
+    """
+    Fit one candidate on one fold inside a search worker
+    return: (validation score or nan if the fit failed, fit seconds)
+    """
+    start_time = time.perf_counter()
+    try:
+        estimator.fit(X[train_index], y[train_index])
+        fit_time = time.perf_counter() - start_time
+        return float(estimator.score(X[test_index], y[test_index])), fit_time
+    except Exception as e:
+        logging.warning(f"Candidate {estimator} failed to fit: {e}")
+        return float("nan"), time.perf_counter() - start_time
+
+
+def _refit_candidate(estimator, X, y):
+    estimator.fit(X, y)
+    return estimator
+
+
+def evaluate_models(X_train, y_train, X_test, y_test, models, param, n_jobs=-1, cv=3,
+                    search_strategy="halving", halving_factor=3, min_resources=500,
+                    random_state=42, search_report=None):
+    """
+    Hyperparameter search over every model family at once.
+    Every (family, candidate, fold) fit is dispatched to one shared joblib process pool, so
+    families run concurrently instead of one GridSearchCV after another. With the "halving"
+    strategy candidates are first scored on a small sample of rows and only the best
+    1/halving_factor of each family move on to the next, larger sample (successive halving);
+    "grid" scores every candidate on all rows. The best candidate of each family is refit once
+    on the full train set and stored back into models, and its test r2 score is reported.
+    A family whose every candidate failed to fit (no finite cross-validation score) is left out
+    of the report, and a ValueError is raised when that leaves no family at all.
+
+    search_report: dict filled with the best params and per-candidate fit times of each family
+    return: dict family name -> test r2 score
+    """
+    try:
+        # imported here, so modules that only need the file helpers above do not pay for sklearn/joblib
+        from sklearn.base import clone
+        from sklearn.metrics import r2_score
+        from sklearn.model_selection import KFold, ParameterGrid
+        from joblib import Parallel, delayed
+
+        report = {}
+        n_samples = X_train.shape[0]
+        candidates = {name: list(ParameterGrid(param[name])) for name in models}
+        max_candidates = max(len(family_candidates) for family_candidates in candidates.values())
+        n_rounds = 1
+        if search_strategy == "halving" and max_candidates > 1:
+            n_rounds += min(
+                int(math.log(max_candidates, halving_factor)),
+                int(math.log(max(n_samples / min_resources, 1), halving_factor)),
+            )
+        # a family with k candidates joins only for the last log_factor(k) rounds, so small grids
+        # are not decided on the smallest samples
+        start_round = {}
+        for name in models:
+            rounds_needed, remaining = 0, len(candidates[name])
+            while remaining > 1:
+                remaining = math.ceil(remaining / halving_factor)
+                rounds_needed += 1
+            start_round[name] = max(0, n_rounds - 1 - rounds_needed)
+        permutation = np.random.default_rng(random_state).permutation(n_samples)
+        alive = {name: list(range(len(candidates[name]))) for name in models}
+        history = {name: [] for name in models}
+        scores = {}
 
-            y_test_pred = model.predict(X_test)
+        with Parallel(n_jobs=n_jobs) as parallel:  # one process pool shared by every family, round and refit
+            for round_index in range(n_rounds):
+                n_resources = n_samples // halving_factor ** (n_rounds - 1 - round_index)
+                sample_index = np.sort(permutation[:n_resources])  # sorted rows keep memmap/csr reads sequential
+                folds = list(KFold(n_splits=cv, shuffle=True, random_state=random_state).split(sample_index))
+                tasks = [
+                    (name, candidate_index)
+                    for name in models if round_index >= start_round[name]
+                    for candidate_index in alive[name]
+                ]
+                outputs = parallel(
+                    delayed(_fit_and_score_candidate)(
+                        clone(models[name]).set_params(**candidates[name][candidate_index]),
+                        X_train, y_train, sample_index[train_index], sample_index[test_index],
+                    )
+                    for name, candidate_index in tasks
+                    for train_index, test_index in folds
+                )
+                for task_index, (name, candidate_index) in enumerate(tasks):
+                    fold_outputs = outputs[task_index * cv:(task_index + 1) * cv]
+                    mean_score = float(np.mean([score for score, _ in fold_outputs]))
+                    scores[(name, candidate_index)] = mean_score if not math.isnan(mean_score) else -math.inf
+                    history[name].append({
+                        "params": candidates[name][candidate_index],
+                        "round": round_index,
+                        "n_samples": int(n_resources),
+                        "mean_score": mean_score,
+                        "mean_fit_time": float(np.mean([fit_time for _, fit_time in fold_outputs])),
+                    })
+                for name in models:
+                    if round_index < start_round[name]:
+                        continue
+                    ranked = sorted(alive[name], key=lambda candidate_index: scores[(name, candidate_index)], reverse=True)
+                    keep = 1 if round_index == n_rounds - 1 else max(1, math.ceil(len(ranked) / halving_factor))
+                    alive[name] = ranked[:keep]
+                logging.info(f"Search round {round_index + 1}/{n_rounds} fitted {len(tasks)} candidates on {n_resources} rows")
 
-            train_model_score = r2_score(y_train, y_train_pred)
+            names = []
+            for name in models:
+                if math.isfinite(scores[(name, alive[name][0])]):
+                    names.append(name)
+                    continue
+                logging.warning(f"{name}: no candidate produced a finite cross-validation score, dropping the family")
+                if search_report is not None:
+                    search_report[name] = {"best_params": None, "cv_score": None, "failed": True, "candidates": history[name]}
+            if not names:
+                raise ValueError(f"Every candidate of every model family ({', '.join(models)}) failed to fit, see the warnings above")
 
-            test_model_score = r2_score(y_test, y_test_pred)
+            # refit the winner of each family once on the full train set, no second training pass afterwards
+            fitted_models = parallel(
+                delayed(_refit_candidate)(clone(models[name]).set_params(**candidates[name][alive[name][0]]), X_train, y_train)
+                for name in names
+            )
 
-            report[list(models.keys())[i]] = test_model_score
+        for name, fitted_model in zip(names, fitted_models):
+            models[name] = fitted_model
+            y_test_pred = fitted_model.predict(X_test)
+            report[name] = r2_score(y_test, y_test_pred)
+            best_params = candidates[name][alive[name][0]]
+            logging.info(f"{name}: best params {best_params}, test r2 {report[name]}")
+            if search_report is not None:
+                search_report[name] = {
+                    "best_params": best_params,
+                    "cv_score": scores[(name, alive[name][0])],
+                    "test_score": float(report[name]),
+                    "total_fit_time": float(sum(candidate["mean_fit_time"] * cv for candidate in history[name])),
+                    "candidates": history[name],
+                }
 
         return report
 
@@ -0,0 +1,213 @@
+from refurbished_car.exception.exception import RefurbishedCarException
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import sys
+
+
+def _sorted_sample(values: np.ndarray, sample_size: int, seed: int) -> np.ndarray:
+    """
+    Drop missing values, optionally down-sample and sort a numeric column once
+    """
+    values = values[~np.isnan(values)]
+    if sample_size is not None and len(values) > sample_size:
+        rng = np.random.default_rng(seed)
+        values = values[rng.choice(len(values), size=sample_size, replace=False)]
+    return np.sort(values)
+
+
+def _ks_statistic(base_values: np.ndarray, current_values: np.ndarray, sample_size: int, seed: int):
+    """
+    Two sample Kolmogorov-Smirnov statistic of one column.
+    numpy releases the GIL while sorting and searching, so columns run truly in parallel on threads
+    """
+    base_sorted = _sorted_sample(base_values, sample_size, seed)
+    current_sorted = _sorted_sample(current_values, sample_size, seed + 1)
+    n1, n2 = len(base_sorted), len(current_sorted)
+    if n1 == 0 or n2 == 0:
+        return np.nan, n1, n2
+    data_all = np.concatenate([base_sorted, current_sorted])
+    cdf1 = np.searchsorted(base_sorted, data_all, side="right") / n1
+    cdf2 = np.searchsorted(current_sorted, data_all, side="right") / n2
+    return float(np.max(np.abs(cdf1 - cdf2))), n1, n2
+
+
+def ks_pvalues(statistics, n1, n2) -> np.ndarray:
+    """
+    Asymptotic two-sided KS p-values for arrays of statistics and sample sizes,
+    computed in one vectorized call (same formula as ks_2samp(method="asymp"))
+    """
+    from scipy.stats import kstwo
+
+    statistics, n1, n2 = (np.asarray(x, dtype="float64") for x in (statistics, n1, n2))
+    pvalues = np.full(statistics.shape, np.nan)
+    valid = ~np.isnan(statistics)
+    en = np.round(n1[valid] * n2[valid] / (n1[valid] + n2[valid]))
+    pvalues[valid] = np.clip(kstwo.sf(statistics[valid], en), 0.0, 1.0)
+    return pvalues
+
+
+def chi_square_pvalue(base_counts: pd.Series, current_counts: pd.Series) -> float:
+    """
+    Chi-square test of independence between two category frequency tables
+    """
+    from scipy.stats import chi2_contingency
+
+    table = pd.concat([base_counts, current_counts], axis=1).fillna(0).to_numpy().T
+    table = table[:, table.sum(axis=0) > 0]
+    if table.shape[1] < 2 or (table.sum(axis=1) == 0).any():
+        return 1.0  # a single category (or an empty side) carries no evidence of drift
+    return float(chi2_contingency(table)[1])
+
+
+def detect_drift(base_df: pd.DataFrame, current_df: pd.DataFrame, threshold: float = 0.05,
+                 sample_size: int = None, n_jobs: int = None, random_state: int = 42) -> dict:
+    """
+    Compare every column of current_df against base_df.
+    Numeric columns use a KS test, each column sorted once on a thread pool with the
+    p-values computed in a single vectorized call. Categorical columns use a chi-square
+    test on their frequency tables, since KS is meaningless on unordered strings.
+
+    sample_size: int when set, columns longer than this are down-sampled before testing
+    return: dict column -> {"p_value": float, "drift_status": bool}
+    """
+    try:
+        numerical_columns = [column for column in base_df.columns if pd.api.types.is_numeric_dtype(base_df[column])]
+        categorical_columns = [column for column in base_df.columns if column not in numerical_columns]
+        p_values = {}
+
+        if numerical_columns:
+            with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+                futures = [
+                    executor.submit(
+                        _ks_statistic,
+                        base_df[column].to_numpy(dtype="float64", na_value=np.nan),
+                        current_df[column].to_numpy(dtype="float64", na_value=np.nan),
+                        sample_size,
+                        random_state + 2 * index,
+                    )
+                    for index, column in enumerate(numerical_columns)
+                ]
+                results = [future.result() for future in futures]
+            statistics, n1, n2 = zip(*results)
+            p_values.update(zip(numerical_columns, ks_pvalues(statistics, n1, n2)))
+
+        for column in categorical_columns:
+            base_counts = base_df[column].value_counts(dropna=True)
+            current_counts = current_df[column].value_counts(dropna=True)
+            p_values[column] = chi_square_pvalue(base_counts, current_counts)
+
+        report = {}
+        for column in base_df.columns:
+            p_value = float(p_values[column])
+            report[column] = {
+                "p_value": p_value,
+                "drift_status": bool(not threshold <= p_value),
+            }
+        return report
+    except Exception as e:
+        raise RefurbishedCarException(e, sys)
+
+
+def build_reference_profile(dataframe: pd.DataFrame, n_quantiles: int = 101, max_categories: int = 50) -> dict:
+    """
+    Summarise a reference (training) dataframe into a small profile: a quantile sketch per
+    numeric column and a frequency table per categorical column (rare categories folded into
+    one bucket), so later drift checks never need the raw training rows again
+    """
+    try:
+        probabilities = np.linspace(0.0, 1.0, n_quantiles)
+        columns = {}
+        for column in dataframe.columns:
+            series = dataframe[column]
+            if pd.api.types.is_numeric_dtype(series):
+                values = series.to_numpy(dtype="float64", na_value=np.nan)
+                values = values[~np.isnan(values)]
+                columns[column] = {
+                    "type": "numeric",
+                    "count": int(len(values)),
+                    "missing": int(len(series) - len(values)),
+                    "quantiles": np.quantile(values, probabilities).tolist() if len(values) else [],
+                }
+            else:
+                counts = series.value_counts(dropna=True)
+                columns[column] = {
+                    "type": "categorical",
+                    "count": int(counts.sum()),
+                    "missing": int(series.isna().sum()),
+                    "frequencies": {str(key): int(value) for key, value in counts.head(max_categories).items()},
+                    "other": int(counts.iloc[max_categories:].sum()),
+                }
+        return {"number_of_rows": int(len(dataframe)), "columns": columns}
+    except Exception as e:
+        raise RefurbishedCarException(e, sys)
+
+
+def _profile_ks_statistic(quantiles: list, current_values: np.ndarray, sample_size: int, seed: int):
+    """
+    KS statistic between the reference CDF rebuilt from its quantile sketch and a current column.
+    The distance is only taken at the sketch points, where the reference CDF is known exactly,
+    so the statistic is resolved to about 1/n_quantiles instead of mistaking interpolation error for drift
+    """
+    current_sorted = _sorted_sample(current_values, sample_size, seed)
+    if not quantiles or len(current_sorted) == 0:
+        return np.nan, len(current_sorted)
+    quantiles = np.asarray(quantiles, dtype="float64")
+    probabilities = np.linspace(0.0, 1.0, len(quantiles))
+    # repeated quantiles mark a point mass, the CDF at that value is the highest probability reaching it
+    reversed_values, reversed_index = np.unique(quantiles[::-1], return_index=True)
+    cdf_reference = probabilities[::-1][reversed_index]
+    cdf_current = np.searchsorted(current_sorted, reversed_values, side="right") / len(current_sorted)
+    return float(np.max(np.abs(cdf_reference - cdf_current))), len(current_sorted)
+
+
+def detect_drift_against_profile(profile: dict, current_df: pd.DataFrame, threshold: float = 0.05,
+                                 sample_size: int = None, n_jobs: int = None, random_state: int = 42) -> dict:
+    """
+    Same tests and report shape as detect_drift, with the reference side read from a
+    profile made by build_reference_profile instead of raw rows
+    """
+    try:
+        profile_columns = {column: profile["columns"][column] for column in current_df.columns if column in profile["columns"]}
+        numerical_columns = [column for column, stats in profile_columns.items() if stats["type"] == "numeric"]
+        categorical_columns = [column for column, stats in profile_columns.items() if stats["type"] == "categorical"]
+        p_values = {}
+
+        if numerical_columns:
+            with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+                futures = [
+                    executor.submit(
+                        _profile_ks_statistic,
+                        profile_columns[column]["quantiles"],
+                        current_df[column].to_numpy(dtype="float64", na_value=np.nan),
+                        sample_size,
+                        random_state + index,
+                    )
+                    for index, column in enumerate(numerical_columns)
+                ]
+                results = [future.result() for future in futures]
+            statistics, n2 = zip(*results)
+            n1 = [profile_columns[column]["count"] for column in numerical_columns]
+            p_values.update(zip(numerical_columns, ks_pvalues(statistics, n1, n2)))
+
+        for column in categorical_columns:
+            stats = profile_columns[column]
+            base_counts = pd.Series({**stats["frequencies"], "__other__": stats["other"]}, dtype="float64")
+            current_counts = current_df[column].dropna().astype(str).value_counts()
+            known = current_counts.index.isin(list(stats["frequencies"]))
+            current_counts = pd.concat([
+                current_counts[known],
+                pd.Series({"__other__": current_counts[~known].sum()}),
+            ])
+            p_values[column] = chi_square_pvalue(base_counts, current_counts)
+
+        report = {}
+        for column in profile_columns:
+            p_value = float(p_values[column])
+            report[column] = {
+                "p_value": p_value,
+                "drift_status": bool(not threshold <= p_value),
+            }
+        return report
+    except Exception as e:
+        raise RefurbishedCarException(e, sys)
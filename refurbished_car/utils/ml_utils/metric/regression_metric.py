@@ -0,0 +1,20 @@
+from refurbished_car.entity.artifact_entity import RegressionMetricArtifact
+from refurbished_car.exception.exception import RefurbishedCarException
+import numpy as np
+import sys
+
+def get_regression_score(y_true,y_pred)->RegressionMetricArtifact:
+    try:
+        # imported here, importing the trainer should not load sklearn until a model is scored
+        from sklearn.metrics import r2_score,mean_squared_error,mean_absolute_error
+
+        model_r2_score = r2_score(y_true, y_pred)
+        model_rmse = np.sqrt(mean_squared_error(y_true, y_pred))
+        model_mae=mean_absolute_error(y_true,y_pred)
+
+        regression_metric =  RegressionMetricArtifact(r2_score=float(model_r2_score),
+                    rmse=float(model_rmse), 
+                    mae=float(model_mae))
+        return regression_metric
+    except Exception as e:
+        raise RefurbishedCarException(e,sys)
\ No newline at end of file
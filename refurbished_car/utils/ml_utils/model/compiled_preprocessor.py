@@ -0,0 +1,268 @@
+from refurbished_car.exception.exception import RefurbishedCarException
+import numpy as np
+import sys
+
+
+def _is_nan(value) -> bool:
+    return isinstance(value, float) and value != value
+
+
+def _is_missing(value) -> bool:
+    return value is None or _is_nan(value)
+
+
+class CompiledPreprocessor:
+    """
+    Flat, precomputed copy of the fitted ColumnTransformer built by
+    DataTransformation.get_data_transformer_object: imputation constants, scale/offset
+    vectors and category -> output column (one-hot) or category -> code (ordinal) maps. It turns
+    a dict or tuple record straight into the same feature vector as preprocessor.transform,
+    without building a DataFrame or going through sklearn's Pipeline/ColumnTransformer machinery
+    """
+    ordinal_segments = ()  # objects compiled before ordinal encoding was supported have none
+
+    def __init__(self, feature_names, numeric_segments, onehot_segments, n_output_features, ordinal_segments=None):
+        self.feature_names = list(feature_names)
+        self.numeric_segments = numeric_segments
+        self.onehot_segments = onehot_segments
+        self.ordinal_segments = ordinal_segments or []
+        self.n_output_features = n_output_features
+        self.feature_positions = {name: position for position, name in enumerate(self.feature_names)}
+
+    @classmethod
+    def from_column_transformer(cls, preprocessor) -> "CompiledPreprocessor":
+        """
+        Compile a fitted ColumnTransformer made of SimpleImputer/StandardScaler pipelines for
+        numeric columns and SimpleImputer/OneHotEncoder or OrdinalEncoder pipelines for categorical columns
+        """
+        try:
+            from sklearn.impute import SimpleImputer
+            from sklearn.preprocessing import StandardScaler, OneHotEncoder, OrdinalEncoder
+
+            numeric_segments = []
+            onehot_segments = []
+            ordinal_segments = []
+            offset = 0
+            for name, transformer, columns in preprocessor.transformers_:
+                if transformer == "drop" or len(columns) == 0:
+                    continue
+                if transformer == "passthrough":
+                    raise ValueError(f"Cannot compile passthrough columns of [{name}]")
+                steps = [step for _, step in transformer.steps] if hasattr(transformer, "steps") else [transformer]
+                fill_values = None
+                encoder = None
+                mean = np.zeros(len(columns))
+                scale = np.ones(len(columns))
+                for step in steps:
+                    if isinstance(step, SimpleImputer):
+                        fill_values = step.statistics_
+                    elif isinstance(step, StandardScaler):
+                        if step.mean_ is not None:
+                            mean = step.mean_
+                        if step.scale_ is not None:
+                            scale = step.scale_
+                    elif isinstance(step, OneHotEncoder):
+                        if step.drop_idx_ is not None or step.handle_unknown != "ignore":
+                            raise ValueError(f"Only OneHotEncoder(drop=None, handle_unknown='ignore') can be compiled, got [{name}]")
+                        encoder = step
+                    elif isinstance(step, OrdinalEncoder):
+                        encoder = step
+                    else:
+                        raise ValueError(f"Cannot compile step {type(step).__name__} of [{name}]")
+                if isinstance(encoder, OrdinalEncoder):
+                    ordinal_segments.append({
+                        "columns": list(columns),
+                        "offset": offset,
+                        "fill_values": list(fill_values) if fill_values is not None else [None] * len(columns),
+                        "category_maps": cls._ordinal_category_maps(encoder),
+                        "unknown_value": float(encoder.unknown_value) if encoder.handle_unknown == "use_encoded_value" else np.nan,
+                        "missing_value": float(encoder.encoded_missing_value),
+                    })
+                    offset += len(columns)
+                elif encoder is None:
+                    numeric_segments.append({
+                        "columns": list(columns),
+                        "offset": offset,
+                        "fill_values": np.asarray(fill_values if fill_values is not None else np.full(len(columns), np.nan), dtype="float64"),
+                        "mean": np.asarray(mean, dtype="float64"),
+                        "scale": np.asarray(scale, dtype="float64"),
+                    })
+                    offset += len(columns)
+                else:
+                    category_maps = []
+                    for categories in encoder.categories_:
+                        category_maps.append({category: offset + index for index, category in enumerate(categories)})
+                        offset += len(categories)
+                    onehot_segments.append({
+                        "columns": list(columns),
+                        "fill_values": list(fill_values) if fill_values is not None else [None] * len(columns),
+                        "category_maps": category_maps,
+                    })
+            return cls(preprocessor.feature_names_in_, numeric_segments, onehot_segments, offset, ordinal_segments)
+        except Exception as e:
+            raise RefurbishedCarException(e, sys)
+
+    @staticmethod
+    def _ordinal_category_maps(encoder) -> list:
+        """
+        category -> code of every column, read back from encoder.transform so categories grouped
+        as infrequent (max_categories/min_frequency) get their shared code
+        """
+        known = [[category for category in categories if not _is_missing(category)] for categories in encoder.categories_]
+        n_rows = max(1, max(len(categories) for categories in known))
+        probe = np.empty((n_rows, len(known)), dtype=object)
+        for index, categories in enumerate(known):
+            probe[:, index] = (categories + categories[-1:] * n_rows)[:n_rows] if categories else None
+        if hasattr(encoder, "feature_names_in_"):
+            import pandas as pd
+            probe = pd.DataFrame(probe, columns=encoder.feature_names_in_)
+        codes = encoder.transform(probe)
+        return [
+            {category: float(code) for category, code in zip(categories, codes[:len(categories), index])}
+            for index, categories in enumerate(known)
+        ]
+
+    def _get(self, record, column):
+        if isinstance(record, dict):
+            return record.get(column)
+        return record[self.feature_positions[column]]
+
+    def _fill_row(self, record, row: np.ndarray) -> None:
+        for segment in self.numeric_segments:
+            values = np.array([self._get(record, column) for column in segment["columns"]], dtype="float64")
+            missing = np.isnan(values)
+            if missing.any():
+                values[missing] = segment["fill_values"][missing]
+            values -= segment["mean"]
+            values /= segment["scale"]
+            offset = segment["offset"]
+            row[offset:offset + len(values)] = values
+        for segment in self.onehot_segments:
+            for column, fill_value, category_map in zip(segment["columns"], segment["fill_values"], segment["category_maps"]):
+                index = category_map.get(self._onehot_value(fill_value, self._get(record, column)))
+                if index is not None:  # unknown categories encode as all zeros, like handle_unknown="ignore"
+                    row[index] = 1.0
+        for segment in self.ordinal_segments:
+            offset = segment["offset"]
+            for position, (column, fill_value, category_map) in enumerate(zip(segment["columns"], segment["fill_values"], segment["category_maps"])):
+                row[offset + position] = self._ordinal_code(segment, category_map, fill_value, self._get(record, column))
+
+    @staticmethod
+    def _onehot_value(fill_value, value):
+        """
+        Category a one-hot encoder sees: SimpleImputer(missing_values=np.nan) only fills nan,
+        a None category reaches the encoder as it is (and encodes as all zeros unless seen in fit)
+        """
+        if fill_value is not None:
+            return fill_value if _is_nan(value) else value
+        return None if _is_missing(value) else value
+
+    @staticmethod
+    def _ordinal_code(segment, category_map, fill_value, value) -> float:
+        if _is_missing(value):
+            value = fill_value
+            if _is_missing(value):
+                return segment["missing_value"]
+        return category_map.get(value, segment["unknown_value"])
+
+    def transform_record(self, record) -> np.ndarray:
+        """
+        record: dict keyed by column name, or tuple in the order of feature_names
+        return: np.ndarray of shape (1, n_output_features)
+        """
+        try:
+            features = np.zeros((1, self.n_output_features), dtype="float64")
+            self._fill_row(record, features[0])
+            return features
+        except Exception as e:
+            raise RefurbishedCarException(e, sys)
+
+    def transform_records(self, records) -> np.ndarray:
+        try:
+            features = np.zeros((len(records), self.n_output_features), dtype="float64")
+            for row, record in zip(features, records):
+                self._fill_row(record, row)
+            return features
+        except Exception as e:
+            raise RefurbishedCarException(e, sys)
+
+    ## Encoded layout: one float64 column per input feature, in feature_names order. Numeric columns hold
+    ## the raw value (nan when missing), one-hot categorical ones the output column of their one-hot 1 (-1 for
+    ## unknown categories) and ordinal ones their final code. It is purely numeric, so batches can be handed to other processes through
+    ## shared memory, and transform_encoded turns it into features without any per-row python.
+
+    def encode_dataframe(self, dataframe) -> np.ndarray:
+        try:
+            import pandas as pd
+
+            encoded = np.full((len(dataframe), len(self.feature_names)), np.nan)  # columns the preprocessor drops stay nan
+            for segment in self.numeric_segments:
+                for column in segment["columns"]:
+                    encoded[:, self.feature_positions[column]] = pd.to_numeric(dataframe[column], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+            for segment in self.onehot_segments:
+                for column, fill_value, category_map in zip(segment["columns"], segment["fill_values"], segment["category_maps"]):
+                    # factorize the column, then look up only its distinct values; missing values get code -1
+                    codes, uniques = pd.factorize(dataframe[column])
+                    if _is_missing(fill_value):
+                        missing_output_column = -1
+                    else:
+                        missing_output_column = category_map.get(fill_value, -1)
+                    lookup = np.array([category_map.get(value, -1) for value in uniques] + [missing_output_column], dtype="float64")
+                    encoded_column = lookup[codes]
+                    if fill_value is not None:
+                        # factorize treats None like nan, but the imputer leaves None for the encoder
+                        is_none = dataframe[column].to_numpy(dtype=object) == None  # noqa: E711, elementwise
+                        encoded_column[is_none] = category_map.get(None, -1)
+                    encoded[:, self.feature_positions[column]] = encoded_column
+            for segment in self.ordinal_segments:
+                for column, fill_value, category_map in zip(segment["columns"], segment["fill_values"], segment["category_maps"]):
+                    codes, uniques = pd.factorize(dataframe[column])
+                    lookup = np.array(
+                        [category_map.get(value, segment["unknown_value"]) for value in uniques]
+                        + [self._ordinal_code(segment, category_map, fill_value, None)],
+                        dtype="float64",
+                    )
+                    encoded[:, self.feature_positions[column]] = lookup[codes]
+            return encoded
+        except Exception as e:
+            raise RefurbishedCarException(e, sys)
+
+    def encode_records(self, records) -> np.ndarray:
+        try:
+            encoded = np.full((len(records), len(self.feature_names)), np.nan)  # columns the preprocessor drops stay nan
+            for row, record in zip(encoded, records):
+                for segment in self.numeric_segments:
+                    for column in segment["columns"]:
+                        value = self._get(record, column)
+                        row[self.feature_positions[column]] = np.nan if value is None else value
+                for segment in self.onehot_segments:
+                    for column, fill_value, category_map in zip(segment["columns"], segment["fill_values"], segment["category_maps"]):
+                        row[self.feature_positions[column]] = category_map.get(self._onehot_value(fill_value, self._get(record, column)), -1)
+                for segment in self.ordinal_segments:
+                    for column, fill_value, category_map in zip(segment["columns"], segment["fill_values"], segment["category_maps"]):
+                        row[self.feature_positions[column]] = self._ordinal_code(segment, category_map, fill_value, self._get(record, column))
+            return encoded
+        except Exception as e:
+            raise RefurbishedCarException(e, sys)
+
+    def transform_encoded(self, encoded: np.ndarray) -> np.ndarray:
+        try:
+            features = np.zeros((len(encoded), self.n_output_features), dtype="float64")
+            for segment in self.numeric_segments:
+                values = encoded[:, [self.feature_positions[column] for column in segment["columns"]]]
+                values = np.where(np.isnan(values), segment["fill_values"], values)
+                offset = segment["offset"]
+                features[:, offset:offset + values.shape[1]] = (values - segment["mean"]) / segment["scale"]
+            rows = np.arange(len(encoded))
+            for segment in self.onehot_segments:
+                for column in segment["columns"]:
+                    indices = encoded[:, self.feature_positions[column]]
+                    known = indices >= 0
+                    features[rows[known], indices[known].astype(np.intp)] = 1.0
+            for segment in self.ordinal_segments:
+                offset = segment["offset"]
+                positions = [self.feature_positions[column] for column in segment["columns"]]
+                features[:, offset:offset + len(positions)] = encoded[:, positions]
+            return features
+        except Exception as e:
+            raise RefurbishedCarException(e, sys)
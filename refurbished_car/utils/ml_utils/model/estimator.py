@@ -1,18 +1,34 @@
-from refurbished_car.constant.training_pipeline import SAVED_MODEL_DIR,MODEL_FILE_NAME
+from refurbished_car.constant.training_pipeline import SAVED_MODEL_DIR,MODEL_FILE_NAME,MODEL_BUNDLE_FORMAT_VERSION
 
 import os
 import sys
+import uuid
+from datetime import datetime
 
 from refurbished_car.exception.exception import RefurbishedCarException
 from refurbished_car.logging.logger import logging
+from refurbished_car.utils.ml_utils.model.compiled_preprocessor import CompiledPreprocessor
 
 class NetworkModel:
-    def __init__(self,preprocessor,model):
+    def __init__(self,preprocessor,model,metadata:dict=None):
         try:
             self.preprocessor = preprocessor
             self.model = model
+            self.metadata = metadata or {}
+            self.version = None # set by save_model_bundle / load_model_bundle
+            self.compiled_preprocessor = self.compile_preprocessor()
         except Exception as e:
             raise RefurbishedCarException(e,sys)
+
+    def compile_preprocessor(self):
+        """
+        Compile the fitted preprocessor for the DataFrame-free record path, None when it cannot be compiled
+        """
+        try:
+            return CompiledPreprocessor.from_column_transformer(self.preprocessor)
+        except Exception as e:
+            logging.info(f"Preprocessor not compiled, records will go through the DataFrame path: {e}")
+            return None
     
     def predict(self,x):
         try:
@@ -20,4 +36,74 @@ class NetworkModel:
             y_hat = self.model.predict(x_transform)
             return y_hat
         except Exception as e:
-            raise RefurbishedCarException(e,sys)
\ No newline at end of file
+            raise RefurbishedCarException(e,sys)
+
+    def predict_records(self,records):
+        """
+        Predict a list of dict (or tuple) records, skipping pandas when the preprocessor is compiled
+        """
+        try:
+            compiled_preprocessor = getattr(self, "compiled_preprocessor", None)
+            if compiled_preprocessor is None:
+                import pandas as pd
+                return self.predict(pd.DataFrame.from_records(records, columns=getattr(self.preprocessor, "feature_names_in_", None)))
+            return self.model.predict(compiled_preprocessor.transform_records(records))
+        except Exception as e:
+            raise RefurbishedCarException(e,sys)
+
+    def predict_encoded(self,encoded):
+        """
+        Predict rows already in the compiled preprocessor's encoded layout (see CompiledPreprocessor.encode_dataframe)
+        """
+        try:
+            return self.model.predict(self.compiled_preprocessor.transform_encoded(encoded))
+        except Exception as e:
+            raise RefurbishedCarException(e,sys)
+
+
+def save_model_bundle(file_path:str,network_model:NetworkModel)->str:
+    """
+    Save the preprocessor, the estimator, the compiled preprocessor and the metadata as one
+    versioned joblib file. joblib writes numpy arrays (tree nodes, coefficients, scaler vectors)
+    as raw buffers, so load_model_bundle can memory-map them instead of copying
+    return: str version of the bundle, a new one every time a model is saved
+    """
+    try:
+        import joblib
+
+        network_model.version = f"{datetime.now().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        bundle = {
+            "format_version": MODEL_BUNDLE_FORMAT_VERSION,
+            "version": network_model.version,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "metadata": network_model.metadata,
+            "network_model": network_model,
+        }
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        partial_file_path = f"{file_path}.partial" # readers never see a half written bundle
+        joblib.dump(bundle, partial_file_path)
+        os.replace(partial_file_path, file_path)
+        logging.info(f"Saved model bundle {network_model.version} to {file_path}")
+        return network_model.version
+    except Exception as e:
+        raise RefurbishedCarException(e,sys)
+
+
+def load_model_bundle(file_path:str,mmap_mode:str="r")->NetworkModel:
+    """
+    Load a model bundle saved by save_model_bundle
+    mmap_mode: "r" maps the large arrays read-only from the page cache, so loading takes milliseconds
+        and every process serving the same file shares one copy; None reads them into private memory
+    """
+    try:
+        import joblib
+
+        bundle = joblib.load(file_path, mmap_mode=mmap_mode)
+        if bundle.get("format_version") != MODEL_BUNDLE_FORMAT_VERSION:
+            raise ValueError(f"Model bundle {file_path} has format {bundle.get('format_version')}, expected {MODEL_BUNDLE_FORMAT_VERSION}")
+        network_model = bundle["network_model"]
+        network_model.version = bundle["version"]
+        network_model.metadata = bundle["metadata"]
+        return network_model
+    except Exception as e:
+        raise RefurbishedCarException(e,sys)
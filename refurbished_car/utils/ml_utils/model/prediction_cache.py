@@ -0,0 +1,165 @@
+import sys
+import time
+import threading
+from collections import OrderedDict
+
+from refurbished_car.exception.exception import RefurbishedCarException
+
+
+def _is_missing(value)->bool:
+    return value is None or (isinstance(value,float) and value!=value)
+
+
+class PredictionCache:
+    """
+    Bounded LRU cache of predictions keyed by the normalized features of a listing, so a dealer
+    re-quoting the same car does not reach the model. Only the columns the preprocessor reads are
+    part of the key (a row id does not defeat the cache), numeric features are compared as floats
+    (5, 5.0 and "5" are the same model input) and every missing value is the same key.
+    Entries belong to one model bundle version: the first lookup with another version empties the cache
+    max_entries: least recently used entries are evicted above this size
+    ttl_seconds: entries older than this count as misses, None keeps them until evicted
+    """
+    def __init__(self,max_entries:int,ttl_seconds:float=None):
+        self.max_entries=max_entries
+        self.ttl_seconds=ttl_seconds
+        self._entries=OrderedDict() # key -> (prediction, monotonic time it was stored)
+        self._lock=threading.Lock()
+        self._bound=False # bound to a model on the first lookup, the version may be None for an unsaved model
+        self._model_version=None
+        self._key_columns=None
+        self.hits=0
+        self.misses=0
+        self.evictions=0
+        self.expirations=0
+        self.invalidations=0
+
+    @staticmethod
+    def get_key_columns(network_model)->list:
+        """
+        (column, is numeric) of every column the preprocessor reads, None when they are not known
+        """
+        compiled_preprocessor=getattr(network_model,"compiled_preprocessor",None)
+        if compiled_preprocessor is not None:
+            numeric_columns=[column for segment in compiled_preprocessor.numeric_segments for column in segment["columns"]]
+            categorical_segments=list(compiled_preprocessor.onehot_segments)+list(compiled_preprocessor.ordinal_segments)
+            categorical_columns=[column for segment in categorical_segments for column in segment["columns"]]
+            return [(column,True) for column in numeric_columns]+[(column,False) for column in categorical_columns]
+        feature_names=getattr(network_model.preprocessor,"feature_names_in_",None)
+        if feature_names is None:
+            return None
+        return [(column,False) for column in feature_names]
+
+    def _check_version(self,network_model)->None:
+        version=getattr(network_model,"version",None)
+        if self._bound and version==self._model_version:
+            return
+        if self._entries:
+            self.invalidations+=1
+        self._entries.clear()
+        self._model_version=version
+        self._key_columns=self.get_key_columns(network_model)
+        self._bound=True
+
+    def record_key(self,record:dict)->tuple:
+        if self._key_columns is None:
+            return tuple(sorted((column,None if _is_missing(value) else value) for column,value in record.items()))
+        key=[]
+        for column,is_numeric in self._key_columns:
+            value=record.get(column)
+            if _is_missing(value):
+                value=None
+            elif is_numeric:
+                try:
+                    value=float(value)
+                    value=None if value!=value else value
+                except (TypeError,ValueError):
+                    value=("raw",str(value))
+            key.append(value)
+        return tuple(key)
+
+    def lookup(self,network_model,records:list):
+        """
+        records: list of dict records
+        return: tuple (keys, predictions with None for the misses, indices of the missed records)
+        """
+        try:
+            with self._lock:
+                self._check_version(network_model)
+                keys=[self.record_key(record) for record in records]
+                predictions=[None]*len(records)
+                missed=[]
+                now=time.monotonic()
+                for index,key in enumerate(keys):
+                    entry=self._entries.get(key)
+                    if entry is not None and self.ttl_seconds is not None and now-entry[1]>self.ttl_seconds:
+                        del self._entries[key]
+                        self.expirations+=1
+                        entry=None
+                    if entry is None:
+                        self.misses+=1
+                        missed.append(index)
+                    else:
+                        self.hits+=1
+                        self._entries.move_to_end(key)
+                        predictions[index]=entry[0]
+                return keys,predictions,missed
+        except Exception as e:
+            raise RefurbishedCarException(e,sys)
+
+    def store(self,network_model,keys:list,predictions)->None:
+        try:
+            with self._lock:
+                if getattr(network_model,"version",None)!=self._model_version:
+                    return # scored by a model that has been replaced meanwhile
+                now=time.monotonic()
+                for key,prediction in zip(keys,predictions):
+                    self._entries[key]=(float(prediction),now)
+                    self._entries.move_to_end(key)
+                while len(self._entries)>self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions+=1
+        except Exception as e:
+            raise RefurbishedCarException(e,sys)
+
+    def predict_records(self,network_model,records:list)->list:
+        """
+        NetworkModel.predict_records through the cache, the missed records reach the model in one call
+        """
+        try:
+            keys,predictions,missed=self.lookup(network_model,records)
+            if missed:
+                missed_predictions=network_model.predict_records([records[index] for index in missed])
+                self.store(network_model,[keys[index] for index in missed],missed_predictions)
+                for index,prediction in zip(missed,missed_predictions):
+                    predictions[index]=float(prediction)
+            return predictions
+        except Exception as e:
+            raise RefurbishedCarException(e,sys)
+
+    def predict(self,network_model,dataframe)->list:
+        """
+        NetworkModel.predict through the cache, for a DataFrame of listings
+        """
+        try:
+            return self.predict_records(network_model,dataframe.to_dict("records"))
+        except Exception as e:
+            raise RefurbishedCarException(e,sys)
+
+    def clear(self)->None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self)->dict:
+        lookups=self.hits+self.misses
+        return {
+            "entries":len(self._entries),
+            "max_entries":self.max_entries,
+            "hits":self.hits,
+            "misses":self.misses,
+            "hit_rate":round(self.hits/lookups,4) if lookups else None,
+            "evictions":self.evictions,
+            "expirations":self.expirations,
+            "invalidations":self.invalidations,
+            "model_version":self._model_version,
+        }
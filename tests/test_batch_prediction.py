@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.compose import ColumnTransformer
+from sklearn.impute import SimpleImputer
+from sklearn.linear_model import LinearRegression
+
+from refurbished_car.entity.config_entity import BatchPredictionConfig, TrainingPipelineConfig
+from refurbished_car.pipeline.batch_prediction import BatchPrediction
+from refurbished_car.utils.main_utils.utils import load_dataframe
+from refurbished_car.utils.ml_utils.model.estimator import NetworkModel, save_model_bundle
+
+
+@pytest.fixture
+def model_bundle_file_path(tmp_path):
+    train = pd.DataFrame({"km_driven": [1000.0, 2000.0, 3000.0], "seats": [5.0, 7.0, 5.0]})
+    preprocessor = ColumnTransformer([("imputer", SimpleImputer(strategy="median"), ["km_driven", "seats"])]).fit(train)
+    model = LinearRegression().fit(preprocessor.transform(train), [300000.0, 500000.0, 400000.0])
+    file_path = str(tmp_path / "final_model" / "model_bundle.joblib")
+    save_model_bundle(file_path, NetworkModel(preprocessor=preprocessor, model=model))
+    return file_path
+
+
+@pytest.mark.parametrize("input_format", ["csv", "parquet"])
+def test_chunk_with_only_missing_values_keeps_the_output_schema(tmp_path, model_bundle_file_path, input_format):
+    listings = pd.DataFrame({
+        "brand": [None, None, "Maruti", "Hyundai", "Honda"],
+        "km_driven": [1500, 2500, 1000, 2000, 3000],
+        "seats": [None, None, 5, 7, 5],  # the first chunk, which the output schema used to be inferred from, is all missing
+    })
+    input_file_path = tmp_path / f"listings.{input_format}"
+    if input_format == "csv":
+        listings.to_csv(input_file_path, index=False)
+    else:
+        listings.to_parquet(input_file_path, index=False)
+
+    batch_prediction_config = BatchPredictionConfig(TrainingPipelineConfig(), input_file_path=str(input_file_path))
+    batch_prediction_config.model_bundle_file_path = model_bundle_file_path
+    batch_prediction_config.prediction_file_path = str(tmp_path / "batch_prediction" / "predictions.parquet")
+    batch_prediction_config.chunk_size = 2
+    batch_prediction_config.n_jobs = 1
+    batch_prediction_artifact = BatchPrediction(batch_prediction_config).initiate_batch_prediction()
+
+    assert batch_prediction_artifact.number_of_rows == 5
+    predictions = load_dataframe(batch_prediction_artifact.prediction_file_path)
+    assert predictions["seats"].isna().tolist() == [True, True, False, False, False]
+    assert predictions["brand"].tolist()[2:] == ["Maruti", "Hyundai", "Honda"]
+    assert np.isfinite(predictions[batch_prediction_config.prediction_column]).all()
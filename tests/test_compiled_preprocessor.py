@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from refurbished_car.components.data_transformation import DataTransformation
+from refurbished_car.constant.training_pipeline import TARGET_COLUMN
+from refurbished_car.entity.config_entity import DataTransformationConfig, TrainingPipelineConfig
+from refurbished_car.utils.ml_utils.model.compiled_preprocessor import CompiledPreprocessor
+
+
+@pytest.fixture(scope="module")
+def features():
+    return pd.read_csv("dataset/cardekho_imputated.csv", nrows=2000).drop(columns=[TARGET_COLUMN])
+
+
+def fitted_preprocessor(features, categorical_encoding, sparse_output=False, max_categories=255):
+    data_transformation_config = DataTransformationConfig(TrainingPipelineConfig())
+    data_transformation_config.categorical_encoding = categorical_encoding
+    data_transformation_config.sparse_output = sparse_output
+    data_transformation_config.max_categories = max_categories
+    return DataTransformation(None, data_transformation_config).get_data_transformer_object().fit(features)
+
+
+def records_with_gaps(features):
+    records = features.head(200).to_dict("records")
+    first = records[0]
+    records += [
+        {**first, "mileage": None, "engine": np.nan, "seats": None},  # missing numerics
+        {**first, "brand": "Unseen", "model": "Unseen", "car_name": "Unseen Car"},  # unseen categories
+        {**first, "fuel_type": None, "transmission_type": np.nan},  # missing categories, only nan is imputed by sklearn
+        {**first, "km_driven": "45000", "vehicle_age": 3},  # numbers given as text or int
+    ]
+    return records
+
+
+@pytest.mark.parametrize("categorical_encoding, sparse_output, max_categories", [
+    ("ordinal", False, 255),
+    ("ordinal", False, 5),  # the rarest categories share the infrequent code
+    ("onehot", False, 255),
+    ("onehot", True, 255),
+])
+def test_compiled_output_matches_the_column_transformer(features, categorical_encoding, sparse_output, max_categories):
+    preprocessor = fitted_preprocessor(features, categorical_encoding, sparse_output, max_categories)
+    compiled = CompiledPreprocessor.from_column_transformer(preprocessor)
+    records = records_with_gaps(features)
+
+    expected = preprocessor.transform(pd.DataFrame.from_records(records, columns=features.columns))
+    expected = expected.toarray() if hasattr(expected, "toarray") else expected
+    actual = compiled.transform_records(records)
+    assert actual.shape == expected.shape
+    assert np.array_equal(actual, expected, equal_nan=True)
+    for index in (0, -4, -3, -2, -1):
+        assert np.array_equal(compiled.transform_record(records[index])[0], expected[index], equal_nan=True)
+    encoded = compiled.encode_dataframe(pd.DataFrame.from_records(records, columns=features.columns))
+    assert np.array_equal(compiled.transform_encoded(encoded), expected, equal_nan=True)
+    assert np.array_equal(compiled.transform_encoded(compiled.encode_records(records)), expected, equal_nan=True)
@@ -0,0 +1,22 @@
+import pandas as pd
+import pytest
+
+from refurbished_car.utils.main_utils.utils import DataFrameChunkWriter, load_dataframe
+
+
+@pytest.mark.parametrize("file_extension", ["csv", "parquet", "feather"])
+def test_empty_first_chunk_writes_the_header_once(tmp_path, file_extension):
+    schema_columns = {"brand": "object", "km_driven": "int64"}
+    listings = pd.DataFrame({"brand": ["Maruti", "Hyundai", "Honda"], "km_driven": [1000, 2000, 3000]})
+    file_path = str(tmp_path / f"test.{file_extension}")
+    with DataFrameChunkWriter(file_path, schema_columns=schema_columns) as writer:
+        writer.write(listings.iloc[:0])  # e.g. a split chunk without test rows
+        writer.write(listings.iloc[:2])
+        writer.write(listings.iloc[2:])
+
+    assert writer.number_of_rows == 3
+    written = load_dataframe(file_path, schema_columns=schema_columns)
+    assert written["brand"].tolist() == ["Maruti", "Hyundai", "Honda"]
+    assert written["km_driven"].tolist() == [1000, 2000, 3000]
+    if file_extension == "csv":
+        assert open(file_path).read().count("brand,km_driven") == 1
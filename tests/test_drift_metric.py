@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.stats import chi2_contingency, ks_2samp
+
+from refurbished_car.utils.main_utils.utils import read_json_file, write_json_file
+from refurbished_car.utils.ml_utils.metric.drift_metric import (
+    build_reference_profile,
+    detect_drift,
+    detect_drift_against_profile,
+)
+
+
+def listings(n_rows, seed, price_shift=0.0, diesel_share=0.3):
+    rng = np.random.default_rng(seed)
+    dataframe = pd.DataFrame({
+        "km_driven": rng.lognormal(10.5, 0.6, n_rows),
+        "vehicle_age": rng.integers(0, 15, n_rows),  # many ties
+        "selling_price": rng.normal(500000 + price_shift, 150000, n_rows),
+        "fuel_type": rng.choice(["Petrol", "Diesel", "CNG"], n_rows, p=[0.65 - diesel_share / 2, diesel_share, 0.35 - diesel_share / 2]),
+        "brand": rng.choice(["Maruti", "Hyundai", "Honda", "Toyota", "Tata"], n_rows),
+    })
+    dataframe.loc[rng.choice(n_rows, n_rows // 50, replace=False), "km_driven"] = np.nan
+    dataframe.loc[rng.choice(n_rows, n_rows // 50, replace=False), "brand"] = None
+    return dataframe
+
+
+@pytest.mark.parametrize("price_shift", [0.0, 20000.0])
+def test_ks_pvalues_match_scipy(price_shift):
+    base, current = listings(3000, seed=1), listings(2500, seed=2, price_shift=price_shift)
+    report = detect_drift(base, current, n_jobs=2)
+    for column in ("km_driven", "vehicle_age", "selling_price"):
+        expected = ks_2samp(base[column].dropna(), current[column].dropna(), method="asymp")
+        assert report[column]["p_value"] == pytest.approx(expected.pvalue, rel=1e-9, abs=1e-300)
+        assert report[column]["drift_status"] == (expected.pvalue < 0.05)
+
+
+@pytest.mark.parametrize("diesel_share", [0.3, 0.4])
+def test_chi_square_pvalues_match_scipy(diesel_share):
+    base, current = listings(3000, seed=1), listings(2500, seed=2, diesel_share=diesel_share)
+    report = detect_drift(base, current)
+    for column in ("fuel_type", "brand"):
+        table = pd.concat([base[column].value_counts(), current[column].value_counts()], axis=1).fillna(0).to_numpy().T
+        expected = chi2_contingency(table).pvalue
+        assert report[column]["p_value"] == pytest.approx(expected, rel=1e-9, abs=1e-300)
+        assert report[column]["drift_status"] == (expected < 0.05)
+
+
+def test_reference_profile_survives_the_json_round_trip(tmp_path):
+    base, current = listings(3000, seed=1), listings(2500, seed=2, price_shift=20000.0, diesel_share=0.4)
+    profile = build_reference_profile(base, n_quantiles=101, max_categories=2)
+    profile_file_path = str(tmp_path / "drift_report" / "reference_profile.json")
+    write_json_file(profile_file_path, profile)
+    loaded_profile = read_json_file(profile_file_path)
+
+    assert loaded_profile == profile
+    assert loaded_profile["columns"]["brand"]["other"] > 0  # categories past max_categories are folded together
+    assert detect_drift_against_profile(loaded_profile, current) == detect_drift_against_profile(profile, current)
+    report = detect_drift_against_profile(loaded_profile, current)
+    assert report["selling_price"]["drift_status"] and report["fuel_type"]["drift_status"]
+    assert not report["vehicle_age"]["drift_status"]
@@ -0,0 +1,19 @@
+import pandas as pd
+
+from refurbished_car.utils.main_utils.utils import enforce_schema
+
+
+def test_non_numeric_value_in_int_column_becomes_missing():
+    dataframe = pd.DataFrame({"vehicle_age": ["3", "abc", 5], "km_driven": [100, 200, 300]})
+    result = enforce_schema(dataframe, {"vehicle_age": "int64", "km_driven": "int64"})
+    assert result["vehicle_age"].dtype == "float64"
+    assert result["vehicle_age"].isna().tolist() == [False, True, False]
+    assert result["km_driven"].dtype == "int64"
+
+
+def test_object_columns_keep_missing_values():
+    dataframe = pd.DataFrame({"brand": ["Maruti", None, 7]})
+    result = enforce_schema(dataframe, {"brand": "object"})
+    assert result["brand"].tolist()[0] == "Maruti"
+    assert result["brand"].isna().tolist() == [False, True, False]
+    assert result["brand"].tolist()[2] == "7"
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+from sklearn.base import BaseEstimator, RegressorMixin
+from sklearn.linear_model import LinearRegression
+
+from refurbished_car.exception.exception import RefurbishedCarException
+from refurbished_car.utils.main_utils.utils import evaluate_models
+
+
+class BrokenRegressor(RegressorMixin, BaseEstimator):
+    def __init__(self, alpha=1.0):
+        self.alpha = alpha
+
+    def fit(self, X, y):
+        raise ValueError("cannot fit")
+
+
+def regression_data():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(300, 3))
+    y = X @ np.array([1.0, 2.0, -1.0]) + rng.normal(scale=0.1, size=300)
+    return X[:240], y[:240], X[240:], y[240:]
+
+
+def test_families_that_never_fit_are_dropped():
+    models = {"Linear Regression": LinearRegression(), "Broken": BrokenRegressor()}
+    params = {"Linear Regression": {}, "Broken": {"alpha": [0.1, 1.0]}}
+    search_report = {}
+    report = evaluate_models(*regression_data(), models, params, n_jobs=1, search_report=search_report)
+    assert list(report) == ["Linear Regression"]
+    assert report["Linear Regression"] > 0.9
+    assert search_report["Broken"]["failed"] is True
+
+
+def test_search_fails_clearly_when_nothing_fits():
+    models = {"Broken": BrokenRegressor()}
+    with pytest.raises(RefurbishedCarException, match="failed to fit"):
+        evaluate_models(*regression_data(), models, {"Broken": {"alpha": [0.1, 1.0]}}, n_jobs=1)
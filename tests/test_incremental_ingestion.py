@@ -0,0 +1,126 @@
+from datetime import datetime, timedelta
+
+import mongomock
+import pandas as pd
+import pytest
+
+from refurbished_car.components import data_ingestion as data_ingestion_module
+from refurbished_car.components.data_ingestion import DataIngestion
+from refurbished_car.constant.training_pipeline import DATA_INGESTION_COLLECTION_NAME, DATA_INGESTION_DATABASE_NAME
+from refurbished_car.entity.config_entity import DataIngestionConfig, TrainingPipelineConfig
+from refurbished_car.exception.exception import RefurbishedCarException
+from refurbished_car.utils.main_utils.utils import load_dataframe
+
+START = datetime(2026, 1, 1)
+
+
+def listing(listing_id, selling_price, updated_minutes):
+    return {
+        "Unnamed: 0": listing_id, "car_name": "Maruti Swift", "brand": "Maruti", "model": "Swift",
+        "vehicle_age": 5, "km_driven": 40000, "seller_type": "Dealer", "fuel_type": "Petrol",
+        "transmission_type": "Manual", "mileage": 21.0, "engine": 1197, "max_power": 82.0, "seats": 5,
+        "selling_price": selling_price, "updated_at": START + timedelta(minutes=updated_minutes),
+    }
+
+
+def incremental_config(tmp_path, **overrides):
+    config = DataIngestionConfig(TrainingPipelineConfig())
+    config.incremental = True
+    config.watermark_field = "updated_at"
+    config.listing_key_columns = ["Unnamed: 0"]
+    config.incremental_parts_dir = str(tmp_path / "store" / "parts")
+    config.watermark_file_path = str(tmp_path / "store" / "watermark.yaml")
+    config.invalid_file_path = str(tmp_path / "run" / "invalid.parquet")
+    config.feature_store_file_path = str(tmp_path / "run" / "feature_store.parquet")
+    config.training_file_path = str(tmp_path / "run" / "train.parquet")
+    config.testing_file_path = str(tmp_path / "run" / "test.parquet")
+    for name, value in overrides.items():
+        setattr(config, name, value)
+    return config
+
+
+@pytest.fixture
+def collection(monkeypatch):
+    client = mongomock.MongoClient()
+    monkeypatch.setattr(data_ingestion_module, "get_mongo_client", lambda: client)
+    return client[DATA_INGESTION_DATABASE_NAME][DATA_INGESTION_COLLECTION_NAME]
+
+
+def test_incremental_runs_append_parts_and_keep_the_latest_listing(tmp_path, collection):
+    collection.insert_many([listing(listing_id, 500000, listing_id) for listing_id in range(20)])
+    data_ingestion = DataIngestion(incremental_config(tmp_path))
+    assert data_ingestion.export_incremental_into_feature_store() == 20
+
+    collection.update_one({"Unnamed: 0": 3}, {"$set": {"selling_price": 450000, "updated_at": START + timedelta(days=1)}})
+    collection.insert_one(listing(20, 600000, 2 * 24 * 60))
+    data_ingestion = DataIngestion(incremental_config(tmp_path))
+    first_part_mtime = (tmp_path / "store" / "parts" / "part-000000.parquet").stat().st_mtime_ns
+    assert data_ingestion.export_incremental_into_feature_store() == 2
+
+    parts = sorted(path.name for path in (tmp_path / "store" / "parts").iterdir())
+    assert parts == ["part-000000.parquet", "part-000001.parquet"]
+    assert (tmp_path / "store" / "parts" / "part-000000.parquet").stat().st_mtime_ns == first_part_mtime
+    assert "updated_at" not in load_dataframe(str(tmp_path / "store" / "parts" / "part-000001.parquet")).columns
+
+    number_of_train_rows, number_of_test_rows = data_ingestion.split_data_as_train_test()
+    assert number_of_train_rows + number_of_test_rows == 21
+    split = pd.concat([load_dataframe(data_ingestion.data_ingestion_config.training_file_path),
+                       load_dataframe(data_ingestion.data_ingestion_config.testing_file_path)])
+    assert sorted(split["Unnamed: 0"]) == list(range(21))
+    assert split.loc[split["Unnamed: 0"] == 3, "selling_price"].tolist() == [450000]
+
+
+def test_incremental_run_without_new_documents_reuses_the_parts(tmp_path, collection):
+    collection.insert_many([listing(listing_id, 500000, listing_id) for listing_id in range(5)])
+    DataIngestion(incremental_config(tmp_path)).export_incremental_into_feature_store()
+    assert DataIngestion(incremental_config(tmp_path)).export_incremental_into_feature_store() == 0
+    assert [path.name for path in (tmp_path / "store" / "parts").iterdir()] == ["part-000000.parquet"]
+
+
+@pytest.mark.parametrize("overrides", [
+    {"listing_key_columns": None},
+    {"listing_key_columns": ["listing_id"]},
+    {"watermark_field": "_id"},
+])
+def test_incremental_needs_a_listing_key_and_an_updated_at_watermark(tmp_path, overrides):
+    with pytest.raises(RefurbishedCarException):
+        DataIngestion(incremental_config(tmp_path, **overrides))
+
+
+def test_id_is_only_projected_out(tmp_path):
+    config = DataIngestionConfig(TrainingPipelineConfig())
+    sort = {"$sort": {"Unnamed: 0": 1}}
+    config.projection = ["brand", "selling_price"]
+    assert DataIngestion(config).build_aggregation_pipeline() == [sort, {"$project": {"brand": 1, "selling_price": 1, "_id": 0}}]
+    config.projection = None
+    assert DataIngestion(config).build_aggregation_pipeline() == [sort, {"$project": {"_id": 0}}]
+    config = incremental_config(tmp_path, projection=["brand"])
+    assert DataIngestion(config).build_aggregation_pipeline() == [sort, {"$project": {"brand": 1, "updated_at": 1, "_id": 0}}]
+    config.sort_key_columns = None
+    assert DataIngestion(config).build_aggregation_pipeline() == [{"$project": {"brand": 1, "updated_at": 1, "_id": 0}}]
+
+
+def test_incremental_append_of_listings_loaded_by_push_data(tmp_path, collection, monkeypatch):
+    import push_data
+    from push_data import CarDataExtract
+
+    monkeypatch.setattr(push_data, "get_mongo_client", lambda: collection.database.client)
+    loader = CarDataExtract(batch_size=4, n_writers=1)
+
+    def load(listings, file_name):
+        pd.DataFrame(listings).drop(columns=["updated_at"]).to_csv(tmp_path / file_name, index=False)
+        return loader.load_csv_into_mongodb(str(tmp_path / file_name), DATA_INGESTION_DATABASE_NAME, DATA_INGESTION_COLLECTION_NAME)
+
+    assert load([listing(listing_id, 500000, 0) for listing_id in range(10)], "dump.csv") == 10
+    config = incremental_config(tmp_path, watermark_field=DataIngestionConfig(TrainingPipelineConfig()).watermark_field)
+    assert DataIngestion(config).export_incremental_into_feature_store() == 10
+
+    load([listing(3, 450000, 0), listing(10, 600000, 0)], "delta.csv")  # a new version of listing 3 and a new listing
+    data_ingestion = DataIngestion(config)
+    assert data_ingestion.export_incremental_into_feature_store() == 2
+
+    number_of_train_rows, number_of_test_rows = data_ingestion.split_data_as_train_test()
+    assert number_of_train_rows + number_of_test_rows == 11
+    split = pd.concat([load_dataframe(config.training_file_path), load_dataframe(config.testing_file_path)])
+    assert "updated_at" not in split.columns
+    assert split.loc[split["Unnamed: 0"] == 3, "selling_price"].tolist() == [450000]
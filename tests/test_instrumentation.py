@@ -0,0 +1,59 @@
+import multiprocessing
+import time
+
+import numpy as np
+import pytest
+
+from refurbished_car.utils.main_utils import instrumentation
+from refurbished_car.utils.main_utils.instrumentation import RunInstrumentation, instrument_stage
+
+
+def burn_cpu(seconds):
+    start_time = time.process_time()
+    while time.process_time() - start_time < seconds:
+        pass
+    return seconds
+
+
+def test_cpu_of_live_pool_workers_is_counted():
+    pytest.importorskip("psutil")
+    pool = multiprocessing.get_context("fork").Pool(2)
+    try:
+        @instrument_stage("model_trainer")
+        def train():
+            pool.map(burn_cpu, [0.4, 0.4], chunksize=1)  # the workers outlive the stage, like a reused loky executor
+
+        with RunInstrumentation() as run:
+            train()
+    finally:
+        pool.terminate()
+        pool.join()
+    stage = run.stages[0]
+    assert stage["cpu_scope"] == "process_tree"
+    assert stage["cpu_seconds"] >= 0.7
+
+
+def test_peak_rss_belongs_to_the_stage():
+    if not instrumentation._reset_peak_rss() or instrumentation._read_status_mb("VmHWM") is None:
+        pytest.skip("the peak rss cannot be reset on this platform")
+
+    @instrument_stage("data_transformation")
+    def allocate():
+        np.ones(200 * 2 ** 20 // 8).sum()
+
+    @instrument_stage("data_validation")
+    def small():
+        np.ones(1000).sum()
+
+    @instrument_stage("training_pipeline")
+    def pipeline():
+        allocate()
+        small()
+
+    with RunInstrumentation() as run:
+        pipeline()
+    stages = {stage["stage"]: stage for stage in run.stages}
+    assert stages["data_transformation"]["rss_growth_mb"] >= 150
+    assert stages["data_validation"]["rss_growth_mb"] < 50  # not the peak left behind by the previous stage
+    assert stages["training_pipeline"]["rss_growth_mb"] >= 150  # kept although the nested stages reset the peak
+    assert "process_peak_rss_mb" in run.report()
@@ -0,0 +1,11 @@
+import sys
+
+from refurbished_car.components import model_trainer as model_trainer_module
+from refurbished_car.components.model_trainer import ModelTrainer
+
+
+def test_tracking_is_skipped_without_a_tracking_uri(monkeypatch):
+    monkeypatch.delenv("MLFLOW_TRACKING_URI", raising=False)
+    monkeypatch.setattr(model_trainer_module, "load_dotenv", lambda: False)
+    monkeypatch.setitem(sys.modules, "mlflow", None)  # importing mlflow would raise
+    assert ModelTrainer(None, None).track_mlflow(best_model=None, regressionmetric=None) is None
@@ -0,0 +1,88 @@
+from types import SimpleNamespace
+
+import pytest
+
+from refurbished_car.utils.ml_utils.model import prediction_cache as prediction_cache_module
+from refurbished_car.utils.ml_utils.model.prediction_cache import PredictionCache
+
+
+class CountingModel:
+    """
+    Prices a listing at twice its km_driven and records every listing that reaches it
+    """
+    def __init__(self, version=None):
+        self.version = version
+        self.preprocessor = SimpleNamespace(feature_names_in_=["km_driven"])
+        self.compiled_preprocessor = None
+        self.scored = []
+
+    def predict_records(self, records):
+        self.scored.extend(record["km_driven"] for record in records)
+        return [record["km_driven"] * 2.0 for record in records]
+
+
+def quote(km_driven):
+    return {"km_driven": km_driven}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=0.0)
+    monkeypatch.setattr(prediction_cache_module, "time", SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+
+@pytest.mark.parametrize("version", [None, "20261018-abcd"])
+def test_repeat_quotes_hit_for_the_same_model(version):
+    cache = PredictionCache(max_entries=10)
+    model = CountingModel(version=version)
+    assert cache.predict_records(model, [quote(1000), quote(2000)]) == [2000.0, 4000.0]
+    assert cache.predict_records(model, [quote(1000), quote(2000)]) == [2000.0, 4000.0]
+    assert model.scored == [1000, 2000]  # an unsaved model (version None) keeps its entries too
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["invalidations"] == 0
+
+
+def test_least_recently_used_entry_is_evicted_first():
+    cache = PredictionCache(max_entries=2)
+    model = CountingModel()
+    cache.predict_records(model, [quote(1), quote(2)])
+    cache.predict_records(model, [quote(1)])  # 1 is now more recent than 2
+    cache.predict_records(model, [quote(3)])  # evicts 2
+    model.scored.clear()
+    cache.predict_records(model, [quote(1), quote(3), quote(2)])
+    assert model.scored == [2]
+    assert cache.stats()["evictions"] == 2
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = PredictionCache(max_entries=10, ttl_seconds=60)
+    model = CountingModel()
+    cache.predict_records(model, [quote(1000)])
+    clock.now = 60.0
+    cache.predict_records(model, [quote(1000)])
+    assert model.scored == [1000]
+    clock.now = 60.5
+    cache.predict_records(model, [quote(1000)])
+    assert model.scored == [1000, 1000]
+    assert cache.stats()["expirations"] == 1
+
+
+@pytest.mark.parametrize("old_version, new_version", [("v1", "v2"), (None, "v1"), ("v1", None)])
+def test_a_new_model_version_empties_the_cache(old_version, new_version):
+    cache = PredictionCache(max_entries=10)
+    cache.predict_records(CountingModel(version=old_version), [quote(1000)])
+    new_model = CountingModel(version=new_version)
+    cache.predict_records(new_model, [quote(1000)])
+    assert new_model.scored == [1000]
+    assert cache.stats()["invalidations"] == 1
+    assert cache.stats()["model_version"] == new_version
+
+
+def test_predictions_of_a_replaced_model_are_not_stored():
+    cache = PredictionCache(max_entries=10)
+    old_model, new_model = CountingModel(version="v1"), CountingModel(version="v2")
+    keys, _, _ = cache.lookup(old_model, [quote(1000)])
+    cache.lookup(new_model, [quote(2000)])
+    cache.store(old_model, keys, [1.0])  # scored by v1 after v2 took over
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,86 @@
+import os
+import signal
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.compose import ColumnTransformer
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from refurbished_car.entity.config_entity import PredictionPoolConfig, TrainingPipelineConfig
+from refurbished_car.exception.exception import RefurbishedCarException
+from refurbished_car.pipeline.prediction_pool import PredictionWorkerPool
+from refurbished_car.utils.ml_utils.model.estimator import NetworkModel
+
+BAD_KM_DRIVEN = 1e9
+
+
+class FailingModel:
+    """
+    Doubles the first feature, and fails on any batch holding a row with km_driven == BAD_KM_DRIVEN
+    """
+    def __init__(self, bad_value):
+        self.bad_value = bad_value
+
+    def predict(self, features):
+        if (features[:, 0] == self.bad_value).any():
+            raise ValueError("bad row")
+        return features[:, 0] * 2
+
+
+@pytest.fixture
+def network_model():
+    train = pd.DataFrame({"km_driven": [1000.0, 2000.0, 3000.0], "mileage": [15.0, 18.0, 21.0]})
+    preprocessor = ColumnTransformer([
+        ("num_pipeline", Pipeline([("imputer", SimpleImputer(strategy="median")), ("scaler", StandardScaler())]), ["km_driven", "mileage"]),
+    ]).fit(train)
+    scaler = preprocessor.named_transformers_["num_pipeline"].named_steps["scaler"]
+    bad_value = (BAD_KM_DRIVEN - scaler.mean_[0]) / scaler.scale_[0]
+    return NetworkModel(preprocessor=preprocessor, model=FailingModel(bad_value))
+
+
+@pytest.fixture
+def pool(network_model):
+    prediction_pool_config = PredictionPoolConfig(TrainingPipelineConfig())
+    prediction_pool_config.n_workers = 3
+    prediction_pool_config.max_batch_rows = 16
+    with PredictionWorkerPool(prediction_pool_config, network_model=network_model) as pool:
+        yield pool
+
+
+def listings(n_rows, bad_row=None):
+    dataframe = pd.DataFrame({"km_driven": np.arange(n_rows) * 100.0 + 500, "mileage": np.full(n_rows, 17.0)})
+    if bad_row is not None:
+        dataframe.loc[bad_row, "km_driven"] = BAD_KM_DRIVEN
+    return dataframe
+
+
+def test_worker_failure_does_not_leave_stale_replies(pool, network_model):
+    # 9 rows on 3 workers: the bad row lands on the middle worker, the last one still replies
+    with pytest.raises(RefurbishedCarException, match="worker 1 failed"):
+        pool.predict(listings(9, bad_row=4))
+    assert not any(connection.poll(0.5) for _, connection, _, _ in pool.workers)  # no reply left queued
+    for n_rows in (9, 5, 30):
+        good = listings(n_rows)
+        np.testing.assert_allclose(pool.predict(good), network_model.predict(good))
+
+
+def test_dead_worker_restarts_the_pool(pool, network_model):
+    process = pool.workers[1][0]
+    os.kill(process.pid, signal.SIGKILL)
+    process.join(timeout=5)
+    with pytest.raises(RefurbishedCarException, match="worker 1 is gone"):
+        pool.predict(listings(9))
+    assert all(process.is_alive() for process, _, _, _ in pool.workers)
+    good = listings(9)
+    np.testing.assert_allclose(pool.predict(good), network_model.predict(good))
+
+
+def test_predicting_before_start_raises_a_clear_error(network_model):
+    prediction_pool = PredictionWorkerPool(PredictionPoolConfig(TrainingPipelineConfig()), network_model=network_model)
+    with pytest.raises(RefurbishedCarException, match="call start"):
+        prediction_pool.predict(listings(4))
+    with pytest.raises(RefurbishedCarException, match="call start"):
+        prediction_pool.predict_encoded(np.zeros((4, 2)))
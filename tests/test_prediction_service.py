@@ -0,0 +1,104 @@
+import asyncio
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app as pricing_app
+from refurbished_car.exception.exception import RefurbishedCarException
+from refurbished_car.pipeline.prediction_service import MicroBatcher
+
+
+class PickyModel:
+    """Prices every listing at its km_driven, rejects a whole batch holding a listing without it"""
+    def __init__(self):
+        self.calls = []
+
+    def predict_records(self, records):
+        self.calls.append(len(records))
+        if any(record.get("km_driven") is None for record in records):
+            raise ValueError("km_driven is required")
+        return [float(record["km_driven"]) for record in records]
+
+
+def test_batcher_retries_each_request_when_a_batch_fails():
+    async def scenario():
+        network_model = PickyModel()
+        batcher = MicroBatcher(network_model, max_batch_size=64, max_wait_ms=50)
+        await batcher.start()
+        try:
+            results = await asyncio.gather(
+                batcher.predict([{"km_driven": 100}]),
+                batcher.predict([{"km_driven": None}]),
+                batcher.predict([{"km_driven": 300}, {"km_driven": 400}]),
+                return_exceptions=True,
+            )
+        finally:
+            await batcher.stop()
+        return network_model, results
+
+    network_model, results = asyncio.run(scenario())
+    assert network_model.calls == [4, 1, 1, 2]  # the coalesced batch, then each request on its own
+    assert results[0] == [100.0]
+    assert isinstance(results[1], ValueError)
+    assert results[2] == [300.0, 400.0]
+
+
+def test_batcher_answers_an_empty_request_without_queueing():
+    async def scenario():
+        batcher = MicroBatcher(PickyModel(), max_batch_size=64, max_wait_ms=50)
+        await batcher.start()
+        try:
+            return await batcher.predict([]), batcher.queue.qsize(), batcher.number_of_batches
+        finally:
+            await batcher.stop()
+
+    assert asyncio.run(scenario()) == ([], 0, 0)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(pricing_app.prediction_service, "network_model", object())
+    monkeypatch.setattr(pricing_app.prediction_service, "batcher", object())
+    return TestClient(pricing_app.app)
+
+
+def test_predict_without_a_model_is_unavailable(client, monkeypatch):
+    monkeypatch.setattr(pricing_app.prediction_service, "network_model", None)
+    assert client.post("/predict", json={"km_driven": 1000}).status_code == 503
+
+
+def test_predict_rejects_an_empty_list(client):
+    assert client.post("/predict", json=[]).status_code == 400
+
+
+def test_predict_reports_bad_listings_as_client_errors(client, monkeypatch):
+    async def predict(records):
+        try:
+            raise ValueError("Found unknown categories ['Hydrogen']")
+        except Exception as e:
+            raise RefurbishedCarException(e, sys)
+
+    monkeypatch.setattr(pricing_app.prediction_service, "predict", predict)
+    response = client.post("/predict", json={"fuel_type": "Hydrogen"})
+    assert response.status_code == 422
+    assert "Hydrogen" in response.json()["detail"]
+
+
+def test_predict_hides_internal_failures(client, monkeypatch):
+    async def predict(records):
+        raise RuntimeError("model file is corrupt")
+
+    monkeypatch.setattr(pricing_app.prediction_service, "predict", predict)
+    response = client.post("/predict", json=[{"km_driven": 1000}])
+    assert response.status_code == 500
+    assert response.json() == {"detail": "Prediction failed"}
+
+
+def test_predict_returns_prices(client, monkeypatch):
+    async def predict(records):
+        return [float(record["km_driven"]) for record in records]
+
+    monkeypatch.setattr(pricing_app.prediction_service, "predict", predict)
+    assert client.post("/predict", json={"km_driven": 1000}).json() == {"predicted_selling_price": 1000.0}
+    assert client.post("/predict", json=[{"km_driven": 1}, {"km_driven": 2}]).json() == {"predicted_selling_price": [1.0, 2.0]}
@@ -0,0 +1,87 @@
+from datetime import datetime, timezone
+
+import mongomock
+from pymongo.errors import BulkWriteError
+from pymongo.results import BulkWriteResult
+
+import push_data
+from push_data import CarDataExtract
+
+
+def test_insert_batch_stamps_updated_at():
+    collection = mongomock.MongoClient().db.listings
+    CarDataExtract.write_batch(collection, [{"Unnamed: 0": 1}, {"Unnamed: 0": 2}])
+    assert all(document["updated_at"] is not None for document in collection.find())
+
+
+class UpsertingCollection:
+    def find(self, query, projection):
+        return []
+
+    def bulk_write(self, operations, ordered):
+        return BulkWriteResult({"nUpserted": len(operations), "nMatched": 0}, acknowledged=True)
+
+
+def test_upsert_batch_stamps_updated_at():
+    documents = [{"Unnamed: 0": 1}, {"Unnamed: 0": 2}]
+    assert CarDataExtract.write_batch(UpsertingCollection(), documents, upsert_key=["Unnamed: 0"]) == 2
+    assert all(document["updated_at"] is not None for document in documents)  # the replacement documents
+
+
+def test_insert_batch_counts_the_documents_written_around_failures():
+    collection = mongomock.MongoClient().db.listings
+    collection.create_index([("Unnamed: 0", 1)], unique=True)
+    documents = [{"Unnamed: 0": 1}, {"Unnamed: 0": 1}, {"Unnamed: 0": 2}]
+    assert CarDataExtract.write_batch(collection, documents) == 2
+    assert collection.count_documents({}) == 2
+
+
+class PartiallyFailingCollection:
+    def find(self, query, projection):
+        return []
+
+    def bulk_write(self, operations, ordered):
+        raise BulkWriteError({
+            "writeErrors": [{"index": 1, "code": 11000, "errmsg": "E11000 duplicate key error"}],
+            "nInserted": 0, "nUpserted": 1, "nMatched": 1, "nModified": 1,
+        })
+
+
+def test_upsert_batch_counts_upserted_and_matched_documents():
+    documents = [{"Unnamed: 0": 1}, {"Unnamed: 0": 2}, {"Unnamed: 0": 3}]
+    assert CarDataExtract.write_batch(PartiallyFailingCollection(), documents, upsert_key=["Unnamed: 0"]) == 2
+
+
+class ReplacingCollection:
+    """
+    mongomock collection whose bulk_write applies ReplaceOne upserts, which mongomock's own bulk api cannot run
+    """
+    def __init__(self):
+        self.collection = mongomock.MongoClient().db.listings
+        self.replaced = 0
+
+    def find(self, query, projection):
+        return self.collection.find(query, projection)
+
+    def bulk_write(self, operations, ordered):
+        for operation in operations:
+            self.collection.replace_one(operation._filter, operation._doc, upsert=True)
+        self.replaced += len(operations)
+        return BulkWriteResult({"nUpserted": 0, "nMatched": len(operations)}, acknowledged=True)
+
+
+def test_reload_only_restamps_changed_documents(monkeypatch):
+    clock = iter([datetime(2026, 1, 1, tzinfo=timezone.utc), datetime(2026, 1, 2, tzinfo=timezone.utc)])
+    monkeypatch.setattr(push_data, "datetime", type("FixedClock", (), {"now": staticmethod(lambda tz: next(clock))}))
+    collection = ReplacingCollection()
+
+    def load():
+        documents = [{"Unnamed: 0": listing_id, "selling_price": 500000} for listing_id in range(5)]
+        documents[3]["selling_price"] = 450000 if collection.replaced else 500000
+        return CarDataExtract.write_batch(collection, documents, upsert_key=["Unnamed: 0"])
+
+    assert load() == 5
+    assert load() == 5  # unchanged listings count as written
+    assert collection.replaced == 6
+    updated_at = {document["Unnamed: 0"]: document["updated_at"] for document in collection.collection.find()}
+    assert updated_at == {0: datetime(2026, 1, 1), 1: datetime(2026, 1, 1), 2: datetime(2026, 1, 1), 3: datetime(2026, 1, 2), 4: datetime(2026, 1, 1)}
@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+
+from refurbished_car.components.data_ingestion import DataIngestion
+from refurbished_car.entity.config_entity import DataIngestionConfig, TrainingPipelineConfig
+from refurbished_car.utils.main_utils.schema_validation import (
+    build_column_rules,
+    describe_failures,
+    summarize_failures,
+    validate_dataframe,
+)
+from refurbished_car.utils.main_utils.utils import DataFrameChunkWriter, load_dataframe
+
+SCHEMA_CONFIG = {
+    "columns": {"brand": "object", "vehicle_age": "int64", "mileage": "float64", "seats": "int64"},
+    "column_checks": {
+        "brand": {"nullable": False, "allowed": ["Maruti", "Hyundai"]},
+        "vehicle_age": {"min": 0, "max": 30},
+        "seats": {"min": 1},
+    },
+}
+
+
+def raw_listings():
+    return pd.DataFrame({
+        "brand": ["Maruti", "Hyundai", None, "Tesla", "Maruti"],
+        "vehicle_age": [3, "abc", 5, 40, 2.5],
+        "mileage": [18.5, 20.0, "n/a", 17.0, None],
+        "seats": [5, 5, 0, 7, 5],
+    })
+
+
+def test_build_column_rules_merges_checks_with_dtypes():
+    rules = build_column_rules(SCHEMA_CONFIG)
+    assert rules["brand"] == {"dtype": "object", "nullable": False, "min": None, "max": None, "allowed": ["Maruti", "Hyundai"]}
+    assert rules["mileage"]["nullable"] is True
+
+
+def test_validate_dataframe_flags_each_failed_check():
+    invalid, failures, missing_columns = validate_dataframe(raw_listings(), build_column_rules(SCHEMA_CONFIG))
+    assert invalid.tolist() == [False, True, True, True, True]
+    assert missing_columns == []
+    assert {name: np.flatnonzero(mask).tolist() for name, mask in failures.items()} == {
+        "brand:null": [2],
+        "brand:category": [3],
+        "vehicle_age:dtype": [1, 4],  # not a number, not a whole number
+        "vehicle_age:range": [3],
+        "mileage:dtype": [2],  # garbage in a nullable column is not a missing value
+        "seats:range": [2],
+    }
+
+
+def test_validate_dataframe_runs_only_the_requested_checks():
+    invalid, failures, _ = validate_dataframe(raw_listings(), build_column_rules(SCHEMA_CONFIG), checks=("dtype",))
+    assert sorted(failures) == ["mileage:dtype", "vehicle_age:dtype"]
+    assert invalid.tolist() == [False, True, True, False, True]
+
+
+def test_validate_dataframe_reports_missing_columns():
+    _, _, missing_columns = validate_dataframe(raw_listings().drop(columns=["seats"]), build_column_rules(SCHEMA_CONFIG))
+    assert missing_columns == ["seats"]
+
+
+def test_describe_and_summarize_failures():
+    invalid, failures, missing_columns = validate_dataframe(raw_listings(), build_column_rules(SCHEMA_CONFIG))
+    reasons = describe_failures(failures, invalid)
+    assert reasons.tolist() == ["vehicle_age:dtype", "brand:null;mileage:dtype;seats:range", "brand:category;vehicle_age:range", "vehicle_age:dtype"]
+    summary = summarize_failures(failures, invalid, missing_columns, ["Unnamed: 0"])
+    assert summary["rows"] == 5 and summary["valid_rows"] == 1 and summary["invalid_rows"] == 4
+    assert summary["failures"]["vehicle_age:dtype"] == 2
+    assert summary["unexpected_columns"] == ["Unnamed: 0"]
+
+
+def test_ingestion_routes_unparseable_raw_values(tmp_path):
+    data_ingestion_config = DataIngestionConfig(TrainingPipelineConfig())
+    data_ingestion_config.invalid_file_path = str(tmp_path / "invalid" / "listings.csv")
+    data_ingestion = DataIngestion(data_ingestion_config)
+    raw = pd.DataFrame({"car_name": ["Maruti Swift", "Hyundai i20"], "mileage": ["abc", 18.5], "seats": [5, 5]})
+    with DataFrameChunkWriter(data_ingestion_config.invalid_file_path) as invalid_writer:
+        valid = data_ingestion.route_invalid_rows(raw, invalid_writer)
+    assert valid["car_name"].tolist() == ["Hyundai i20"]
+    assert data_ingestion.number_of_invalid_rows == 1
+    invalid = load_dataframe(data_ingestion_config.invalid_file_path)
+    assert invalid["mileage"].tolist() == ["abc"]
+    assert invalid["validation_errors"].tolist() == ["mileage:dtype"]
+
+
+def test_unparseable_coerced_values_still_reach_invalid(tmp_path):
+    data_ingestion_config = DataIngestionConfig(TrainingPipelineConfig())
+    data_ingestion_config.type_coercions = {"mileage": "double"}
+    data_ingestion_config.na_values = ["na"]
+    data_ingestion_config.invalid_file_path = str(tmp_path / "invalid" / "listings.csv")
+    data_ingestion = DataIngestion(data_ingestion_config)
+    convert = data_ingestion.build_aggregation_pipeline()[-1]["$set"]["mileage"]["$convert"]
+    assert convert["onError"] == "$mileage"  # a value that does not convert stays raw instead of turning into a gap
+    assert convert["onNull"] is None
+
+    # the documents as the server returns them: "na" and null are missing, "18,5" failed to convert
+    converted = pd.DataFrame({"car_name": ["Maruti Swift", "Hyundai i20", "Honda City", "Tata Nexon"], "mileage": [21.0, "18,5", None, None]})
+    with DataFrameChunkWriter(data_ingestion_config.invalid_file_path) as invalid_writer:
+        valid = data_ingestion.route_invalid_rows(converted, invalid_writer)
+    assert valid["car_name"].tolist() == ["Maruti Swift", "Honda City", "Tata Nexon"]
+    invalid = load_dataframe(data_ingestion_config.invalid_file_path)
+    assert invalid["mileage"].tolist() == ["18,5"]
+    assert invalid["validation_errors"].tolist() == ["mileage:dtype"]
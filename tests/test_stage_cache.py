@@ -0,0 +1,139 @@
+import random
+from datetime import datetime
+
+import mongomock
+import pytest
+
+from refurbished_car.components import data_ingestion as data_ingestion_module
+from refurbished_car.components.data_ingestion import DataIngestion
+from refurbished_car.constant.training_pipeline import DATA_INGESTION_COLLECTION_NAME, DATA_INGESTION_DATABASE_NAME
+from refurbished_car.entity.artifact_entity import DataIngestionArtifact, DataValidationArtifact
+from refurbished_car.entity.config_entity import DataIngestionConfig, TrainingPipelineConfig
+from refurbished_car.pipeline.stage_cache import StageCache
+
+
+class StageConfig:
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.output_file_path = "ignored/because/it/is/run/specific"
+
+
+def write(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+    return str(path)
+
+
+@pytest.fixture
+def stage_cache(tmp_path):
+    code_file = write(tmp_path / "code" / "shared.py", "x = 1\n")
+    return StageCache(cache_dir=str(tmp_path / "Artifacts" / "stage_cache"), code_paths=[code_file], artifact_root=str(tmp_path / "Artifacts"))
+
+
+def ingestion_artifact(tmp_path, run, train="a,b\n1,2\n"):
+    run_dir = tmp_path / "Artifacts" / run / "data_ingestion" / "ingested"
+    return DataIngestionArtifact(trained_file_path=write(run_dir / "train.csv", train), test_file_path=write(run_dir / "test.csv", "a,b\n3,4\n"))
+
+
+def test_same_files_of_another_run_hit(tmp_path, stage_cache):
+    first_key = stage_cache.stage_key("data_validation", StageConfig(0.05), ingestion_artifact(tmp_path, "run_1"))
+    second_key = stage_cache.stage_key("data_validation", StageConfig(0.05), ingestion_artifact(tmp_path, "run_2"))
+    assert first_key == second_key
+
+    artifact = ingestion_artifact(tmp_path, "run_1")
+    stage_cache.save("data_ingestion", first_key, artifact)
+    assert stage_cache.load("data_ingestion", first_key, DataIngestionArtifact) == artifact
+
+
+def test_changed_input_or_config_misses(tmp_path, stage_cache):
+    key = stage_cache.stage_key("data_validation", StageConfig(0.05), ingestion_artifact(tmp_path, "run_1"))
+    assert stage_cache.stage_key("data_validation", StageConfig(0.05), ingestion_artifact(tmp_path, "run_2", train="a,b\n1,9\n")) != key
+    assert stage_cache.stage_key("data_validation", StageConfig(0.10), ingestion_artifact(tmp_path, "run_1")) != key
+    assert stage_cache.load("data_validation", key, DataValidationArtifact) is None
+
+
+def test_entry_is_invalidated_when_its_files_change(tmp_path, stage_cache):
+    artifact = ingestion_artifact(tmp_path, "run_1")
+    key = stage_cache.stage_key("data_ingestion", StageConfig(0.05), {"source": "listings"})
+    stage_cache.save("data_ingestion", key, artifact)
+    write(tmp_path / "Artifacts" / "run_1" / "data_ingestion" / "ingested" / "train.csv", "a,b\n5,6\n")
+    assert stage_cache.load("data_ingestion", key, DataIngestionArtifact) is None
+
+
+def test_files_sharing_a_name_in_different_directories_do_not_collide(tmp_path, stage_cache):
+    run_dir = tmp_path / "Artifacts" / "run_1" / "data_validation"
+
+    def validation_artifact(valid_train, invalid_train):
+        return DataValidationArtifact(
+            validation_status=True,
+            valid_train_file_path=write(run_dir / "validated" / "train.csv", valid_train),
+            valid_test_file_path=None,
+            invalid_train_file_path=write(run_dir / "invalid" / "train.csv", invalid_train),
+            invalid_test_file_path=None,
+            drift_report_file_path=None,
+            reference_profile_file_path=None,
+            validation_summary_file_path=None,
+        )
+
+    key = stage_cache.stage_key("data_transformation", StageConfig(0.05), validation_artifact("a\n1\n", "a\n2\n"))
+    assert stage_cache.stage_key("data_transformation", StageConfig(0.05), validation_artifact("a\n2\n", "a\n1\n")) != key
+
+
+@pytest.fixture
+def collection(monkeypatch):
+    client = mongomock.MongoClient()
+    monkeypatch.setattr(data_ingestion_module, "get_mongo_client", lambda: client)
+    return client[DATA_INGESTION_DATABASE_NAME][DATA_INGESTION_COLLECTION_NAME]
+
+
+def test_source_fingerprint_follows_updated_at_count_and_window(collection):
+    collection.insert_many([{"Unnamed: 0": listing_id, "selling_price": 500000, "updated_at": datetime(2026, 1, 1)} for listing_id in range(10)])
+    data_ingestion = DataIngestion(DataIngestionConfig(TrainingPipelineConfig()))
+    fingerprint = data_ingestion.get_source_fingerprint()
+
+    collection.update_many({}, {"$set": {"selling_price": 450000, "updated_at": datetime(2026, 1, 2)}})
+    assert data_ingestion.get_source_fingerprint() != fingerprint
+
+    fingerprint = data_ingestion.get_source_fingerprint()
+    collection.delete_one({"Unnamed: 0": 0})
+    assert data_ingestion.get_source_fingerprint() != fingerprint
+
+    data_ingestion.data_ingestion_config.recent_days = 30
+    windowed = data_ingestion.get_source_fingerprint()
+    assert windowed["pipeline"][0] == {"$match": {"_id": {"$gte": data_ingestion.window_start()}}}
+    assert data_ingestion.build_aggregation_pipeline()[0] == windowed["pipeline"][0]
+
+
+def test_source_fingerprint_is_none_when_the_export_is_not_repeatable(collection):
+    collection.insert_many([{"Unnamed: 0": 1, "updated_at": datetime(2026, 1, 1)}, {"Unnamed: 0": 2}])
+    config = DataIngestionConfig(TrainingPipelineConfig())
+    assert DataIngestion(config).get_source_fingerprint() is None  # a document without updated_at
+    collection.delete_one({"Unnamed: 0": 2})
+    assert DataIngestion(config).get_source_fingerprint() is not None
+    config.sample_size = 1
+    assert DataIngestion(config).get_source_fingerprint() is None
+
+
+@pytest.mark.parametrize("export_mode", ["streaming", "in_memory"])
+def test_downstream_keys_do_not_depend_on_the_insert_order(tmp_path, stage_cache, collection, export_mode):
+    listings = [
+        {"Unnamed: 0": listing_id, "brand": ["Maruti", "Hyundai", "Honda"][listing_id % 3], "km_driven": 1000 * listing_id, "selling_price": 400000 + listing_id}
+        for listing_id in range(300)
+    ]
+
+    def ingest(run, documents):
+        collection.delete_many({})
+        collection.insert_many([dict(document) for document in documents])
+        config = DataIngestionConfig(TrainingPipelineConfig())
+        config.export_mode = export_mode
+        config.export_batch_size = 64
+        ingestion_dir = tmp_path / "Artifacts" / run / "data_ingestion"
+        config.feature_store_file_path = str(ingestion_dir / "feature_store" / "listings.csv")
+        config.training_file_path = str(ingestion_dir / "ingested" / "train.csv")
+        config.testing_file_path = str(ingestion_dir / "ingested" / "test.csv")
+        config.invalid_file_path = str(ingestion_dir / "invalid" / "listings.csv")
+        return DataIngestion(config).initiate_data_ingestion()
+
+    first_key = stage_cache.stage_key("data_validation", StageConfig(0.05), ingest("run_1", listings))
+    random.Random(0).shuffle(listings)  # e.g. reloaded by push_data.py's concurrent writers
+    assert stage_cache.stage_key("data_validation", StageConfig(0.05), ingest("run_2", listings)) == first_key
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from refurbished_car.components.data_ingestion import DataIngestion
+from refurbished_car.entity.config_entity import DataIngestionConfig, TrainingPipelineConfig
+from refurbished_car.utils.main_utils.utils import load_dataframe
+
+
+def listings(selling_price):
+    return pd.DataFrame({
+        "Unnamed: 0": range(1000),
+        "brand": ["Maruti", "Hyundai", "Honda", "Toyota"] * 250,
+        "selling_price": selling_price,
+    })
+
+
+def test_split_keeps_an_edited_listing_on_its_side():
+    data_ingestion = DataIngestion(DataIngestionConfig(TrainingPipelineConfig()))
+    assert data_ingestion.data_ingestion_config.split_key_columns == ["Unnamed: 0"]
+    before = data_ingestion.split_hash(listings(500000))
+    after = data_ingestion.split_hash(listings(range(1000)))  # every price edited
+    assert (before == after).all()
+
+
+def test_split_is_not_stratified_unless_configured(tmp_path):
+    data_ingestion_config = DataIngestionConfig(TrainingPipelineConfig())
+    assert data_ingestion_config.split_stratify is None
+    dataframe = listings(np.random.default_rng(0).lognormal(13, 0.5, 1000).round())
+    data_ingestion = DataIngestion(data_ingestion_config)
+    expected = set(dataframe["Unnamed: 0"][data_ingestion.split_hash(dataframe) < data_ingestion_config.train_test_split_ratio])
+    assert split_test_ids(tmp_path, dataframe, None, export_batch_size=64) == expected
+
+
+def test_whole_row_fallback_moves_edited_listings():
+    data_ingestion_config = DataIngestionConfig(TrainingPipelineConfig())
+    data_ingestion_config.split_key_columns = None
+    data_ingestion = DataIngestion(data_ingestion_config)
+    ratio = data_ingestion_config.train_test_split_ratio
+    before = data_ingestion.split_hash(listings(500000)) < ratio
+    after = data_ingestion.split_hash(listings(range(1000))) < ratio
+    assert (before != after).any()
+
+
+def split_test_ids(tmp_path, dataframe, split_stratify, export_batch_size):
+    data_ingestion_config = DataIngestionConfig(TrainingPipelineConfig())
+    data_ingestion_config.split_stratify = split_stratify
+    data_ingestion_config.export_batch_size = export_batch_size
+    data_ingestion_config.training_file_path = str(tmp_path / "train.parquet")
+    data_ingestion_config.testing_file_path = str(tmp_path / "test.parquet")
+    number_of_train_rows, number_of_test_rows = DataIngestion(data_ingestion_config).split_data_as_train_test(dataframe)
+    assert number_of_train_rows + number_of_test_rows == len(dataframe)
+    return set(load_dataframe(data_ingestion_config.testing_file_path)["Unnamed: 0"])
+
+
+@pytest.mark.parametrize("split_stratify", [None, "brand", "price"])
+def test_split_does_not_depend_on_row_order_or_chunking(tmp_path, split_stratify):
+    rng = np.random.default_rng(0)
+    dataframe = listings(rng.lognormal(13, 0.5, 1000).round())
+    dataframe.loc[rng.choice(1000, 20, replace=False), "brand"] = None
+    shuffled = dataframe.sample(frac=1.0, random_state=7)
+    shuffled = pd.concat([shuffled[shuffled["selling_price"] > 800000], shuffled[shuffled["selling_price"] <= 800000]])  # expensive listings first
+
+    test_ids = split_test_ids(tmp_path, dataframe, split_stratify, export_batch_size=1000)
+    assert split_test_ids(tmp_path, shuffled, split_stratify, export_batch_size=1000) == test_ids
+    assert split_test_ids(tmp_path, shuffled, split_stratify, export_batch_size=64) == test_ids
+    assert 0.15 < len(test_ids) / len(dataframe) < 0.25
+
+
+@pytest.mark.parametrize("split_stratify", ["brand", "price"])
+def test_stratified_split_keeps_each_stratum_share(tmp_path, split_stratify):
+    dataframe = listings(np.random.default_rng(0).lognormal(13, 0.5, 1000).round())
+    test_ids = split_test_ids(tmp_path, dataframe, split_stratify, export_batch_size=64)
+    data_ingestion = DataIngestion(DataIngestionConfig(TrainingPipelineConfig()))
+    if split_stratify == "price":
+        strata = pd.qcut(dataframe["selling_price"], data_ingestion.data_ingestion_config.split_price_bins, labels=False)
+    else:
+        strata = dataframe["brand"]
+    is_test = dataframe["Unnamed: 0"].isin(test_ids)
+    for _, stratum_is_test in is_test.groupby(strata):
+        assert stratum_is_test.sum() == round(len(stratum_is_test) * data_ingestion.data_ingestion_config.train_test_split_ratio)